@@ -1,14 +1,20 @@
 # -*- coding: utf-8 -*-
 import os
 from todo_app import create_app
+from todo_app.storage import start_garbage_collector
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# WSGI-приложение; в промышленном режиме запускается через gunicorn -c gunicorn.conf.py app:app
 app = create_app()
 
 if __name__ == '__main__':
-    app = create_app()
+    # Сервер разработки Flask; сборщик мусора вложений запускается здесь один раз
+    # (под gunicorn его запускает мастер-процесс, см. gunicorn.conf.py). С автоперезагрузкой
+    # сервер работает в дочернем процессе, поэтому поток запускается только в нем
+    if not os.getenv('DEBUG') or os.getenv('WERKZEUG_RUN_MAIN'):
+        start_garbage_collector(app)
     app.run(
         host=os.getenv('HOST'),
         port=os.getenv('PORT'),
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Генераторы тестовых данных для бенчмарков.
+
+Категории распределены по закону Ципфа: несколько категорий встречаются у большинства
+задач, остальные — редко, как в реальных списках задач. Данные детерминированы
+(задаются seed), поэтому результаты разных запусков сопоставимы.
+"""
+import random
+from sqlalchemy import func, inspect, select, text
+from todo_app.extensions import db
+from todo_app.importer import CategoryMap, insert_task_batch
+from todo_app.models import Task
+
+# Таблица-метка базы данных, созданной бенчмарком: бенчмарк пересоздает схему и удаляет
+# созданные сценариями данные только в базах с этой таблицей
+MARKER_TABLE = 'benchmark_marker'
+
+WORDS = ('report', 'meeting', 'invoice', 'review', 'deploy', 'design', 'call', 'email', 'budget', 'release',
+         'bug', 'feature', 'plan', 'draft', 'update', 'client', 'server', 'backup', 'audit', 'training')
+
+
+def category_names(count):
+    return [f'category-{index:03d}' for index in range(count)]
+
+
+def zipf_weights(count, exponent=1.1):
+    """
+    Веса категорий по закону Ципфа: вес k-й категории пропорционален 1 / k^exponent.
+    """
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def generate_tasks(count, categories=50, max_categories=3, seed=42):
+    """
+    Генерирует данные задач в формате POST /tasks.
+
+    Args:
+        count (int): Количество задач.
+        categories (int): Количество различных категорий.
+        max_categories (int): Максимальное количество категорий у задачи.
+        seed (int): Начальное значение генератора случайных чисел.
+
+    Yields:
+        dict: Данные задачи.
+    """
+    rng = random.Random(seed)
+    names = category_names(categories)
+    weights = zipf_weights(categories)
+    for index in range(count):
+        words = rng.sample(WORDS, 3)
+        data = {
+            'title': f'{words[0].capitalize()} {words[1]} #{index}',
+            'categories': list(dict.fromkeys(rng.choices(names, weights, k=rng.randint(0, max_categories)))),
+        }
+        description = ' '.join(rng.choices(WORDS, k=rng.randint(0, 12)))
+        if description:
+            data['description'] = description
+        yield data
+
+
+class ForeignDatabaseError(RuntimeError):
+    """База данных создана не бенчмарком."""
+
+
+def claim_database():
+    """
+    Проверяет, что база данных создана бенчмарком, и помечает пустую базу как созданную им.
+
+    Raises:
+        ForeignDatabaseError: В базе есть таблицы, но нет метки бенчмарка.
+    """
+    tables = inspect(db.engine).get_table_names()
+    if MARKER_TABLE in tables:
+        return
+    if tables:
+        raise ForeignDatabaseError(f'Database {db.engine.url!r} was not created by the benchmark; use an empty database')
+    db.session.execute(text(f'CREATE TABLE {MARKER_TABLE} (id INTEGER PRIMARY KEY)'))
+    db.session.commit()
+
+
+def seed_tasks(count, batch_size=10000, **kwargs):
+    """
+    Заполняет базу данных задачами, если в ней еще нет ровно count задач.
+    База данных должна быть создана бенчмарком (см. claim_database).
+
+    Args:
+        count (int): Количество задач.
+        batch_size (int): Количество задач в одной транзакции.
+        **kwargs: Параметры generate_tasks.
+
+    Returns:
+        bool: True, если данные были созданы заново.
+    """
+    claim_database()
+    if inspect(db.engine).has_table(Task.__tablename__) and \
+            db.session.scalar(select(func.count()).select_from(Task)) == count:
+        return False
+    db.drop_all()
+    db.create_all()
+    category_map = CategoryMap()
+    batch = []
+    for data in generate_tasks(count, **kwargs):
+        batch.append(data)
+        if len(batch) == batch_size:
+            insert_task_batch(batch, category_map)
+            db.session.commit()
+            batch = []
+    if batch:
+        insert_task_batch(batch, category_map)
+        db.session.commit()
+    return True
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарки API задач и слоя сервисов.
+
+Запуск:
+    python -m benchmarks.run --size 10k
+    python -m benchmarks.run --size 100k --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --size 100k --baseline benchmarks/baseline.json --threshold 0.2
+
+Для каждого сценария выводятся пропускная способность, задержка p50/p95/p99 и пиковый объем
+памяти, выделенной за одну операцию (tracemalloc). В режиме сравнения с базовыми результатами
+команда завершается с кодом 1, если сценарий стал медленнее или требует больше памяти, чем
+допускает порог.
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import and_, delete, func, or_, select
+from todo_app import create_app
+from todo_app.config import Config, engine_options
+from todo_app.extensions import db
+from todo_app.importer import import_tasks
+from todo_app.models import Attachment, Category, ChangeLog, Task, task_categories
+from todo_app.services import TASK_FIELDS, handle_categories, task_columns, task_rows_to_dicts, task_to_dict
+from .data import ForeignDatabaseError, generate_tasks, seed_tasks
+
+SIZES = {'10k': 10000, '100k': 100000, '1m': 1000000}
+
+# Запросы списка задач: сочетания фильтров и сортировок
+GET_TASKS_QUERIES = {
+    'get_tasks': '/tasks',
+    'get_tasks sort=title desc': '/tasks?sort=title&order=desc',
+    'get_tasks sort=updated_at': '/tasks?sort=updated_at',
+    'get_tasks frequent category': '/tasks?category=category-000',
+    'get_tasks rare category': '/tasks?category=category-040',
+    'get_tasks match=all': '/tasks?category=category-000,category-001&match=all',
+    'get_tasks exclude': '/tasks?exclude=category-000',
+    'get_tasks search': '/tasks?q=invoice budget',
+    'get_tasks fields=id,title': '/tasks?fields=id,title',
+    'get_tasks counts': '/tasks?category=category-001&counts=1',
+}
+
+
+def parse_size(value):
+    value = value.lower()
+    if value in SIZES:
+        return SIZES[value]
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid size: {value}')
+
+
+def percentile(sorted_values, fraction):
+    """
+    Возвращает перцентиль (метод ближайшего ранга) отсортированного списка.
+    """
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def measure(operation, iterations, warmup, items=1):
+    """
+    Измеряет операцию: задержку каждого вызова, пропускную способность и пиковую память.
+
+    Args:
+        operation (callable): Операция без аргументов.
+        iterations (int): Количество измеряемых вызовов.
+        warmup (int): Количество вызовов для прогрева.
+        items (int): Количество элементов, обрабатываемых одной операцией.
+
+    Returns:
+        dict: Результаты сценария.
+    """
+    for _ in range(warmup):
+        operation()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - call_started)
+    total = time.perf_counter() - started
+
+    # Память измеряется отдельно: tracemalloc заметно замедляет выполнение
+    tracemalloc.start()
+    for _ in range(min(iterations, 3)):
+        operation()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'throughput': iterations * items / total,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_memory_kib': peak / 1024,
+    }
+
+
+def _check(response, status=200):
+    if response.status_code != status:
+        raise RuntimeError(f'Unexpected status {response.status_code}: {response.data[:200]!r}')
+    return response
+
+
+def get_tasks_scenarios(client):
+    scenarios = {}
+    for name, url in GET_TASKS_QUERIES.items():
+        scenarios[name] = (lambda url=url: _check(client.get(url)), 1)
+    cursor = _check(client.get('/tasks')).get_json()['next_cursor']
+    if cursor:
+        scenarios['get_tasks page 2'] = (lambda: _check(client.get(f'/tasks?cursor={cursor}')), 1)
+    return scenarios
+
+
+def create_task_scenarios(client):
+    counter = iter(range(10 ** 9))
+
+    def create(categories=None, with_file=False):
+        number = next(counter)
+        if with_file:
+            data = {'title': f'Benchmark {number}', 'categories': categories or [],
+                    'file': (io.BytesIO(os.urandom(16 * 1024)), 'attachment.pdf')}
+            return _check(client.post('/tasks', data=data, content_type='multipart/form-data'), 201)
+        return _check(client.post('/tasks', json={'title': f'Benchmark {number}', 'categories': categories or []}),
+                      201)
+
+    return {
+        'create_task': (create, 1),
+        'create_task categories': (lambda: create(['category-000', 'category-007', f'new-{next(counter)}']), 1),
+        'create_task file': (lambda: create(with_file=True), 1),
+    }
+
+
+def service_scenarios():
+    names = ['category-000', 'category-003', 'category-010']
+
+    def categories_operation():
+        task = Task(title='Benchmark')
+        db.session.add(task)
+        handle_categories(names, task)
+        db.session.flush()
+        db.session.rollback()
+
+    task = db.session.scalars(select(Task).join(Task.categories).limit(1)).first()
+    task.categories  # загружаем категории заранее: измеряется только сериализация
+    rows = db.session.execute(select(*task_columns(TASK_FIELDS)).order_by(Task.id).limit(100)).all()
+    return {
+        'handle_categories': (categories_operation, 1),
+        'task_to_dict': (lambda: task_to_dict(task), 1),
+        'task_rows_to_dicts x100': (lambda: task_rows_to_dicts(rows), 100),
+    }
+
+
+def import_scenario(size):
+    count = min(size, 20000)
+    content = ''.join(json.dumps(data) + '\n' for data in generate_tasks(count, seed=7))
+
+    def operation():
+        import_tasks(io.StringIO(content), 'ndjson', 5000)
+
+    return {'import_tasks': (operation, count)}
+
+
+def last_ids():
+    """
+    Возвращает наибольшие идентификаторы задач, категорий и вложений перед запуском сценариев.
+    """
+    return {model: db.session.scalar(select(func.max(model.id))) or 0 for model in (Task, Category, Attachment)}
+
+
+def remove_created(recorded_ids):
+    """
+    Удаляет задачи, категории и вложения, созданные сценариями (с идентификаторами больше
+    записанных last_ids), и их записи в журнале изменений, чтобы базу можно было использовать
+    повторно. Статистика обновляется триггерами удаления; файлы вложений удаляются вместе
+    с временной папкой загрузок.
+    """
+    last_task_id, last_category_id = recorded_ids[Task], recorded_ids[Category]
+    db.session.execute(delete(task_categories).where(or_(task_categories.c.task_id > last_task_id,
+                                                         task_categories.c.category_id > last_category_id)))
+    db.session.execute(delete(ChangeLog).where(or_(
+        and_(ChangeLog.entity == 'task', ChangeLog.entity_id > last_task_id),
+        and_(ChangeLog.entity == 'category', ChangeLog.entity_id > last_category_id),
+    )))
+    db.session.execute(delete(Task).where(Task.id > last_task_id))
+    db.session.execute(delete(Category).where(Category.id > last_category_id))
+    db.session.execute(delete(Attachment).where(Attachment.id > recorded_ids[Attachment]))
+    db.session.commit()
+
+
+def run(args):
+    database_uri = args.database or 'sqlite:///' + os.path.join(tempfile.gettempdir(),
+                                                                f'todo-benchmark-{args.size}.db')
+    upload_folder = tempfile.mkdtemp(prefix='todo-benchmark-uploads-')
+    config = type('BenchmarkConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(database_uri),
+        'UPLOAD_FOLDER': upload_folder,
+        'CACHE_ENABLED': False,
+        # Схему создает seed_tasks после проверки, что база создана бенчмарком
+        'DB_CREATE_ALL': False,
+        'ATTACHMENT_GC_INTERVAL': 0,
+        'SLOW_QUERY_THRESHOLD_MS': 0,
+        'METRICS_ENABLED': False,
+    })
+    app = create_app(config)
+    client = app.test_client()
+    results = {}
+    try:
+        with app.app_context():
+            started = time.perf_counter()
+            if seed_tasks(args.size):
+                print(f'Seeded {args.size} tasks in {time.perf_counter() - started:.1f}s')
+            recorded_ids = last_ids()
+
+            scenarios = {}
+            scenarios.update(get_tasks_scenarios(client))
+            scenarios.update(service_scenarios())
+            scenarios.update(create_task_scenarios(client))
+            scenarios.update(import_scenario(args.size))
+            try:
+                for name, (operation, items) in scenarios.items():
+                    if args.only and args.only not in name:
+                        continue
+                    iterations = args.iterations if name != 'import_tasks' else max(1, args.iterations // 50)
+                    results[name] = measure(operation, iterations, min(args.warmup, iterations), items)
+                    print(format_result(name, results[name]), flush=True)
+            finally:
+                db.session.rollback()
+                remove_created(recorded_ids)
+    finally:
+        shutil.rmtree(upload_folder, ignore_errors=True)
+    return {'size': args.size, 'database': database_uri.split(':', 1)[0], 'scenarios': results}
+
+
+def format_result(name, result):
+    return (f"{name:<32} {result['throughput']:>12.1f}/s  p50 {result['p50_ms']:>8.2f} ms  "
+            f"p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  "
+            f"peak {result['peak_memory_kib']:>9.1f} KiB")
+
+
+def compare(results, baseline, threshold):
+    """
+    Сравнивает результаты с базовыми и возвращает список регрессий.
+
+    Регрессия — рост p95 или пиковой памяти либо падение пропускной способности
+    больше чем на threshold (доля).
+    """
+    regressions = []
+    for name, result in results['scenarios'].items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        if result['throughput'] < base['throughput'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['throughput']:.1f} -> {result['throughput']:.1f}/s")
+        if result['peak_memory_kib'] > base['peak_memory_kib'] * (1 + threshold):
+            regressions.append(f"{name}: peak memory {base['peak_memory_kib']:.1f} -> "
+                               f"{result['peak_memory_kib']:.1f} KiB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the tasks API and service layer.')
+    parser.add_argument('--size', type=parse_size, default=SIZES['10k'],
+                        help='Number of seeded tasks: 10k, 100k, 1m or a number (default 10k).')
+    parser.add_argument('--database', help='Database URI (defaults to a SQLite file in the temp directory, '
+                                           'reused between runs of the same size).')
+    parser.add_argument('--iterations', type=int, default=200, help='Measured calls per scenario.')
+    parser.add_argument('--warmup', type=int, default=20, help='Warm-up calls per scenario.')
+    parser.add_argument('--only', help='Run only scenarios whose name contains this text.')
+    parser.add_argument('--output', help='Write results to this JSON file.')
+    parser.add_argument('--save-baseline', help='Write results as a baseline JSON file.')
+    parser.add_argument('--baseline', help='Compare results with this baseline JSON file.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed regression against the baseline as a fraction (default 0.2).')
+    args = parser.parse_args(argv)
+
+    try:
+        results = run(args)
+    except ForeignDatabaseError as e:
+        print(e, file=sys.stderr)
+        return 2
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('size') != results['size']:
+            print(f"Baseline was recorded for {baseline.get('size')} tasks, not {results['size']}", file=sys.stderr)
+            return 2
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'Regressions over {args.threshold:.0%}:', file=sys.stderr)
+            for regression in regressions:
+                print(f'  {regression}', file=sys.stderr)
+            return 1
+        print(f'No regressions over {args.threshold:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
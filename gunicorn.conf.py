@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Конфигурация gunicorn для промышленного запуска: gunicorn -c gunicorn.conf.py app:app
+#
+# Мастер-процесс запускает несколько рабочих процессов (pre-fork), каждый обслуживает запросы
+# в нескольких потоках. Плавная перезагрузка: kill -HUP <pid мастера> запускает новые рабочие
+# процессы с новым кодом и завершает старые после обработки текущих запросов.
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Экспериментальный асинхронный режим для большого количества одновременных медленных клиентов:
+# GUNICORN_WORKER_CLASS=gevent. gevent не входит в requirements.txt и устанавливается отдельно
+# (pip install -r requirements-gevent.txt); тесты приложения выполняются без monkey patching,
+# поэтому работа под gevent не проверяется автоматически. Рабочий процесс обслуживает до
+# worker_connections запросов в гринлетах; ввод-вывод сокетов (клиенты, MySQL через PyMySQL)
+# становится кооперативным, поэтому ожидание базы данных и медленных клиентов не занимает поток.
+# Количество одновременных запросов к базе по-прежнему ограничено пулом соединений
+# (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+if worker_class == 'gevent':
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        raise SystemExit('GUNICORN_WORKER_CLASS=gevent requires: pip install -r requirements-gevent.txt')
+# Время обработки запроса, после которого рабочий процесс перезапускается,
+# и время на завершение текущих запросов при остановке или перезагрузке
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Перезапуск рабочего процесса после указанного количества запросов (0 — не перезапускать)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+# Приложение создается в каждом рабочем процессе один раз при его запуске. При preload_app
+# оно создается в мастер-процессе до fork: быстрее старт, но HUP не перезагружает код.
+# С gevent приложение должно загружаться после monkey patching в рабочем процессе, поэтому
+# preload_app для него не используется.
+preload_app = os.getenv('GUNICORN_PRELOAD', '0') == '1' and worker_class != 'gevent'
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+# Схема базы данных создается один раз перед запуском сервера (flask init-db),
+# а не при запуске каждого рабочего процесса
+raw_env = ['DB_CREATE_ALL=0']
+
+
+# Период сборки мусора в хранилище вложений (0 — отключена). Сборщик — один процесс
+# flask attachments gc --interval на сервер, запущенный мастер-процессом, а не поток
+# в каждом рабочем процессе
+attachment_gc_interval = int(os.getenv('ATTACHMENT_GC_INTERVAL', 3600))
+
+
+def when_ready(server):
+    if worker_class == 'gevent':
+        server.log.warning('The gevent worker class is experimental and not covered by the test suite')
+    if attachment_gc_interval <= 0:
+        return
+    server.attachment_gc = subprocess.Popen(
+        [sys.executable, '-m', 'flask', '--app', 'app', 'attachments', 'gc', '--interval', str(attachment_gc_interval)],
+        env={**os.environ, 'DB_CREATE_ALL': '0'},
+    )
+    server.log.info('Started attachment garbage collector (pid: %s)', server.attachment_gc.pid)
+
+
+def on_exit(server):
+    process = getattr(server, 'attachment_gc', None)
+    if process is not None and process.poll() is None:
+        process.terminate()
+        process.wait(graceful_timeout)
+
+
+def post_fork(server, worker):
+    # Соединения, открытые в мастер-процессе при preload_app, нельзя использовать
+    # из нескольких процессов: каждый рабочий процесс открывает свои
+    if not server.cfg.preload_app:
+        return
+    from app import app
+    from todo_app.extensions import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
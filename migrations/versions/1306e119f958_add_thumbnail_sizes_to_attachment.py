@@ -0,0 +1,26 @@
+"""add thumbnail_sizes to Attachment
+
+Revision ID: 1306e119f958
+Revises: 166b68a98a13
+Create Date: 2026-10-18 18:11:52.603194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1306e119f958'
+down_revision = '166b68a98a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('attachment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('thumbnail_sizes', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('attachment', schema=None) as batch_op:
+        batch_op.drop_column('thumbnail_sizes')
@@ -0,0 +1,50 @@
+"""add change_log and change_counter tables
+
+Revision ID: 166b68a98a13
+Revises: 1a8cb362d731
+Create Date: 2026-10-18 17:02:37.418520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '166b68a98a13'
+down_revision = '1a8cb362d731'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    timestamp = sa.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+    op.create_table('change_log',
+                    sa.Column('version', sa.BigInteger(), autoincrement=False, nullable=False),
+                    sa.Column('entity', sa.String(length=20), nullable=False),
+                    sa.Column('entity_id', sa.Integer(), nullable=False),
+                    sa.Column('deleted', sa.Boolean(), nullable=False),
+                    sa.Column('changed_at', timestamp, nullable=True),
+                    sa.PrimaryKeyConstraint('version'),
+                    sa.UniqueConstraint('entity', 'entity_id', name='uq_change_log_entity_entity_id')
+                    )
+    op.create_table('change_counter',
+                    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+                    sa.Column('version', sa.BigInteger(), nullable=False),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    # Существующие задачи и категории попадают в журнал, чтобы первая синхронизация
+    # (без since) вернула все данные: задачи получают версии 1..max(task.id),
+    # категории — следующие за ними
+    op.execute("INSERT INTO change_log (version, entity, entity_id, deleted, changed_at) "
+               "SELECT id, 'task', id, 0, updated_at FROM task")
+    op.execute("INSERT INTO change_log (version, entity, entity_id, deleted, changed_at) "
+               "SELECT (SELECT COALESCE(MAX(id), 0) FROM task) + id, 'category', id, 0, CURRENT_TIMESTAMP "
+               "FROM category")
+    op.execute("INSERT INTO change_counter (id, version) "
+               "SELECT 1, COALESCE(MAX(version), 0) FROM change_log")
+
+
+def downgrade():
+    op.drop_table('change_counter')
+    op.drop_table('change_log')
@@ -0,0 +1,30 @@
+"""add keyset pagination indexes to Task
+
+Revision ID: 18111c3952f5
+Revises: dbd939146f8c
+Create Date: 2026-10-18 10:12:31.418207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '18111c3952f5'
+down_revision = 'dbd939146f8c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('ix_task_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_task_updated_at_id', ['updated_at', 'id'], unique=False)
+        batch_op.create_index('ix_task_title_id', ['title', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_title_id')
+        batch_op.drop_index('ix_task_updated_at_id')
+        batch_op.drop_index('ix_task_created_at_id')
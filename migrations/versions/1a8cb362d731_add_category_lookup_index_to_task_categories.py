@@ -0,0 +1,26 @@
+"""add (category_id, task_id) index to task_categories
+
+Revision ID: 1a8cb362d731
+Revises: d7fa2b722a2f
+Create Date: 2026-10-18 15:20:44.571903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a8cb362d731'
+down_revision = 'd7fa2b722a2f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task_categories', schema=None) as batch_op:
+        batch_op.create_index('ix_task_categories_category_id_task_id', ['category_id', 'task_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task_categories', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_categories_category_id_task_id')
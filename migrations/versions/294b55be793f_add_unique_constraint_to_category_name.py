@@ -0,0 +1,44 @@
+"""add unique constraint to Category.name
+
+Revision ID: 294b55be793f
+Revises: 18111c3952f5
+Create Date: 2026-10-18 11:02:47.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '294b55be793f'
+down_revision = '18111c3952f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Объединяем уже существующие дубликаты категорий в категорию с наименьшим id
+    op.execute(
+        "INSERT INTO task_categories (task_id, category_id) "
+        "SELECT DISTINCT tc.task_id, k.keep_id FROM task_categories tc "
+        "JOIN category c ON c.id = tc.category_id "
+        "JOIN (SELECT name, MIN(id) AS keep_id FROM category GROUP BY name) k ON k.name = c.name "
+        "WHERE tc.category_id <> k.keep_id AND NOT EXISTS ("
+        "SELECT 1 FROM task_categories t2 WHERE t2.task_id = tc.task_id AND t2.category_id = k.keep_id)"
+    )
+    op.execute(
+        "DELETE FROM task_categories WHERE category_id NOT IN "
+        "(SELECT MIN(id) FROM category GROUP BY name)"
+    )
+    op.execute(
+        "DELETE FROM category WHERE id NOT IN "
+        "(SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM category GROUP BY name) AS k)"
+    )
+
+    with op.batch_alter_table('category', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_category_name', ['name'])
+
+
+def downgrade():
+    with op.batch_alter_table('category', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_category_name', type_='unique')
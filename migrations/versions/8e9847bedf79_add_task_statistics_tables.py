@@ -0,0 +1,112 @@
+"""add category_stats and daily_stats tables maintained by triggers
+
+Revision ID: 8e9847bedf79
+Revises: 1306e119f958
+Create Date: 2026-10-18 19:04:26.731840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e9847bedf79'
+down_revision = '1306e119f958'
+branch_labels = None
+depends_on = None
+
+# Копия DDL из todo_app.stats на момент создания ревизии
+SQLITE_STATS_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS task_stats_ai AFTER INSERT ON task BEGIN "
+    "INSERT INTO daily_stats (day, created, updated) SELECT date(new.created_at), 1, 0 "
+    "WHERE new.created_at IS NOT NULL ON CONFLICT (day) DO UPDATE SET created = created + 1;"
+    "INSERT INTO daily_stats (day, created, updated) SELECT date(new.updated_at), 0, 1 "
+    "WHERE new.updated_at IS NOT NULL ON CONFLICT (day) DO UPDATE SET updated = updated + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_ad AFTER DELETE ON task BEGIN "
+    "UPDATE daily_stats SET created = created - 1 WHERE day = date(old.created_at);"
+    "UPDATE daily_stats SET updated = updated - 1 WHERE day = date(old.updated_at); END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_au_created AFTER UPDATE OF created_at ON task "
+    "WHEN date(old.created_at) IS NOT date(new.created_at) BEGIN "
+    "UPDATE daily_stats SET created = created - 1 WHERE day = date(old.created_at);"
+    "INSERT INTO daily_stats (day, created, updated) SELECT date(new.created_at), 1, 0 "
+    "WHERE new.created_at IS NOT NULL ON CONFLICT (day) DO UPDATE SET created = created + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_au_updated AFTER UPDATE OF updated_at ON task "
+    "WHEN date(old.updated_at) IS NOT date(new.updated_at) BEGIN "
+    "UPDATE daily_stats SET updated = updated - 1 WHERE day = date(old.updated_at);"
+    "INSERT INTO daily_stats (day, created, updated) SELECT date(new.updated_at), 0, 1 "
+    "WHERE new.updated_at IS NOT NULL ON CONFLICT (day) DO UPDATE SET updated = updated + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS task_categories_stats_ai AFTER INSERT ON task_categories BEGIN "
+    "INSERT INTO category_stats (category_id, task_count) VALUES (new.category_id, 1) "
+    "ON CONFLICT (category_id) DO UPDATE SET task_count = task_count + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS task_categories_stats_ad AFTER DELETE ON task_categories BEGIN "
+    "UPDATE category_stats SET task_count = task_count - 1 WHERE category_id = old.category_id; END",
+    "CREATE TRIGGER IF NOT EXISTS category_stats_ad AFTER DELETE ON category BEGIN "
+    "DELETE FROM category_stats WHERE category_id = old.id; END",
+)
+MYSQL_STATS_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS task_stats_ai AFTER INSERT ON task FOR EACH ROW BEGIN "
+    "IF NEW.created_at IS NOT NULL THEN INSERT INTO daily_stats (day, created, updated) "
+    "VALUES (DATE(NEW.created_at), 1, 0) ON DUPLICATE KEY UPDATE created = created + 1; END IF;"
+    "IF NEW.updated_at IS NOT NULL THEN INSERT INTO daily_stats (day, created, updated) "
+    "VALUES (DATE(NEW.updated_at), 0, 1) ON DUPLICATE KEY UPDATE updated = updated + 1; END IF; END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_ad AFTER DELETE ON task FOR EACH ROW BEGIN "
+    "UPDATE daily_stats SET created = created - 1 WHERE day = DATE(OLD.created_at);"
+    "UPDATE daily_stats SET updated = updated - 1 WHERE day = DATE(OLD.updated_at); END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_au AFTER UPDATE ON task FOR EACH ROW BEGIN "
+    "IF NOT (DATE(OLD.created_at) <=> DATE(NEW.created_at)) THEN "
+    "UPDATE daily_stats SET created = created - 1 WHERE day = DATE(OLD.created_at);"
+    "IF NEW.created_at IS NOT NULL THEN INSERT INTO daily_stats (day, created, updated) "
+    "VALUES (DATE(NEW.created_at), 1, 0) ON DUPLICATE KEY UPDATE created = created + 1; END IF; END IF; "
+    "IF NOT (DATE(OLD.updated_at) <=> DATE(NEW.updated_at)) THEN "
+    "UPDATE daily_stats SET updated = updated - 1 WHERE day = DATE(OLD.updated_at);"
+    "IF NEW.updated_at IS NOT NULL THEN INSERT INTO daily_stats (day, created, updated) "
+    "VALUES (DATE(NEW.updated_at), 0, 1) ON DUPLICATE KEY UPDATE updated = updated + 1; END IF; END IF; END",
+    "CREATE TRIGGER IF NOT EXISTS task_categories_stats_ai AFTER INSERT ON task_categories FOR EACH ROW "
+    "INSERT INTO category_stats (category_id, task_count) VALUES (NEW.category_id, 1) "
+    "ON DUPLICATE KEY UPDATE task_count = task_count + 1",
+    "CREATE TRIGGER IF NOT EXISTS task_categories_stats_ad AFTER DELETE ON task_categories FOR EACH ROW "
+    "UPDATE category_stats SET task_count = task_count - 1 WHERE category_id = OLD.category_id",
+    "CREATE TRIGGER IF NOT EXISTS category_stats_ad AFTER DELETE ON category FOR EACH ROW "
+    "DELETE FROM category_stats WHERE category_id = OLD.id",
+)
+TRIGGERS = ('task_stats_ai', 'task_stats_ad', 'task_stats_au', 'task_stats_au_created', 'task_stats_au_updated',
+            'task_categories_stats_ai', 'task_categories_stats_ad', 'category_stats_ad')
+
+
+def upgrade():
+    op.create_table('category_stats',
+                    sa.Column('category_id', sa.Integer(), autoincrement=False, nullable=False),
+                    sa.Column('task_count', sa.Integer(), nullable=False),
+                    sa.PrimaryKeyConstraint('category_id')
+                    )
+    op.create_table('daily_stats',
+                    sa.Column('day', sa.Date(), nullable=False),
+                    sa.Column('created', sa.Integer(), nullable=False),
+                    sa.Column('updated', sa.Integer(), nullable=False),
+                    sa.PrimaryKeyConstraint('day')
+                    )
+    # Статистика существующих задач
+    op.execute("INSERT INTO category_stats (category_id, task_count) "
+               "SELECT category_id, COUNT(*) FROM task_categories GROUP BY category_id")
+    op.execute("INSERT INTO daily_stats (day, created, updated) "
+               "SELECT day, SUM(created), SUM(updated) FROM ("
+               "SELECT DATE(created_at) AS day, 1 AS created, 0 AS updated FROM task WHERE created_at IS NOT NULL "
+               "UNION ALL "
+               "SELECT DATE(updated_at), 0, 1 FROM task WHERE updated_at IS NOT NULL"
+               ") AS task_days GROUP BY day")
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_STATS_DDL:
+            op.execute(statement)
+    elif dialect == 'mysql':
+        for statement in MYSQL_STATS_DDL:
+            op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name in ('sqlite', 'mysql'):
+        for trigger in TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.drop_table('daily_stats')
+    op.drop_table('category_stats')
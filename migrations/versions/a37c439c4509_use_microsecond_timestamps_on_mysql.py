@@ -0,0 +1,34 @@
+"""use microsecond timestamps for Task on MySQL
+
+Revision ID: a37c439c4509
+Revises: 294b55be793f
+Create Date: 2026-10-18 12:20:05.613840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a37c439c4509'
+down_revision = '294b55be793f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite хранит дату строкой и не теряет микросекунды, менять нужно только MySQL
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.alter_column('created_at', type_=mysql.DATETIME(fsp=6), existing_nullable=True)
+        batch_op.alter_column('updated_at', type_=mysql.DATETIME(fsp=6), existing_nullable=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.alter_column('updated_at', type_=sa.DateTime(), existing_nullable=True)
+        batch_op.alter_column('created_at', type_=sa.DateTime(), existing_nullable=True)
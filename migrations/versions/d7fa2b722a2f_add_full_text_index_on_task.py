@@ -0,0 +1,52 @@
+"""add full-text index on Task title and description
+
+Revision ID: d7fa2b722a2f
+Revises: dcee0d23c7b0
+Create Date: 2026-10-18 14:37:52.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7fa2b722a2f'
+down_revision = 'dcee0d23c7b0'
+branch_labels = None
+depends_on = None
+
+# Копия DDL из todo_app.search на момент создания ревизии
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS task_fts "
+    "USING fts5(title, description, content='task', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_ai AFTER INSERT ON task BEGIN "
+    "INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_ad AFTER DELETE ON task BEGIN "
+    "INSERT INTO task_fts(task_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_au AFTER UPDATE OF title, description ON task BEGIN "
+    "INSERT INTO task_fts(task_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+        # Индексируем уже существующие задачи
+        op.execute("INSERT INTO task_fts(task_fts) VALUES ('rebuild')")
+    elif dialect == 'mysql':
+        op.execute("ALTER TABLE task ADD FULLTEXT INDEX ft_task_title_description (title, description)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('task_fts_au', 'task_fts_ad', 'task_fts_ai'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS task_fts")
+    elif dialect == 'mysql':
+        op.execute("ALTER TABLE task DROP INDEX ft_task_title_description")
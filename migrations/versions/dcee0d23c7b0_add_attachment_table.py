@@ -0,0 +1,44 @@
+"""add Attachment table and Task.attachment_id
+
+Revision ID: dcee0d23c7b0
+Revises: a37c439c4509
+Create Date: 2026-10-18 13:41:19.027734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'dcee0d23c7b0'
+down_revision = 'a37c439c4509'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    timestamp = sa.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+    op.create_table('attachment',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('sha256', sa.String(length=64), nullable=False),
+                    sa.Column('file_path', sa.String(length=300), nullable=False),
+                    sa.Column('size', sa.BigInteger(), nullable=False),
+                    sa.Column('ref_count', sa.Integer(), nullable=False),
+                    sa.Column('created_at', timestamp, nullable=True),
+                    sa.Column('updated_at', timestamp, nullable=True),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.UniqueConstraint('sha256')
+                    )
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('attachment_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_task_attachment_id', ['attachment_id'], unique=False)
+        batch_op.create_foreign_key('fk_task_attachment_id', 'attachment', ['attachment_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_task_attachment_id', type_='foreignkey')
+        batch_op.drop_index('ix_task_attachment_id')
+        batch_op.drop_column('attachment_id')
+    op.drop_table('attachment')
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import unittest
+from unittest import mock
+from todo_app.cache import LRUBackend
+
+
+class TestLRUBackend(unittest.TestCase):
+
+    def test_get_and_set(self):
+        backend = LRUBackend(max_entries=2, ttl=30)
+        backend.set('a', 1)
+        self.assertEqual(backend.get('a'), 1)
+        self.assertIsNone(backend.get('b'))
+
+    def test_evicts_least_recently_used(self):
+        backend = LRUBackend(max_entries=2, ttl=30)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)
+        self.assertEqual(backend.get('a'), 1)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(len(backend), 2)
+
+    def test_entry_expires(self):
+        backend = LRUBackend(max_entries=2, ttl=30)
+        with mock.patch('todo_app.cache.time.monotonic', return_value=100):
+            backend.set('a', 1)
+        with mock.patch('todo_app.cache.time.monotonic', return_value=131):
+            self.assertIsNone(backend.get('a'))
+        self.assertEqual(len(backend), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import io
+import unittest
+from todo_app import create_app
+from todo_app.changelog import record_changes
+from todo_app.importer import import_tasks
+from todo_app.models import db, ChangeLog, Task
+
+
+class TestChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('todo_app.config.TestConfig')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def changes(self, since=None, limit=None):
+        query = {'since': since, 'limit': limit}
+        response = self.client.get('/tasks/changes', query_string={k: v for k, v in query.items() if v is not None})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_task_changes(self):
+        first = self.client.post('/tasks', json={'title': 'First', 'categories': ['Work']}).get_json()['id']
+        second = self.client.post('/tasks', json={'title': 'Second'}).get_json()['id']
+
+        data = self.changes()
+        self.assertEqual([task['title'] for task in data['tasks']], ['First', 'Second'])
+        self.assertEqual(data['tasks'][0]['categories'], ['Work'])
+        self.assertEqual([category['name'] for category in data['categories']], ['Work'])
+        self.assertFalse(data['has_more'])
+        since = data['next_since']
+
+        self.assertEqual(self.changes(since)['tasks'], [])
+        self.client.put(f'/tasks/{first}', json={'title': 'First updated'})
+        self.client.delete(f'/tasks/{second}')
+        data = self.changes(since)
+        self.assertEqual([task['title'] for task in data['tasks']], ['First updated'])
+        self.assertEqual(data['deleted_tasks'], [second])
+        self.assertEqual(data['categories'], [])
+        # Для каждой сущности хранится только последнее изменение
+        self.assertEqual(ChangeLog.query.count(), 3)
+
+    def test_paging(self):
+        for i in range(5):
+            self.client.post('/tasks', json={'title': f'Task {i}'})
+        titles, since, pages = [], 0, 0
+        while True:
+            data = self.changes(since, limit=2)
+            titles.extend(task['title'] for task in data['tasks'])
+            since = data['next_since']
+            pages += 1
+            if not data['has_more']:
+                break
+        self.assertEqual(titles, [f'Task {i}' for i in range(5)])
+        self.assertEqual(pages, 3)
+        self.assertEqual(self.client.get('/tasks/changes?since=abc').status_code, 400)
+
+    def test_category_deletion(self):
+        task_id = self.client.post('/tasks', json={'title': 'Task', 'categories': ['Work']}).get_json()['id']
+        category_id = self.changes()['categories'][0]['id']
+        since = self.changes()['next_since']
+
+        self.client.delete(f'/categories/{category_id}')
+        data = self.changes(since)
+        self.assertEqual(data['deleted_categories'], [category_id])
+        self.assertEqual([(task['id'], task['categories']) for task in data['tasks']], [(task_id, [])])
+
+    def test_bulk_and_import(self):
+        results = self.client.post('/tasks/bulk', json={'tasks': [{'title': 'A'}, {'title': 'B'}]}).get_json()
+        ids = [result['id'] for result in results['results']]
+        since = self.changes()['next_since']
+
+        self.client.delete('/tasks/bulk', json={'ids': ids[:1]})
+        import_tasks(io.StringIO('{"title": "Imported", "categories": ["New"]}\n'), 'ndjson', 10)
+        data = self.changes(since)
+        self.assertEqual(data['deleted_tasks'], ids[:1])
+        self.assertEqual([task['title'] for task in data['tasks']], ['Imported'])
+        self.assertEqual([category['name'] for category in data['categories']], ['New'])
+
+    def test_rollback_discards_changes(self):
+        task = Task(title='Task')
+        db.session.add(task)
+        db.session.commit()
+        record_changes('task', [task.id], deleted=True)
+        db.session.rollback()
+        db.session.commit()
+        self.assertEqual(self.changes()['deleted_tasks'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
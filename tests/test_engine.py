@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import text
+from todo_app import create_app
+from todo_app.config import TestConfig, engine_options
+from todo_app.models import db
+
+
+class FileDatabaseConfig(TestConfig):
+    SQLITE_FOLDER = tempfile.mkdtemp()
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(SQLITE_FOLDER, 'tasks.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+
+class TestEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(FileDatabaseConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(FileDatabaseConfig.SQLITE_FOLDER)
+
+    def test_engine_options(self):
+        self.assertNotIn('pool_size', engine_options('sqlite:///tasks.db'))
+        options = engine_options('mysql+pymysql://user:password@db/tasks')
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertIn('pool_size', options)
+        self.assertIn('pool_recycle', options)
+
+    def test_sqlite_pragmas(self):
+        pragmas = {name: db.session.execute(text(f'PRAGMA {name}')).scalar()
+                   for name in ('journal_mode', 'synchronous', 'busy_timeout')}
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000})
+
+    def test_health_db(self):
+        response = self.client.get('/health/db')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['status'], 'ok')
+        self.assertEqual(data['pool']['class'], 'QueuePool')
+        self.assertGreater(data['pool']['checkouts'], 0)
+        self.assertIn('checked_out', data['pool'])
+
+    def test_init_db_command(self):
+        db.drop_all()
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['wait-db', '--timeout', '1'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertFalse(db.inspect(db.engine).has_table('task'))
+
+        result = runner.invoke(args=['init-db'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertTrue(db.inspect(db.engine).has_table('task'))
+
+    def test_skip_create_all(self):
+        db.drop_all()
+
+        class NoCreateConfig(FileDatabaseConfig):
+            DB_CREATE_ALL = False
+
+        app = create_app(NoCreateConfig)
+        with app.app_context():
+            self.assertFalse(db.inspect(db.engine).has_table('task'))
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
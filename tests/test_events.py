@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from todo_app import create_app
+from todo_app.changes import Change
+from todo_app.config import TestConfig, engine_options
+from todo_app.events import Subscriber
+from todo_app.models import db
+
+
+class EventsConfig(TestConfig):
+    # Фоновый поток брокера работает с базой через собственное соединение
+    SQLITE_FOLDER = tempfile.mkdtemp()
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(SQLITE_FOLDER, 'tasks.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SSE_HEARTBEAT_INTERVAL = 0.1
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class TestEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(EventsConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.broker = self.app.extensions['change_broker']
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(EventsConfig.SQLITE_FOLDER)
+
+    def read_stream(self, chunks, headers=None):
+        response = self.client.get('/events', headers=headers or {}, buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        stream = iter(response.response)
+        try:
+            return ''.join(next(stream).decode() for _ in range(chunks))
+        finally:
+            response.close()
+
+    def test_subscriber_coalesces_updates(self):
+        subscriber = Subscriber(version=1, max_pending=10)
+        subscriber.put([(Change(1, 'task', 1, False, None), 'old'),
+                        (Change(2, 'task', 1, False, None), 'first'),
+                        (Change(3, 'task', 2, False, None), 'second')])
+        subscriber.put([(Change(4, 'task', 1, False, None), 'third')])
+        self.assertEqual(subscriber.get(0), [(3, 'second'), (4, 'third')])
+        self.assertEqual(subscriber.get(0), [])
+
+    def test_subscriber_overflow(self):
+        subscriber = Subscriber(version=0, max_pending=2)
+        subscriber.put([(Change(version, 'task', version, False, None), 'event') for version in range(1, 4)])
+        self.assertTrue(subscriber.overflowed)
+        self.assertEqual(subscriber.get(0), [])
+
+    def test_replay_from_last_event_id(self):
+        first = self.client.post('/tasks', json={'title': 'First'}).get_json()['id']
+        second = self.client.post('/tasks', json={'title': 'Second'}).get_json()['id']
+        self.client.put(f'/tasks/{first}', json={'title': 'First updated'})
+        self.client.delete(f'/tasks/{second}')
+
+        text = self.read_stream(4, headers={'Last-Event-ID': '0'})
+        self.assertTrue(text.startswith('retry: 3000'))
+        events = parse_events(text)
+        self.assertEqual([(event, data['id']) for _, event, data in events],
+                         [('task', first), ('task_deleted', second)])
+        self.assertEqual(events[0][2]['title'], 'First updated')
+        self.assertIn(': heartbeat', text)
+
+        text = self.read_stream(2, headers={'Last-Event-ID': str(events[0][0])})
+        self.assertEqual([event for _, event, _ in parse_events(text)], ['task_deleted'])
+
+    def test_broker_pushes_new_changes(self):
+        self.client.post('/tasks', json={'title': 'Before'})
+        subscriber = self.broker.subscribe()
+        try:
+            task_id = self.client.post('/tasks', json={'title': 'New', 'categories': ['Work']}).get_json()['id']
+            events = []
+            for _ in range(50):
+                events.extend(subscriber.get(0.1))
+                if len(events) >= 2:
+                    break
+            kinds = [parse_events(text)[0][1:] for _, text in events]
+            self.assertEqual(sorted(event for event, _ in kinds), ['category', 'task'])
+            self.assertIn(('task', task_id), [(event, data['id']) for event, data in kinds])
+        finally:
+            self.broker.unsubscribe(subscriber)
+
+    def test_idle_subscribers_in_threads(self):
+        # Процесс удерживает тысячи ожидающих подписчиков, каждый в своем потоке,
+        # как потоки событий в рабочем процессе gthread с большим GUNICORN_THREADS
+        count = 2000
+        self.broker.max_subscribers = count
+        subscribers = [self.broker.subscribe() for _ in range(count)]
+        received = []
+
+        def wait(subscriber):
+            events = []
+            while not events:
+                events = subscriber.get(5)
+            received.append(events)
+
+        threads = [threading.Thread(target=wait, args=(subscriber,)) for subscriber in subscribers]
+        try:
+            for thread in threads:
+                thread.start()
+            self.client.post('/tasks', json={'title': 'Broadcast'})
+            for thread in threads:
+                thread.join(30)
+        finally:
+            for subscriber in subscribers:
+                self.broker.unsubscribe(subscriber)
+        self.assertEqual(len(received), count)
+
+    def test_stream_limit(self):
+        self.broker.max_subscribers = 1
+        response = self.client.get('/events', buffered=False)
+        try:
+            next(iter(response.response))
+            # Сверх ограничения поток событий не открывается, обычные запросы обслуживаются
+            rejected = self.client.get('/events')
+            self.assertEqual(rejected.status_code, 503)
+            self.assertEqual(rejected.headers['Retry-After'], '3')
+            self.assertEqual(self.client.get('/tasks').status_code, 200)
+        finally:
+            response.close()
+        self.assertEqual(self.read_stream(1), 'retry: 3000\n\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
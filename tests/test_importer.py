@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from sqlalchemy import text
+from todo_app import create_app
+from todo_app.dialects import insert_multirow_returning_ids
+from todo_app.models import db, Task, Category
+
+
+class TestImporter(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('todo_app.config.TestConfig')
+        self.client = self.app.test_client()
+        self.runner = self.app.test_cli_runner()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add(Category(name='General'))
+        db.session.commit()
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def write_file(self, name, content):
+        path = os.path.join(self.folder, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_import_ndjson(self):
+        lines = [json.dumps({'title': f'Imported {i}', 'categories': ['General', 'Imported']}) for i in range(5)]
+        lines[2] = json.dumps({'description': 'No title'})
+        lines.insert(3, '{broken')
+        path = self.write_file('tasks.ndjson', '\n'.join(lines) + '\n')
+
+        result = self.runner.invoke(args=['tasks', 'import', path, '--batch-size', '2'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Line 3: Title is required', result.output)
+        self.assertIn('Line 4: Invalid JSON', result.output)
+        self.assertIn('Done: imported 4 tasks, rejected 2', result.output)
+
+        self.assertEqual(Task.query.count(), 4)
+        self.assertEqual(Category.query.count(), 2)
+        task = Task.query.filter_by(title='Imported 4').one()
+        self.assertEqual(sorted(category.name for category in task.categories), ['General', 'Imported'])
+
+        # Полнотекстовый индекс построен для импортированных задач, триггер восстановлен
+        data = json.loads(self.client.get('/tasks?q=imported').data)
+        self.assertEqual(len(data['tasks']), 4)
+        self.assertTrue(db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'task_fts_ai'")).first())
+        self.client.post('/tasks', json={'title': 'Created imported'})
+        self.assertEqual(len(json.loads(self.client.get('/tasks?q=imported').data)['tasks']), 5)
+
+    def test_import_csv_with_checkpoint(self):
+        rows = ['title,description,categories'] + [f'Task {i},Description {i},General;Work' for i in range(6)]
+        path = self.write_file('tasks.csv', '\n'.join(rows) + '\n')
+        checkpoint = os.path.join(self.folder, 'import.checkpoint')
+        # Первые четыре записи уже были импортированы прерванным запуском
+        with open(checkpoint, 'w') as f:
+            f.write('4')
+
+        result = self.runner.invoke(args=['tasks', 'import', path, '--checkpoint', checkpoint])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual([task.title for task in Task.query.order_by(Task.id)], ['Task 4', 'Task 5'])
+        self.assertEqual(Task.query.first().description, 'Description 4')
+        with open(checkpoint) as f:
+            self.assertEqual(f.read(), '6')
+
+        # Повторный запуск с той же позицией ничего не импортирует
+        result = self.runner.invoke(args=['tasks', 'import', path, '--checkpoint', checkpoint])
+        self.assertIn('Done: imported 0 tasks', result.output)
+        self.assertEqual(Task.query.count(), 2)
+
+    def test_import_own_export(self):
+        self.client.post('/tasks', json={'title': 'Described', 'description': 'Text', 'categories': ['General']})
+        self.client.post('/tasks', json={'title': 'Without description', 'categories': ['Work']})
+        exported = self.client.get('/tasks/export').get_data(as_text=True)
+        self.assertIn('"description":null', exported.replace(' ', ''))
+        path = self.write_file('export.ndjson', exported)
+        db.session.execute(text('DELETE FROM task_categories'))
+        db.session.execute(text('DELETE FROM task'))
+        db.session.commit()
+
+        result = self.runner.invoke(args=['tasks', 'import', path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Done: imported 2 tasks, rejected 0', result.output)
+        tasks = {task.title: task for task in Task.query.all()}
+        self.assertEqual(tasks['Described'].description, 'Text')
+        self.assertIsNone(tasks['Without description'].description)
+        self.assertEqual([category.name for category in tasks['Without description'].categories], ['Work'])
+
+    def test_import_rejects_unexpected_types(self):
+        path = self.write_file('tasks.ndjson', json.dumps({'title': 'Task', 'categories': 'General'}) + '\n' +
+                               json.dumps({'title': ['Task']}) + '\n' + json.dumps({'title': 'Valid'}) + '\n')
+        result = self.runner.invoke(args=['tasks', 'import', path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Done: imported 1 tasks, rejected 2', result.output)
+
+    def test_import_multirow_insert(self):
+        # Путь диалектов без упорядоченного RETURNING (MySQL): многострочный INSERT,
+        # ключи читаются обратно по времени создания пачки
+        db.session.add(Task(title='Existing'))
+        db.session.commit()
+        lines = [json.dumps({'title': f'Imported {i}', 'categories': [f'Category {i}']}) for i in range(5)]
+        path = self.write_file('tasks.ndjson', '\n'.join(lines) + '\n')
+
+        with mock.patch('todo_app.importer.insert_returning_ids', insert_multirow_returning_ids):
+            result = self.runner.invoke(args=['tasks', 'import', path, '--batch-size', '2'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Done: imported 5 tasks, rejected 0', result.output)
+        for i in range(5):
+            task = Task.query.filter_by(title=f'Imported {i}').one()
+            self.assertEqual([category.name for category in task.categories], [f'Category {i}'])
+        self.assertEqual(Task.query.filter_by(title='Existing').one().categories, [])
+
+    def test_multirow_insert_without_batch_key(self):
+        # Без ключа пачки и без гарантии непрерывных ключей строки вставляются по одной
+        ids = insert_multirow_returning_ids(Task, [{'title': 'First'}, {'title': 'Second'}])
+        self.assertEqual([db.session.get(Task, task_id).title for task_id in ids], ['First', 'Second'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from todo_app import create_app
+from todo_app.config import TestConfig
+from todo_app.jobs import JOB_HANDLERS, JobStore, enqueue_after_commit, job
+from todo_app.models import db, Task
+
+calls = []
+
+
+@job('test_record')
+def record(value):
+    calls.append(value)
+
+
+@job('test_flaky')
+def flaky(value):
+    calls.append(value)
+    if len(calls) < 3:
+        raise OSError('Temporary failure')
+
+
+class ThreadedJobsConfig(TestConfig):
+    JOBS_EAGER = False
+    JOBS_RETRY_DELAY = 0.01
+    JOBS_POLL_INTERVAL = 0.05
+
+
+class TestJobs(unittest.TestCase):
+
+    def setUp(self):
+        calls.clear()
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def create_app(self, config):
+        app = create_app(config)
+        app_context = app.app_context()
+        app_context.push()
+        self.addCleanup(app_context.pop)
+        db.create_all()
+        self.addCleanup(db.session.remove)
+        return app
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_after_commit(self):
+        self.create_app(TestConfig)
+        db.session.add(Task(title='Task'))
+        enqueue_after_commit('test_record', 'rolled back')
+        db.session.rollback()
+        db.session.add(Task(title='Task'))
+        enqueue_after_commit('test_record', 'committed')
+        self.assertEqual(calls, [])
+        db.session.commit()
+        self.assertEqual(calls, ['committed'])
+
+    def test_retries(self):
+        app = self.create_app(ThreadedJobsConfig)
+        jobs = app.extensions['jobs']
+        jobs.enqueue('test_flaky', 'attempt')
+        self.wait_for(lambda: jobs.stats['completed'] == 1)
+        self.assertEqual(calls, ['attempt'] * 3)
+        self.assertEqual(jobs.stats['retried'], 2)
+        self.assertEqual(jobs.depth(), 0)
+        self.assertRaises(ValueError, jobs.enqueue, 'unknown')
+
+    def test_persisted_jobs_survive_restart(self):
+        path = os.path.join(self.folder, 'jobs.db')
+        # Задание, взятое процессом, который завершился, не выполнив его
+        JobStore(path, lease=300).add('test_record', ['recovered'])
+        with sqlite3.connect(path) as connection:
+            connection.execute('UPDATE job SET claimed_until = 0')
+
+        config = type('PersistentJobsConfig', (ThreadedJobsConfig,), {'JOBS_DATABASE': path})
+        app = self.create_app(config)
+        app.test_client().get('/categories')
+        self.wait_for(lambda: calls == ['recovered'])
+        self.wait_for(lambda: sqlite3.connect(path).execute('SELECT COUNT(*) FROM job').fetchone()[0] == 0)
+
+    def test_registered_jobs(self):
+        self.assertIn('remove_files', JOB_HANDLERS)
+        self.assertIn('remove_stale_file', JOB_HANDLERS)
+
+
+if __name__ == '__main__':
+    unittest.main()
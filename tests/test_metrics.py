@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import unittest
+from todo_app import create_app
+from todo_app.config import TestConfig
+from todo_app.metrics import Histogram
+from todo_app.models import db
+
+
+class MetricsConfig(TestConfig):
+    METRICS_ENABLED = True
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(MetricsConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_server_timing(self):
+        self.client.post('/tasks', json={'title': 'Task', 'categories': ['General']})
+        response = self.client.get('/tasks')
+        timing = response.headers['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        # Задачи, категории и общее поколение кэша (счетчик версий журнала изменений)
+        self.assertIn('desc="3 queries"', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_metrics_endpoint(self):
+        self.client.get('/tasks')
+        self.client.get('/tasks')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.get_data(as_text=True)
+        self.assertIn('# TYPE todo_request_duration_seconds histogram', text)
+        self.assertIn('todo_request_duration_seconds_count{endpoint="tasks.get_tasks",method="GET"} 2', text)
+        # Промах: поколение кэша и задачи; попадание: только поколение кэша
+        self.assertIn('todo_request_sql_statements_bucket{endpoint="tasks.get_tasks",method="GET",le="1"} 1', text)
+        self.assertIn('todo_request_sql_statements_bucket{endpoint="tasks.get_tasks",method="GET",le="2"} 2', text)
+        self.assertIn('todo_response_cache_hits_total 1', text)
+        self.assertIn('todo_job_queue_depth 0', text)
+        self.assertNotIn('endpoint="metrics"', text)
+
+    def test_disabled(self):
+        app = create_app('todo_app.config.TestConfig')
+        client = app.test_client()
+        self.assertNotIn('Server-Timing', client.get('/categories').headers)
+        self.assertEqual(client.get('/metrics').status_code, 404)
+
+    def test_histogram_buckets(self):
+        histogram = Histogram('test_seconds', 'Test.', ('endpoint',), (0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(('a',), value)
+        lines = histogram.expose()
+        self.assertIn('test_seconds_bucket{endpoint="a",le="0.1"} 2', lines)
+        self.assertIn('test_seconds_bucket{endpoint="a",le="1"} 3', lines)
+        self.assertIn('test_seconds_bucket{endpoint="a",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_count{endpoint="a"} 4', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
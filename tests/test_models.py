@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 import unittest
+from sqlalchemy.exc import IntegrityError
 from todo_app.models import db, Task, Category
-from app import create_app
+from todo_app import create_app
 
 
 class TestModels(unittest.TestCase):
@@ -94,5 +95,13 @@ class TestModels(unittest.TestCase):
             db.session.commit()
 
 
+    def test_category_name_unique(self):
+        db.session.add(Category(name='Test Category'))
+        db.session.commit()
+
+        with self.assertRaises(IntegrityError):
+            db.session.add(Category(name='Test Category'))
+            db.session.commit()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import unittest
+from todo_app import create_app
+from todo_app.config import TestConfig
+from todo_app.models import db
+
+
+class NoSlowQueryLogConfig(TestConfig):
+    SLOW_QUERY_THRESHOLD_MS = 0
+
+
+class SlowQueryConfig(TestConfig):
+    # Любой запрос считается медленным
+    SLOW_QUERY_THRESHOLD_MS = 1e-6
+
+
+class TestSlowQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SlowQueryConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_slow_query_logged_with_plan(self):
+        with self.assertLogs('todo_app.slow_queries', level='WARNING') as logs:
+            response = self.client.get('/tasks?category=General&sort=title')
+        self.assertEqual(response.status_code, 200)
+        message = next(line for line in logs.output if 'FROM task' in line)
+        self.assertIn('Slow query', message)
+        self.assertIn("endpoint=tasks.get_tasks", message)
+        self.assertIn("'category': ['General']", message)
+        self.assertIn('parameters:', message)
+        self.assertIn('plan:', message)
+
+    def test_disabled_by_threshold(self):
+        app = create_app(NoSlowQueryLogConfig)
+        with self.assertNoLogs('todo_app.slow_queries', level='WARNING'):
+            app.test_client().get('/tasks')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import delete, update
+from todo_app import create_app
+from todo_app.models import db, CategoryStats, Task
+from todo_app.stats import aggregate_category_counts, aggregate_daily_counts
+
+
+class TestStats(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('todo_app.config.TestConfig')
+        self.client = self.app.test_client()
+        self.runner = self.app.test_cli_runner()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def stats(self, query=''):
+        response = self.client.get('/stats' + query)
+        self.assertEqual(response.status_code, 200, response.data)
+        return json.loads(response.data)
+
+    def assert_consistent(self, data):
+        # Счетчики, поддерживаемые триггерами, совпадают с подсчетом по таблице задач
+        counts = aggregate_category_counts()
+        self.assertEqual({category['id']: category['tasks'] for category in data['categories']},
+                         {category['id']: counts.get(category['id'], 0) for category in data['categories']})
+        self.assertEqual(data['days'], [{'date': day.isoformat(), **day_counts}
+                                        for day, day_counts in sorted(aggregate_daily_counts().items())])
+
+    def test_counters_follow_writes(self):
+        first = self.client.post('/tasks', json={'title': 'First', 'categories': ['Work', 'Home']}).get_json()['id']
+        second = self.client.post('/tasks', json={'title': 'Second', 'categories': ['Work']}).get_json()['id']
+        third = self.client.post('/tasks', json={'title': 'Third', 'categories': ['Home']}).get_json()['id']
+        today = datetime.utcnow().date().isoformat()
+
+        data = self.stats()
+        self.assertEqual(data['tasks'], 3)
+        self.assertEqual({category['name']: category['tasks'] for category in data['categories']},
+                         {'Home': 2, 'Work': 2})
+        self.assertEqual(data['days'], [{'date': today, 'created': 3, 'updated': 3}])
+
+        # Задача, измененная в другой день, переходит в другую группу по updated_at
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        db.session.execute(update(Task).where(Task.id == first).values(created_at=yesterday, updated_at=yesterday))
+        db.session.commit()
+        self.client.put(f'/tasks/{second}', json={'title': 'Second updated', 'categories': ['Home']})
+        self.client.delete(f'/tasks/{third}')
+        self.client.delete('/categories/' + str(next(category['id'] for category in data['categories']
+                                                       if category['name'] == 'Work')))
+
+        data = self.stats()
+        self.assertEqual(data['tasks'], 2)
+        self.assertEqual([(category['name'], category['tasks']) for category in data['categories']], [('Home', 2)])
+        self.assertEqual(data['days'], [{'date': yesterday.date().isoformat(), 'created': 1, 'updated': 0},
+                                        {'date': today, 'created': 1, 'updated': 2}])
+        self.assert_consistent(data)
+
+        data = self.stats(f'?from={today}')
+        self.assertEqual(data['tasks'], 2)
+        self.assertEqual([day['date'] for day in data['days']], [today])
+        self.assertEqual(self.client.get('/stats?from=yesterday').status_code, 400)
+
+    def test_bulk_writes_and_rebuild(self):
+        path = os.path.join(self.folder, 'tasks.ndjson')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps({'title': f'Imported {i}', 'categories': ['Imported']}) + '\n' for i in range(5))
+        result = self.runner.invoke(args=['tasks', 'import', path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        ids = [task.id for task in Task.query.order_by(Task.id).limit(2)]
+        response = self.client.delete('/tasks/bulk', json={'ids': ids})
+        self.assertEqual(response.status_code, 200, response.data)
+
+        data = self.stats()
+        self.assertEqual(data['tasks'], 3)
+        self.assertEqual(data['categories'][0]['tasks'], 3)
+        self.assert_consistent(data)
+
+        # Пересчет не меняет журнал изменений, поэтому ответ /stats не кэшируется
+        db.session.execute(delete(CategoryStats))
+        db.session.commit()
+        self.assertEqual(self.stats()['categories'][0]['tasks'], 0)
+
+        result = self.runner.invoke(args=['stats', 'rebuild'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('1 categories', result.output)
+        self.assertEqual(self.stats(), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
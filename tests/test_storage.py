@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from todo_app import create_app
+from todo_app.config import TestConfig
+from todo_app.models import db, Attachment, Task
+from todo_app.storage import attach_file, collect_garbage, register_attachment, release_files
+
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('todo_app.config.TestConfig')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.upload_folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.upload_folder)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_blob(self, name, content=b'content'):
+        path = os.path.join(self.upload_folder, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_reference_counting(self):
+        path = self.create_blob('a' * 64 + '.png')
+        attachment = register_attachment(path, 'a' * 64, 7)
+        tasks = [Task(title='Task 1'), Task(title='Task 2')]
+        for task in tasks:
+            attach_file(task, attachment)
+        db.session.add_all(tasks)
+        db.session.commit()
+        self.assertEqual(db.session.get(Attachment, attachment.id).ref_count, 2)
+
+        release_files([tasks[0]])
+        db.session.delete(tasks[0])
+        db.session.commit()
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Attachment, attachment.id).ref_count, 1)
+
+        # Файл используется второй задачей и не удаляется сборщиком мусора
+        self.assertEqual(collect_garbage(self.upload_folder, 0), 0)
+        self.assertTrue(os.path.exists(path))
+
+    def test_collect_garbage(self):
+        used = self.create_blob('b' * 64 + '.png')
+        task = Task(title='Task')
+        attach_file(task, register_attachment(used, 'b' * 64, 7))
+        db.session.add(task)
+        orphan = self.create_blob('c' * 64 + '.pdf')
+        register_attachment(orphan, 'c' * 64, 7)
+        unregistered = self.create_blob('d' * 64 + '.pdf')
+        temp = self.create_blob('.upload-abc')
+        unmanaged = self.create_blob('readme.txt')
+        used_thumbnail = self.create_blob('b' * 64 + '.64.png')
+        orphan_thumbnail = self.create_blob('c' * 64 + '.64.png')
+        db.session.commit()
+
+        # Свежие файлы защищены периодом ожидания
+        self.assertEqual(collect_garbage(self.upload_folder, 3600), 0)
+
+        self.assertEqual(collect_garbage(self.upload_folder, 0), 4)
+        self.assertEqual(sorted(os.listdir(self.upload_folder)),
+                         sorted(os.path.basename(path) for path in (used, unmanaged, used_thumbnail)))
+        self.assertEqual([attachment.sha256 for attachment in Attachment.query.all()], ['b' * 64])
+        self.assertFalse(os.path.exists(temp) or os.path.exists(unregistered) or os.path.exists(orphan) or
+                         os.path.exists(orphan_thumbnail))
+
+    def test_gc_command_removes_files_before_exit(self):
+        # Команда может завершиться до выполнения фоновых заданий: файлы удаляются в ней самой
+        self.app.config['UPLOAD_FOLDER'] = self.upload_folder
+        orphan = self.create_blob('c' * 64 + '.pdf')
+        register_attachment(orphan, 'c' * 64, 7)
+        db.session.commit()
+
+        with mock.patch.object(self.app.extensions['jobs'], 'enqueue'):
+            result = self.app.test_cli_runner().invoke(args=['attachments', 'gc', '--grace-period', '0'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Removed 1 files', result.output)
+        self.assertFalse(os.path.exists(orphan))
+
+    def test_create_app_does_not_start_garbage_collector(self):
+        # Сборщик мусора запускается сервером один раз, а не каждым экземпляром приложения (CLI, рабочие процессы)
+        class Config(TestConfig):
+            ATTACHMENT_GC_INTERVAL = 3600
+
+        create_app(Config)
+        self.assertNotIn('attachment-gc', [thread.name for thread in threading.enumerate()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from todo_app import create_app
+from todo_app.models import db, Attachment, ChangeLog, DailyStats
+from todo_app.thumbnails import Image, generate_thumbnails, thumbnail_path
+
+
+class TestThumbnails(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('todo_app.config.TestConfig')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.upload_folder = tempfile.mkdtemp()
+        self.app.config['UPLOAD_FOLDER'] = self.upload_folder
+
+    def tearDown(self):
+        shutil.rmtree(self.upload_folder)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def upload(self, content, filename):
+        response = self.client.post('/tasks', data={'title': 'Task', 'file': (io.BytesIO(content), filename)})
+        self.assertEqual(response.status_code, 201, response.data)
+        return json.loads(response.data)
+
+    def test_thumbnail_path(self):
+        self.assertEqual(thumbnail_path('uploads/abc.jpeg', 64), 'uploads/abc.64.jpg')
+        self.assertEqual(thumbnail_path('uploads/abc.gif', 256), 'uploads/abc.256.png')
+
+    def test_thumbnail_links(self):
+        task = self.upload(b'not an image', 'image.png')
+        self.assertEqual(task['thumbnails'], {})
+
+        # Миниатюры, созданные фоновым заданием
+        attachment = Attachment.query.one()
+        attachment.thumbnail_sizes = '64'
+        db.session.commit()
+        with open(thumbnail_path(attachment.file_path, 64), 'wb') as f:
+            f.write(b'thumbnail')
+
+        url = f"/tasks/{task['id']}/thumbnails/64"
+        data = json.loads(self.client.get(f"/tasks/{task['id']}").data)
+        self.assertEqual(data['thumbnails'], {'64': url})
+        data = json.loads(self.client.get('/tasks?fields=id,thumbnails').data)
+        self.assertEqual(data['tasks'], [{'id': task['id'], 'thumbnails': {'64': url}}])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'thumbnail')
+        response.close()
+        self.assertEqual(self.client.get(f"/tasks/{task['id']}/thumbnails/256").status_code, 404)
+
+    @unittest.skipUnless(Image, 'Pillow is not installed')
+    def test_generate_thumbnails(self):
+        image = io.BytesIO()
+        Image.new('RGB', (800, 400), 'red').save(image, 'JPEG')
+        task = self.upload(image.getvalue(), 'photo.jpg')
+
+        data = json.loads(self.client.get(f"/tasks/{task['id']}").data)
+        self.assertEqual(sorted(data['thumbnails']), ['256', '64'])
+        response = self.client.get(data['thumbnails']['64'])
+        with Image.open(io.BytesIO(response.data)) as thumbnail:
+            self.assertEqual(thumbnail.size, (64, 32))
+        response.close()
+
+        # Файл, который не удалось прочитать как изображение, не обрабатывается повторно
+        task = self.upload(b'broken', 'broken.gif')
+        self.assertEqual(json.loads(self.client.get(f"/tasks/{task['id']}").data)['thumbnails'], {})
+        self.assertEqual(Attachment.query.filter_by(file_path=task['file_path']).one().thumbnail_sizes, '')
+
+    @unittest.skipUnless(Image, 'Pillow is not installed')
+    def test_generate_thumbnails_keeps_updated_at(self):
+        image = io.BytesIO()
+        Image.new('RGB', (100, 100), 'blue').save(image, 'PNG')
+        task = self.upload(image.getvalue(), 'photo.png')
+        # Задание еще не выполнялось
+        attachment = Attachment.query.one()
+        attachment.thumbnail_sizes = None
+        db.session.commit()
+        before = self.client.get(f"/tasks/{task['id']}")
+        version = ChangeLog.query.filter_by(entity='task', entity_id=task['id']).one().version
+        updated = [(row.day, row.updated) for row in DailyStats.query.order_by(DailyStats.day)]
+
+        generate_thumbnails(attachment.id)
+
+        after = self.client.get(f"/tasks/{task['id']}")
+        self.assertEqual(sorted(after.get_json()['thumbnails']), ['256', '64'])
+        # Миниатюры — не изменение задачи: updated_at и статистика не меняются,
+        # а журнал изменений и ETag сообщают клиентам о новых ссылках
+        self.assertEqual(after.get_json()['updated_at'], before.get_json()['updated_at'])
+        self.assertEqual([(row.day, row.updated) for row in DailyStats.query.order_by(DailyStats.day)], updated)
+        self.assertGreater(ChangeLog.query.filter_by(entity='task', entity_id=task['id']).one().version, version)
+        self.assertNotEqual(after.headers['ETag'], before.headers['ETag'])
+        response = self.client.get(f"/tasks/{task['id']}?fields=id,title",
+                                   headers={'If-None-Match': after.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        # updated_at не изменился, поэтому If-Modified-Since для задачи с миниатюрами не проверяется
+        response = self.client.get(f"/tasks/{task['id']}",
+                                   headers={'If-Modified-Since': before.headers['Last-Modified']})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.headers.get('Last-Modified'))
+
+
+if __name__ == '__main__':
+    unittest.main()
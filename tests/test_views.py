@@ -1,8 +1,21 @@
 # -*- coding: utf-8 -*-
+import csv
+import hashlib
+import io
+import os
+import shutil
+import tempfile
 import unittest
 import json
-from app import create_app
-from todo_app.models import db, Task, Category
+from datetime import datetime
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from todo_app import create_app
+from todo_app.extensions import cache
+from todo_app.json_provider import OrjsonProvider, orjson
+from todo_app.models import db, Attachment, Task, Category
+from todo_app.pagination import encode_cursor
+from todo_app.services import not_modified_response
 
 
 class TestViews(unittest.TestCase):
@@ -112,5 +125,515 @@ class TestViews(unittest.TestCase):
         self.assertEqual(response.status_code, 400, f"Response body: {response.data}")
 
 
+    def test_get_tasks_pagination(self):
+        for i in range(5):
+            db.session.add(Task(title=f'Task {i}', description='Test Description'))
+        db.session.commit()
+
+        titles = []
+        cursor = None
+        while True:
+            query = {'sort': 'title', 'order': 'desc', 'limit': 2}
+            if cursor:
+                query['cursor'] = cursor
+            data = json.loads(self.client.get('/tasks', query_string=query).data)
+            titles.extend(task['title'] for task in data['tasks'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(titles, [f'Task {i}' for i in reversed(range(5))])
+
+    def test_get_tasks_pagination_same_sort_value(self):
+        for _ in range(3):
+            db.session.add(Task(title='Same', description='Test Description'))
+        db.session.commit()
+
+        response = self.client.get('/tasks', query_string={'sort': 'title', 'limit': 2})
+        first_page = json.loads(response.data)
+        response = self.client.get('/tasks', query_string={'sort': 'title', 'limit': 2,
+                                                           'cursor': first_page['next_cursor']})
+        second_page = json.loads(response.data)
+        ids = [task['id'] for task in first_page['tasks'] + second_page['tasks']]
+        self.assertEqual(len(set(ids)), 3)
+        self.assertIsNone(second_page['next_cursor'])
+
+    def test_get_tasks_tampered_cursor(self):
+        db.session.add(Task(title='Invoice'))
+        db.session.commit()
+        cursors = [
+            ('title', encode_cursor('title', 'asc', [1, 2], 5)),
+            ('title', encode_cursor('title', 'asc', {'a': 1}, 5)),
+            ('title', encode_cursor('title', 'asc', 'Task', [5])),
+            ('created_at', encode_cursor('created_at', 'asc', 5, 1)),
+            ('created_at', encode_cursor('created_at', 'asc', 'yesterday', 1)),
+            ('relevance', encode_cursor('relevance', 'asc', 'high', 1)),
+            ('relevance', encode_cursor('relevance', 'asc', [0.5], 1)),
+        ]
+        for sort_by, cursor in cursors:
+            query = {'sort': sort_by, 'cursor': cursor}
+            if sort_by == 'relevance':
+                query['q'] = 'invoice'
+            with self.subTest(sort=sort_by, cursor=cursor):
+                self.assertEqual(self.client.get('/tasks', query_string=query).status_code, 400)
+        query = {'sort': 'relevance', 'q': 'invoice', 'cursor': encode_cursor('relevance', 'asc', -1.5, 1)}
+        self.assertEqual(self.client.get('/tasks', query_string=query).status_code, 200)
+
+    def test_get_tasks_invalid_pagination_args(self):
+        self.assertEqual(self.client.get('/tasks?cursor=garbage').status_code, 400)
+        self.assertEqual(self.client.get('/tasks?limit=0').status_code, 400)
+        self.assertEqual(self.client.get('/tasks?sort=description').status_code, 400)
+        # Сортировка разрешена только по полям с индексом (колонка, id)
+        self.assertEqual(self.client.get('/tasks?sort=file_path').status_code, 400)
+        self.assertEqual(self.client.get('/tasks?sort=attachment_id').status_code, 400)
+
+    def test_create_task_with_new_and_duplicate_categories(self):
+        response = self.client.post('/tasks', json={'title': 'New Task',
+                                                    'categories': ['General', 'Work', 'Work', 'Home']})
+        self.assertEqual(response.status_code, 201)
+        data = json.loads(response.data)
+        self.assertEqual(sorted(data['categories']), ['General', 'Home', 'Work'])
+        self.assertEqual(Category.query.filter_by(name='Work').count(), 1)
+        self.assertEqual(Category.query.count(), 3)
+
+    def test_create_duplicate_category(self):
+        response = self.client.post('/categories', json={'name': 'General'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Category.query.filter_by(name='General').count(), 1)
+
+    def test_bulk_create_tasks(self):
+        response = self.client.post('/tasks/bulk', json={'tasks': [
+            {'title': 'Task 1', 'categories': ['General', 'Work']},
+            {'description': 'No title'},
+            {'title': 'Task 3', 'categories': ['Work']},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)['results']
+        self.assertEqual([result['status'] for result in results], [201, 400, 201])
+        task = db.session.get(Task, results[0]['id'])
+        self.assertEqual(sorted(category.name for category in task.categories), ['General', 'Work'])
+        self.assertEqual(Category.query.filter_by(name='Work').count(), 1)
+
+    def test_bulk_update_tasks(self):
+        task = Task(title='Old Task', description='Old Description')
+        db.session.add(task)
+        db.session.commit()
+
+        response = self.client.patch('/tasks/bulk', json={'tasks': [
+            {'id': task.id, 'title': 'Updated Task', 'categories': ['General']},
+            {'id': task.id + 100, 'title': 'Missing Task'},
+        ]})
+        results = json.loads(response.data)['results']
+        self.assertEqual([result['status'] for result in results], [200, 404])
+
+        data = json.loads(self.client.get(f'/tasks/{task.id}').data)
+        self.assertEqual(data['title'], 'Updated Task')
+        self.assertEqual(data['categories'], ['General'])
+
+    def test_bulk_delete_tasks(self):
+        tasks = [Task(title=f'Task {i}') for i in range(3)]
+        db.session.add_all(tasks)
+        db.session.commit()
+        ids = [task.id for task in tasks]
+
+        response = self.client.delete('/tasks/bulk', json={'ids': ids[:2] + [ids[2] + 100, 'abc']})
+        results = json.loads(response.data)['results']
+        self.assertEqual([result['status'] for result in results], [200, 200, 404, 400])
+        self.assertEqual([task.id for task in Task.query.all()], [ids[2]])
+
+    def test_bulk_create_invalid_types(self):
+        response = self.client.post('/tasks/bulk', json={'tasks': [
+            {'title': 'Null description', 'description': None},
+            {'title': 'Numeric description', 'description': 5},
+            {'title': 7},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)['results']
+        self.assertEqual([result['status'] for result in results], [201, 400, 400])
+        self.assertIsNone(db.session.get(Task, results[0]['id']).description)
+
+    def test_bulk_list_body(self):
+        response = self.client.post('/tasks/bulk', json=[1, 2])
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_too_many_items(self):
+        self.app.config['BULK_MAX_ITEMS'] = 2
+        response = self.client.post('/tasks/bulk', json={'tasks': [{'title': 'Task'}] * 3})
+        self.assertEqual(response.status_code, 400)
+
+    def count_statements(self, method, url, **kwargs):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            # Чтение общего поколения кэша (один запрос по первичному ключу) не зависит
+            # от количества задач и не учитывается
+            if 'change_counter' not in statement:
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = getattr(self.client, method)(url, **kwargs)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        return response, statements
+
+    def test_get_tasks_statement_count(self):
+        general = Category.query.filter_by(name='General').first()
+        for i in range(20):
+            task = Task(title=f'Task {i}')
+            task.categories.append(general)
+            task.categories.append(Category(name=f'Category {i}'))
+            db.session.add(task)
+        db.session.commit()
+        db.session.expunge_all()
+
+        response, statements = self.count_statements('get', '/tasks')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(len(data['tasks']), 20)
+        self.assertTrue(all('General' in task['categories'] for task in data['tasks']))
+        self.assertEqual(len(statements), 2, statements)
+
+        response, statements = self.count_statements('get', '/tasks?category=General')
+        self.assertEqual(len(json.loads(response.data)['tasks']), 20)
+        self.assertEqual(len(statements), 2, statements)
+
+        task_id = data['tasks'][0]['id']
+        response, statements = self.count_statements('get', f'/tasks/{task_id}')
+        self.assertEqual(len(json.loads(response.data)['categories']), 2)
+        self.assertEqual(len(statements), 2, statements)
+
+    def test_get_tasks_cache(self):
+        self.client.post('/tasks', json={'title': 'Task 1'})
+
+        response = self.client.get('/tasks?order=asc&sort=title')
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        response = self.client.get('/tasks?sort=title&order=asc')
+        self.assertEqual(response.headers['X-Cache'], 'HIT')
+        self.assertEqual(cache.stats()['hits'], 1)
+
+        # Запись в базу делает закэшированный ответ недоступным
+        self.client.post('/tasks', json={'title': 'Task 2'})
+        response = self.client.get('/tasks?sort=title&order=asc')
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertEqual(len(json.loads(response.data)['tasks']), 2)
+
+    def test_cache_invalidated_by_other_process(self):
+        self.client.get('/categories')
+        self.assertEqual(self.client.get('/categories').headers['X-Cache'], 'HIT')
+
+        # Запись другого процесса: кэш этого процесса не получает вызова invalidate,
+        # но счетчик версий журнала изменений в базе увеличивается
+        db.session.add(Category(name='OtherWorker'))
+        db.session.commit()
+        response = self.client.get('/categories')
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertIn('OtherWorker', [category['name'] for category in json.loads(response.data)['categories']])
+
+    def test_get_categories_cache_invalidated(self):
+        self.client.get('/categories')
+        self.client.post('/categories', json={'name': 'NewCategory'})
+        response = self.client.get('/categories')
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertIn('NewCategory', [category['name'] for category in json.loads(response.data)['categories']])
+
+    def test_get_task_etag(self):
+        task = Task(title='Test Task', description='Test Description')
+        db.session.add(task)
+        db.session.commit()
+
+        response = self.client.get(f'/tasks/{task.id}')
+        etag = response.headers['ETag']
+        self.assertIsNotNone(response.headers.get('Last-Modified'))
+
+        response = self.client.get(f'/tasks/{task.id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+        # Изменение категорий задачи меняет её ETag
+        self.client.put(f'/tasks/{task.id}', json={'title': 'Test Task', 'categories': ['General']})
+        response = self.client.get(f'/tasks/{task.id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_tasks_etag(self):
+        self.client.post('/tasks', json={'title': 'Task 1'})
+
+        etag = self.client.get('/tasks').headers['ETag']
+        response = self.client.get('/tasks', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.client.post('/tasks', json={'title': 'Task 2'})
+        response = self.client.get('/tasks', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_tasks_revalidate_after_delete(self):
+        first = json.loads(self.client.post('/tasks', json={'title': 'Task 1'}).data)['id']
+        self.client.post('/tasks', json={'title': 'Task 2'})
+        response = self.client.get('/tasks')
+        etag = response.headers['ETag']
+        self.assertIsNone(response.headers.get('Last-Modified'))
+
+        self.client.delete(f'/tasks/{first}')
+        # Удаление не меняет updated_at оставшихся задач: список проверяется только по ETag
+        response = self.client.get('/tasks', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/tasks', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task['title'] for task in json.loads(response.data)['tasks']], ['Task 2'])
+        with self.app.test_request_context(headers={'If-None-Match': response.headers['ETag']}):
+            not_modified = not_modified_response(response.headers['ETag'].strip('"'), None)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertIsNone(not_modified.headers.get('Last-Modified'))
+
+    def test_update_task_if_match(self):
+        task = Task(title='Old Task', description='Old Description')
+        db.session.add(task)
+        db.session.commit()
+        etag = self.client.get(f'/tasks/{task.id}').headers['ETag']
+
+        response = self.client.put(f'/tasks/{task.id}', json={'title': 'Updated Task'},
+                                   headers={'If-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        # Повторное обновление с устаревшим ETag отклоняется
+        response = self.client.put(f'/tasks/{task.id}', json={'title': 'Lost Update'},
+                                   headers={'If-Match': etag})
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(db.session.get(Task, task.id).title, 'Updated Task')
+
+    def test_update_task_if_match_with_query_string(self):
+        task = Task(title='Old Task')
+        db.session.add(task)
+        db.session.commit()
+        # ETag задачи не зависит от представления и параметров запроса
+        etag = self.client.get(f'/tasks/{task.id}?fields=title').headers['ETag']
+        self.assertEqual(etag, self.client.get(f'/tasks/{task.id}').headers['ETag'])
+
+        response = self.client.put(f'/tasks/{task.id}?x=1', json={'title': 'Updated Task'},
+                                   headers={'If-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(db.session.get(Task, task.id).title, 'Updated Task')
+
+    def test_create_task_with_file(self):
+        upload_folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_folder)
+        self.app.config['UPLOAD_FOLDER'] = upload_folder
+
+        response = self.client.post('/tasks', data={'title': 'Task with file', 'categories': ['General', 'Work'],
+                                                    'file': (io.BytesIO(b'first report'), 'report.pdf')})
+        self.assertEqual(response.status_code, 201, f"Response body: {response.data}")
+        data = json.loads(response.data)
+        self.assertEqual(sorted(data['categories']), ['General', 'Work'])
+        digest = hashlib.sha256(b'first report').hexdigest()
+        self.assertEqual(data['file_path'], os.path.join(upload_folder, f'{digest}.pdf'))
+
+        # Файл с тем же именем, но другим содержимым не перезаписывает первый
+        response = self.client.post('/tasks', data={'title': 'Another task',
+                                                    'file': (io.BytesIO(b'second report'), 'report.pdf')})
+        other_path = json.loads(response.data)['file_path']
+        self.assertNotEqual(other_path, data['file_path'])
+        with open(data['file_path'], 'rb') as f:
+            self.assertEqual(f.read(), b'first report')
+        self.assertEqual(sorted(os.listdir(upload_folder)),
+                         sorted(os.path.basename(path) for path in (data['file_path'], other_path)))
+
+    def test_create_task_with_too_large_file(self):
+        upload_folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_folder)
+        self.app.config['UPLOAD_FOLDER'] = upload_folder
+        self.app.config['MAX_UPLOAD_SIZE'] = 10
+
+        response = self.client.post('/tasks', data={'title': 'Task with file',
+                                                    'file': (io.BytesIO(b'x' * 100), 'big.pdf')})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(os.listdir(upload_folder), [])
+        self.assertEqual(Task.query.count(), 0)
+
+    def test_shared_attachment_survives_task_deletion(self):
+        upload_folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_folder)
+        self.app.config['UPLOAD_FOLDER'] = upload_folder
+
+        ids = []
+        for title in ('Task 1', 'Task 2'):
+            response = self.client.post('/tasks', data={'title': title,
+                                                        'file': (io.BytesIO(b'template'), 'template.png')})
+            ids.append(json.loads(response.data)['id'])
+        attachment = Attachment.query.one()
+        self.assertEqual(attachment.ref_count, 2)
+
+        self.client.delete(f'/tasks/{ids[0]}')
+        self.assertTrue(os.path.exists(attachment.file_path))
+        db.session.expire_all()
+        self.assertEqual(attachment.ref_count, 1)
+
+        # Замена файла у задачи освобождает ссылку на старое вложение
+        self.client.put(f'/tasks/{ids[1]}', data={'title': 'Task 2',
+                                                  'file': (io.BytesIO(b'other'), 'other.png')})
+        db.session.expire_all()
+        self.assertEqual(attachment.ref_count, 0)
+
+    def test_get_task_file(self):
+        upload_folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_folder)
+        self.app.config['UPLOAD_FOLDER'] = upload_folder
+
+        response = self.client.post('/tasks', data={'title': 'Task', 'file': (io.BytesIO(b'0123456789'), 'doc.pdf')})
+        task_id = json.loads(response.data)['id']
+
+        response = self.client.get(f'/tasks/{task_id}/file')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'0123456789')
+        self.assertEqual(response.mimetype, 'application/pdf')
+        self.assertEqual(response.headers['ETag'], '"%s"' % hashlib.sha256(b'0123456789').hexdigest())
+        self.assertIn('max-age', response.headers['Cache-Control'])
+        response.close()
+
+        response = self.client.get(f'/tasks/{task_id}/file', headers={'Range': 'bytes=2-5'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, b'2345')
+        response.close()
+
+        response = self.client.get(f'/tasks/{task_id}/file', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        self.app.config['X_ACCEL_REDIRECT_PREFIX'] = '/protected/'
+        response = self.client.get(f'/tasks/{task_id}/file')
+        self.assertEqual(response.headers['X-Accel-Redirect'],
+                         '/protected/' + hashlib.sha256(b'0123456789').hexdigest() + '.pdf')
+        self.assertEqual(response.data, b'')
+
+    def test_get_task_file_outside_upload_folder(self):
+        task = Task(title='Test Task', file_path='/etc/passwd')
+        db.session.add(task)
+        db.session.commit()
+        self.assertEqual(self.client.get(f'/tasks/{task.id}/file').status_code, 404)
+
+    def test_search_tasks(self):
+        self.client.post('/tasks', json={'title': 'Quarterly report', 'description': 'report about the report'})
+        self.client.post('/tasks', json={'title': 'Buy milk', 'description': 'and a report folder',
+                                         'categories': ['General']})
+        self.client.post('/tasks', json={'title': 'Call mom'})
+
+        data = json.loads(self.client.get('/tasks?q=report').data)
+        self.assertEqual([task['title'] for task in data['tasks']], ['Quarterly report', 'Buy milk'])
+
+        data = json.loads(self.client.get('/tasks?q=report&category=General').data)
+        self.assertEqual([task['title'] for task in data['tasks']], ['Buy milk'])
+
+        data = json.loads(self.client.get('/tasks?q=report&sort=title').data)
+        self.assertEqual([task['title'] for task in data['tasks']], ['Buy milk', 'Quarterly report'])
+
+        # Спецсимволы синтаксиса FTS5 не приводят к ошибке
+        self.assertEqual(self.client.get('/tasks?q=report" OR (').status_code, 200)
+
+    def test_search_index_follows_updates(self):
+        response = self.client.post('/tasks', json={'title': 'Old title'})
+        task_id = json.loads(response.data)['id']
+        self.client.put(f'/tasks/{task_id}', json={'title': 'Fresh title'})
+
+        self.assertEqual(json.loads(self.client.get('/tasks?q=old').data)['tasks'], [])
+        self.assertEqual(len(json.loads(self.client.get('/tasks?q=fresh').data)['tasks']), 1)
+
+        self.client.delete(f'/tasks/{task_id}')
+        self.assertEqual(json.loads(self.client.get('/tasks?q=fresh').data)['tasks'], [])
+
+    def test_search_pagination(self):
+        self.client.post('/tasks/bulk', json={'tasks': [{'title': f'Report {i}', 'description': 'report ' * i}
+                                                        for i in range(1, 6)]})
+        ids = []
+        cursor = None
+        while True:
+            query = {'q': 'report', 'limit': 2}
+            if cursor:
+                query['cursor'] = cursor
+            data = json.loads(self.client.get('/tasks', query_string=query).data)
+            ids.extend(task['id'] for task in data['tasks'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_filter_by_multiple_categories(self):
+        self.client.post('/tasks/bulk', json={'tasks': [
+            {'title': 'A', 'categories': ['Work', 'Urgent']},
+            {'title': 'B', 'categories': ['Work']},
+            {'title': 'C', 'categories': ['Home', 'Urgent']},
+            {'title': 'D'},
+        ]})
+
+        def titles(query):
+            return sorted(task['title'] for task in json.loads(self.client.get('/tasks?' + query).data)['tasks'])
+
+        self.assertEqual(titles('category=Work,Urgent'), ['A', 'B', 'C'])
+        self.assertEqual(titles('category=Work,Urgent&match=all'), ['A'])
+        self.assertEqual(titles('category=Work&category=Urgent&match=all'), ['A'])
+        self.assertEqual(titles('category=Urgent&exclude=Home'), ['A'])
+        self.assertEqual(titles('exclude=Work'), ['C', 'D'])
+        self.assertEqual(titles('category=Work,Missing&match=all'), [])
+        self.assertEqual(self.client.get('/tasks?match=some').status_code, 400)
+
+        data = json.loads(self.client.get('/tasks?category=Urgent&counts=1&limit=1').data)
+        self.assertEqual(len(data['tasks']), 1)
+        self.assertEqual(data['category_counts'], {'Work': 1, 'Urgent': 2, 'Home': 1})
+    def test_get_tasks_sparse_fields(self):
+        for i in range(3):
+            self.client.post('/tasks', json={'title': f'Task {i}', 'description': 'Long text',
+                                             'categories': ['General']})
+        db.session.expunge_all()
+
+        response, statements = self.count_statements('get', '/tasks?fields=id,title&sort=created_at&limit=2')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['tasks'][0], {'id': 1, 'title': 'Task 0'})
+        # Категории не запрошены: дополнительного запроса нет, а в SQL не читается description
+        self.assertEqual(len(statements), 1, statements)
+        self.assertNotIn('description', statements[0])
+
+        response = self.client.get(f"/tasks?fields=title&limit=2&cursor={data['next_cursor']}")
+        self.assertEqual(json.loads(response.data)['tasks'], [{'title': 'Task 2'}])
+
+        response = self.client.get('/tasks/1?fields=title,categories')
+        self.assertEqual(json.loads(response.data), {'title': 'Task 0', 'categories': ['General']})
+
+        self.assertEqual(self.client.get('/tasks?fields=title,secret').status_code, 400)
+        self.assertEqual(self.client.get('/tasks/1?fields=').status_code, 400)
+
+    @unittest.skipUnless(orjson, 'orjson is not installed')
+    def test_orjson_provider(self):
+        self.assertIsInstance(self.app.json, OrjsonProvider)
+        value = {'title': 'Задача', 'created_at': datetime(2024, 1, 2, 3, 4, 5), 'id': 1}
+        default = DefaultJSONProvider(self.app)
+        self.assertEqual(json.loads(self.app.json.dumps(value)), json.loads(default.dumps(value)))
+        response = self.app.json.response(value)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(json.loads(response.get_data()), json.loads(default.response(value).get_data()))
+
+    def test_export_tasks(self):
+        self.app.config['EXPORT_BATCH_SIZE'] = 2
+        for i in range(5):
+            self.client.post('/tasks', json={'title': f'Task {i}', 'description': 'Line, with "quotes"',
+                                             'categories': ['General'] if i % 2 else []})
+
+        response = self.client.get('/tasks/export?order=desc')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([task['title'] for task in lines], [f'Task {i}' for i in range(4, -1, -1)])
+        self.assertEqual(lines[1]['categories'], ['General'])
+
+        response = self.client.get('/tasks/export?format=csv&fields=title,description,categories&category=General')
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('attachment; filename=tasks.csv', response.headers['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(rows, [['title', 'description', 'categories'],
+                                ['Task 1', 'Line, with "quotes"', 'General'],
+                                ['Task 3', 'Line, with "quotes"', 'General']])
+
+        self.assertEqual(self.client.get('/tasks/export?format=xml').status_code, 400)
+        self.assertEqual(self.client.get('/tasks/export?sort=file_path').status_code, 400)
+
+
 if __name__ == '__main__':
     unittest.main()
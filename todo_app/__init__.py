@@ -2,7 +2,18 @@
 
 from flask import Flask
 from .config import Config
-from .extensions import db, migrate
+from .engine import init_db_command, init_engine, wait_db_command
+from .events import init_events
+from .extensions import cache, db, migrate
+from .importer import tasks_cli
+from .jobs import init_jobs
+from .json_provider import init_json_provider
+from .metrics import init_metrics
+from .slow_queries import init_slow_query_log
+from .stats import stats_cli
+from .storage import attachments_cli
+from .thumbnails import init_thumbnails
+from .uploads import UploadRequest
 from .views import tasks_blueprint
 
 
@@ -18,13 +29,28 @@ def create_app(config_class=Config):
     """
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.request_class = UploadRequest
+    init_json_provider(app)
 
     db.init_app(app)
+    init_engine(app)
     migrate.init_app(app, db)
+    cache.init_app(app)
+    init_metrics(app)
+    init_slow_query_log(app)
+    init_events(app)
+    init_jobs(app)
+    init_thumbnails(app)
 
     app.register_blueprint(tasks_blueprint)
-
-    with app.app_context():
-        db.create_all()
+    app.cli.add_command(attachments_cli)
+    app.cli.add_command(tasks_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(wait_db_command)
+    app.cli.add_command(init_db_command)
+
+    if app.config['DB_CREATE_ALL']:
+        with app.app_context():
+            db.create_all()
 
     return app
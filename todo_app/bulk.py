@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import BadRequest
+from .changelog import record_changes
+from .extensions import db
+from .models import Task, task_categories
+from .jobs import enqueue_after_commit
+from .storage import release_files
+from .services import resolve_categories, validate_task_data
+
+
+def chunked(items, size):
+    """
+    Разбивает список на последовательные части заданного размера.
+
+    Args:
+        items (list): Исходный список.
+        size (int): Размер части.
+
+    Returns:
+        generator: Части исходного списка.
+    """
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def get_bulk_items(data, key, max_items):
+    """
+    Извлекает массив элементов из тела пакетного запроса.
+
+    Args:
+        data: Тело запроса (объект JSON).
+        key (str): Ключ, под которым передан массив.
+        max_items (int): Максимальное количество элементов в одном запросе.
+
+    Returns:
+        list: Элементы пакетного запроса.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get(key), list):
+        raise BadRequest(f'A list of {key} is required')
+    if len(data[key]) > max_items:
+        raise BadRequest(f'Too many {key}, maximum is {max_items}')
+    return data[key]
+
+
+def validate_task_item(data):
+    """
+    Проверяет данные одной задачи пакетной операции или импорта
+    по правилам POST /tasks.
+
+    Args:
+        data: Данные задачи.
+    """
+    if not isinstance(data, dict):
+        raise BadRequest('Invalid task data')
+    # Типы проверяются до validate_task_data, которая вычисляет длину описания;
+    # null в описании допустим (так задачи без описания выгружает GET /tasks/export)
+    title, description = data.get('title'), data.get('description')
+    if (title is not None and not isinstance(title, str)) or \
+            (description is not None and not isinstance(description, str)):
+        raise BadRequest('Title and description must be strings')
+    validate_task_data({key: value for key, value in data.items() if value is not None})
+    categories = data.get('categories', [])
+    if not isinstance(categories, list) or not all(isinstance(name, str) for name in categories):
+        raise BadRequest('Categories must be a list of names')
+
+
+def _error(index, status, message):
+    return {'index': index, 'status': status, 'error': message}
+
+
+def _commit_chunk(results, indexes):
+    """
+    Фиксирует транзакцию части пакета. При ошибке базы данных
+    помечает все элементы части как неуспешные.
+
+    Returns:
+        bool: True, если транзакция зафиксирована.
+    """
+    try:
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        for index in indexes:
+            results[index] = _error(index, 500, 'Database error')
+        return False
+    return True
+
+
+def bulk_create_tasks(items, chunk_size):
+    """
+    Создает задачи пакетно: категории всей части пакета разрешаются одним запросом,
+    задачи вставляются пакетной вставкой, каждая часть пакета фиксируется отдельной транзакцией.
+
+    Args:
+        items (list of dict): Данные задач в формате POST /tasks.
+        chunk_size (int): Количество задач в одной транзакции.
+
+    Returns:
+        list of dict: Результат для каждого элемента в порядке запроса.
+    """
+    results = [None] * len(items)
+    for chunk in chunked(list(enumerate(items)), chunk_size):
+        valid = []
+        for index, data in chunk:
+            try:
+                validate_task_item(data)
+            except BadRequest as e:
+                results[index] = _error(index, 400, e.description)
+            else:
+                valid.append((index, data))
+        if not valid:
+            continue
+
+        categories = resolve_categories([name for _, data in valid for name in data.get('categories', [])])
+        tasks = []
+        for index, data in valid:
+            task = Task(title=data['title'], description=data.get('description'))
+            task.categories = [categories[name] for name in dict.fromkeys(data.get('categories', [])) if name]
+            tasks.append((index, task))
+        db.session.add_all(task for _, task in tasks)
+
+        try:
+            db.session.flush()
+        except SQLAlchemyError:
+            db.session.rollback()
+            for index, _ in tasks:
+                results[index] = _error(index, 500, 'Database error')
+            continue
+        created = [(index, task.id) for index, task in tasks]
+        if _commit_chunk(results, [index for index, _ in created]):
+            for index, task_id in created:
+                results[index] = {'index': index, 'status': 201, 'id': task_id}
+    return results
+
+
+def bulk_update_tasks(items, chunk_size):
+    """
+    Обновляет задачи пакетно. Каждый элемент должен содержать id задачи,
+    остальные поля обрабатываются так же, как в PUT /tasks/<id>.
+
+    Args:
+        items (list of dict): Данные задач с идентификаторами.
+        chunk_size (int): Количество задач в одной транзакции.
+
+    Returns:
+        list of dict: Результат для каждого элемента в порядке запроса.
+    """
+    results = [None] * len(items)
+    for chunk in chunked(list(enumerate(items)), chunk_size):
+        valid = []
+        for index, data in chunk:
+            try:
+                validate_task_item(data)
+                task_id = int(data.get('id'))
+            except BadRequest as e:
+                results[index] = _error(index, 400, e.description)
+            except (TypeError, ValueError):
+                results[index] = _error(index, 400, 'Task id is required')
+            else:
+                valid.append((index, task_id, data))
+        if not valid:
+            continue
+
+        tasks = {task.id: task for task in Task.query.filter(Task.id.in_({task_id for _, task_id, _ in valid}))}
+        categories = resolve_categories([name for _, task_id, data in valid if task_id in tasks
+                                         for name in data.get('categories', [])])
+        updated = []
+        for index, task_id, data in valid:
+            task = tasks.get(task_id)
+            if not task:
+                results[index] = _error(index, 404, 'Task not found')
+                continue
+            task.title = data['title']
+            if 'description' in data:
+                task.description = data['description']
+            for name in data.get('categories', []):
+                if name and categories[name] not in task.categories:
+                    task.categories.append(categories[name])
+                    task.updated_at = datetime.utcnow()
+            updated.append((index, task_id))
+
+        if updated and _commit_chunk(results, [index for index, _ in updated]):
+            for index, task_id in updated:
+                results[index] = {'index': index, 'status': 200, 'id': task_id}
+    return results
+
+
+def bulk_delete_tasks(ids, chunk_size):
+    """
+    Удаляет задачи пакетно. Ссылки на вложения освобождаются в той же транзакции,
+    файлы старого формата (без вложения) удаляются фоновым заданием после её фиксации.
+
+    Args:
+        ids (list): Идентификаторы задач.
+        chunk_size (int): Количество задач в одной транзакции.
+
+    Returns:
+        list of dict: Результат для каждого элемента в порядке запроса.
+    """
+    results = [None] * len(ids)
+    for chunk in chunked(list(enumerate(ids)), chunk_size):
+        valid = []
+        for index, task_id in chunk:
+            try:
+                valid.append((index, int(task_id)))
+            except (TypeError, ValueError):
+                results[index] = _error(index, 400, 'Invalid task id')
+        if not valid:
+            continue
+
+        rows = db.session.execute(
+            select(Task.id, Task.file_path, Task.attachment_id).where(Task.id.in_({task_id for _, task_id in valid}))
+        ).all()
+        found = {row.id for row in rows}
+        unused_files = release_files(rows)
+        if found:
+            db.session.execute(delete(task_categories).where(task_categories.c.task_id.in_(found)))
+            db.session.execute(delete(Task).where(Task.id.in_(found)))
+            record_changes('task', found, deleted=True)
+        deleted = []
+        for index, task_id in valid:
+            if task_id in found:
+                deleted.append((index, task_id))
+            else:
+                results[index] = _error(index, 404, 'Task not found')
+
+        if unused_files:
+            enqueue_after_commit('remove_files', unused_files)
+        if deleted and _commit_chunk(results, [index for index, _ in deleted]):
+            for index, task_id in deleted:
+                results[index] = {'index': index, 'status': 200, 'id': task_id}
+    return results
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request
+from werkzeug.utils import import_string
+
+
+class NullBackend(object):
+    """
+    Хранилище, которое ничего не сохраняет. Используется, когда кэш отключен.
+    """
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class LRUBackend(object):
+    """
+    Хранилище в памяти процесса с вытеснением давно не использованных записей и временем жизни.
+
+    Attributes:
+        max_entries (int): Максимальное количество записей.
+        ttl (float): Время жизни записи в секундах.
+    """
+
+    def __init__(self, max_entries=1024, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Встроенные хранилища, доступные по имени в CACHE_BACKEND
+BACKENDS = {
+    'lru': LRUBackend,
+    'null': NullBackend,
+}
+
+
+class _CacheState(object):
+    """
+    Состояние кэша конкретного приложения: хранилище, поколение данных и счетчики.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+
+class ResponseCache(object):
+    """
+    Кэш ответов GET-эндпоинтов.
+
+    Ключ кэша включает эндпоинт, аргументы маршрута, нормализованные параметры запроса
+    и номер поколения данных. Любая запись в базу увеличивает поколение, поэтому
+    устаревшие ответы никогда не отдаются: они просто перестают находиться по ключу
+    и со временем вытесняются из хранилища.
+
+    Поколение состоит из счетчика процесса (invalidate) и общего для всех процессов
+    значения, которое читается при каждом запросе функцией, зарегистрированной через
+    shared_generation (счетчик версий журнала изменений). Поэтому запись, сделанная
+    другим рабочим процессом gunicorn или командой CLI, тоже делает ответы недоступными.
+    """
+
+    def __init__(self, app=None):
+        self._shared_generation = None
+        if app is not None:
+            self.init_app(app)
+
+    def shared_generation(self, func):
+        """
+        Регистрирует функцию, возвращающую общее для всех процессов поколение данных.
+
+        Args:
+            func (callable): Функция без аргументов, вызывается в контексте приложения.
+
+        Returns:
+            callable: Та же функция.
+        """
+        self._shared_generation = func
+        return func
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_ENABLED', True)
+        app.config.setdefault('CACHE_BACKEND', 'lru')
+        app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('CACHE_TTL', 30)
+
+        if app.config['CACHE_ENABLED']:
+            backend_class = app.config['CACHE_BACKEND']
+            if isinstance(backend_class, str):
+                backend_class = BACKENDS.get(backend_class) or import_string(backend_class)
+            backend = backend_class(max_entries=app.config['CACHE_MAX_ENTRIES'], ttl=app.config['CACHE_TTL'])
+        else:
+            backend = NullBackend()
+        app.extensions['response_cache'] = _CacheState(backend)
+
+    @property
+    def _state(self):
+        return current_app.extensions['response_cache']
+
+    def invalidate(self):
+        """
+        Увеличивает поколение данных. Вызывается после фиксации транзакции,
+        изменившей задачи или категории.
+        """
+        state = self._state
+        with state.lock:
+            state.generation += 1
+
+    def stats(self):
+        """
+        Возвращает счетчики попаданий и промахов кэша.
+
+        Returns:
+            dict: Статистика кэша.
+        """
+        state = self._state
+        return {'hits': state.hits, 'misses': state.misses,
+                'generation': state.generation, 'size': len(state.backend)}
+
+    def _make_key(self, generation):
+        args = tuple(sorted((key, tuple(values)) for key, values in request.args.lists()))
+        view_args = tuple(sorted((request.view_args or {}).items()))
+        shared = self._shared_generation() if self._shared_generation else None
+        return request.endpoint, view_args, args, generation, shared
+
+    def cached(self, view):
+        """
+        Декоратор, кэширующий успешные ответы представления.
+
+        Args:
+            view (callable): Функция представления.
+
+        Returns:
+            callable: Обернутая функция представления.
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            state = self._state
+            if isinstance(state.backend, NullBackend):
+                return view(*args, **kwargs)
+
+            key = self._make_key(state.generation)
+            entry = state.backend.get(key)
+            if entry is not None:
+                with state.lock:
+                    state.hits += 1
+                body, status, headers = entry
+                response = current_app.response_class(body, status=status, headers=headers)
+                response.headers['X-Cache'] = 'HIT'
+                return response.make_conditional(request)
+
+            with state.lock:
+                state.misses += 1
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                state.backend.set(key, (response.get_data(), response.status_code, list(response.headers)))
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
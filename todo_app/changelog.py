@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from sqlalchemy import delete, event, insert, select, update
+from .extensions import cache, db
+from .models import Category, ChangeCounter, ChangeLog, Task
+
+# Ключ, под которым в Session.info накапливаются изменения текущей транзакции
+PENDING_CHANGES = 'pending_changes'
+# Признак того, что транзакция записала изменения в журнал (см. events._notify_broker)
+CHANGES_WRITTEN = 'changes_written'
+# Максимальное количество идентификаторов в одном условии IN
+DELETE_CHUNK_SIZE = 500
+# Модели, изменения которых через ORM отмечаются автоматически
+TRACKED_MODELS = {Task: 'task', Category: 'category'}
+
+
+def record_changes(entity, ids, deleted=False):
+    """
+    Отмечает задачи или категории как измененные в текущей транзакции.
+
+    Изменения объектов Task и Category через ORM отмечаются автоматически при flush
+    (см. _track_orm_changes); явный вызов нужен после запросов INSERT, UPDATE и DELETE
+    в обход ORM. Записи журнала изменений создаются непосредственно перед фиксацией
+    транзакции (см. _write_changes), поэтому несколько изменений одной сущности
+    за транзакцию дают одну запись. При откате транзакции отметки отбрасываются.
+
+    Args:
+        entity (str): Тип сущности ('task' или 'category').
+        ids (iterable of int): Идентификаторы сущностей.
+        deleted (bool): True, если сущности удалены.
+    """
+    _add_pending(db.session, entity, ids, deleted)
+
+
+def _add_pending(session, entity, ids, deleted):
+    pending = session.info.setdefault(PENDING_CHANGES, {})
+    for entity_id in ids:
+        pending[(entity, int(entity_id))] = deleted
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_orm_changes(session, flush_context):
+    for instance in session.new:
+        entity = TRACKED_MODELS.get(type(instance))
+        if entity:
+            _add_pending(session, entity, [instance.id], False)
+    for instance in session.dirty:
+        entity = TRACKED_MODELS.get(type(instance))
+        # Список категорий входит в представление задачи, а список задач в представление
+        # категории не входит
+        if entity and session.is_modified(instance, include_collections=entity == 'task'):
+            _add_pending(session, entity, [instance.id], False)
+    for instance in session.deleted:
+        entity = TRACKED_MODELS.get(type(instance))
+        if entity:
+            _add_pending(session, entity, [instance.id], True)
+
+
+@cache.shared_generation
+def committed_version():
+    """
+    Возвращает последнюю выданную версию журнала изменений — общее для всех процессов
+    поколение кэша ответов: любая фиксация изменений задач и категорий ее увеличивает.
+
+    Returns:
+        int: Версия (0, если изменений еще не было).
+    """
+    return db.session.scalar(select(ChangeCounter.version).where(ChangeCounter.id == 1)) or 0
+
+
+def _reserve_versions(session, count):
+    """
+    Увеличивает счетчик версий на count и возвращает последнюю выданную версию.
+
+    UPDATE блокирует строку счетчика до конца транзакции, поэтому транзакции получают
+    версии в порядке фиксации: клиент не пропустит изменение с меньшей версией,
+    зафиксированное позже изменения с большей.
+    """
+    result = session.execute(update(ChangeCounter).where(ChangeCounter.id == 1)
+                             .values(version=ChangeCounter.version + count))
+    if result.rowcount == 0:
+        # Первая запись в журнал (база создана без миграций)
+        session.execute(insert(ChangeCounter).values(id=1, version=count))
+    return session.execute(select(ChangeCounter.version).where(ChangeCounter.id == 1)).scalar()
+
+
+@event.listens_for(db.session, 'before_commit')
+def _write_changes(session):
+    # before_commit вызывается до последнего flush, а изменения объектов отмечаются при flush
+    session.flush()
+    pending = session.info.pop(PENDING_CHANGES, None)
+    if not pending:
+        return
+    last_version = _reserve_versions(session, len(pending))
+    now = datetime.utcnow()
+
+    by_entity = {}
+    for entity, entity_id in pending:
+        by_entity.setdefault(entity, []).append(entity_id)
+    for entity, ids in by_entity.items():
+        for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+            session.execute(delete(ChangeLog).where(ChangeLog.entity == entity,
+                                                    ChangeLog.entity_id.in_(ids[start:start + DELETE_CHUNK_SIZE])))
+
+    first_version = last_version - len(pending) + 1
+    session.info[CHANGES_WRITTEN] = True
+    session.execute(insert(ChangeLog), [
+        {'version': version, 'entity': entity, 'entity_id': entity_id, 'deleted': deleted, 'changed_at': now}
+        for version, ((entity, entity_id), deleted) in enumerate(pending.items(), first_version)
+    ])
+
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _discard_changes(session, transaction):
+    # Отметки откаченной транзакции не должны попасть в следующую
+    if transaction.parent is None:
+        session.info.pop(PENDING_CHANGES, None)
+        session.info.pop(CHANGES_WRITTEN, None)
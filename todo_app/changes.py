@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+from sqlalchemy import func, select
+from werkzeug.exceptions import BadRequest
+from .extensions import db
+from .models import Category, ChangeLog, Task
+from .services import task_columns, task_rows_to_dicts
+
+# Изменение сущности: версия, тип сущности, идентификатор, признак удаления
+# и текущие данные (None для удаленных)
+Change = namedtuple('Change', 'version entity entity_id deleted data')
+# Ключи ответа GET /tasks/changes для измененных и удаленных задач и категорий
+RESULT_KEYS = {
+    ('task', False): 'tasks',
+    ('task', True): 'deleted_tasks',
+    ('category', False): 'categories',
+    ('category', True): 'deleted_categories',
+}
+
+
+def parse_since(raw_since):
+    """
+    Разбирает токен since — версию журнала изменений, полученную в предыдущем ответе.
+
+    Args:
+        raw_since (str or None): Значение параметра из запроса.
+
+    Returns:
+        int: Версия (0, если токен не передан).
+    """
+    if raw_since is None or raw_since == '':
+        return 0
+    try:
+        since = int(raw_since)
+    except ValueError:
+        raise BadRequest('Invalid since token')
+    if since < 0:
+        raise BadRequest('Invalid since token')
+    return since
+
+
+def current_version():
+    """
+    Возвращает версию последнего изменения в журнале (0, если журнал пуст).
+    """
+    return db.session.scalar(select(func.max(ChangeLog.version))) or 0
+
+
+def read_changes(since, limit):
+    """
+    Читает изменения после версии since в порядке версий вместе с текущими данными
+    задач и категорий.
+
+    Args:
+        since (int): Версия, с которой начинается выборка (не включительно).
+        limit (int): Максимальное количество изменений.
+
+    Returns:
+        tuple: Список Change и признак того, что изменений больше, чем limit.
+    """
+    rows = db.session.execute(
+        select(ChangeLog.version, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.deleted)
+        .where(ChangeLog.version > since)
+        .order_by(ChangeLog.version)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    changed = {'task': [], 'category': []}
+    for row in rows:
+        if not row.deleted:
+            changed.setdefault(row.entity, []).append(row.entity_id)
+    data = {}
+    if changed['task']:
+        task_rows = db.session.execute(select(*task_columns()).where(Task.id.in_(changed['task']))).all()
+        data.update((('task', task['id']), task) for task in task_rows_to_dicts(task_rows))
+    if changed['category']:
+        data.update((('category', row.id), {'id': row.id, 'name': row.name}) for row in db.session.execute(
+            select(Category.id, Category.name).where(Category.id.in_(changed['category']))))
+
+    changes = []
+    for row in rows:
+        current = None if row.deleted else data.get((row.entity, row.entity_id))
+        # Сущность, удаленную после чтения журнала, считаем удаленной: запись об удалении
+        # придет со следующей версией
+        changes.append(Change(row.version, row.entity, row.entity_id, current is None, current))
+    return changes, has_more
+
+
+def get_changes(since, limit):
+    """
+    Возвращает задачи и категории, созданные, измененные или удаленные после версии since.
+
+    Args:
+        since (int): Версия, с которой начинается выборка (не включительно).
+        limit (int): Максимальное количество изменений в ответе.
+
+    Returns:
+        dict: Текущие данные измененных задач и категорий, идентификаторы удаленных,
+        токен следующего запроса next_since и признак has_more.
+    """
+    changes, has_more = read_changes(since, limit)
+    result = {key: [] for key in RESULT_KEYS.values()}
+    for change in sorted(changes, key=lambda change: change.entity_id):
+        key = RESULT_KEYS[change.entity, change.deleted]
+        result[key].append(change.entity_id if change.deleted else change.data)
+    result['next_since'] = changes[-1].version if changes else since
+    result['has_more'] = has_more
+    return result
@@ -5,16 +5,122 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def engine_options(database_uri):
+    """
+    Собирает параметры движка SQLAlchemy из переменных окружения.
+
+    Размер пула и время ожидания соединения задаются только для серверных СУБД:
+    для SQLite в памяти Flask-SQLAlchemy использует StaticPool, который их не принимает.
+
+    Args:
+        database_uri (str or None): Строка подключения к базе данных.
+
+    Returns:
+        dict: Значение SQLALCHEMY_ENGINE_OPTIONS.
+    """
+    options = {
+        # Проверка соединения перед выдачей из пула и пересоздание соединений старше pool_recycle
+        # секунд: MySQL закрывает простаивающие соединения через wait_timeout
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1',
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    }
+    if database_uri and not database_uri.startswith('sqlite'):
+        options.update({
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        })
+    return options
+
+
 class Config(object):
     if os.getenv('LOCAL'):
         SQLALCHEMY_DATABASE_URI = 'sqlite:///tasks.db'
     else:
         SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Создавать таблицы при создании приложения; в промышленном режиме схема создается
+    # один раз командой flask init-db перед запуском рабочих процессов
+    DB_CREATE_ALL = os.getenv('DB_CREATE_ALL', '1') == '1'
+    # PRAGMA, которые выполняются для каждого нового соединения с SQLite: WAL позволяет читать
+    # во время записи, busy_timeout (мс) — ждать блокировку вместо ошибки "database is locked",
+    # cache_size < 0 — размер кэша страниц в КиБ
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+        'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),
+    }
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = 'uploads/'
+    # Размер одного файла и всего тела запроса ограничиваются до чтения данных целиком
+    MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', 16 * 1024 * 1024))
+    MAX_CONTENT_LENGTH = MAX_UPLOAD_SIZE + 1024 * 1024
+    # Период фоновой сборки мусора в хранилище вложений (0 — отключена) и минимальный возраст удаляемых файлов.
+    # Сборщик запускается один раз на сервер: мастер-процессом gunicorn (gunicorn.conf.py)
+    # или сервером разработки (app.py), а не каждым экземпляром приложения
+    ATTACHMENT_GC_INTERVAL = int(os.getenv('ATTACHMENT_GC_INTERVAL', 3600))
+    ATTACHMENT_GC_GRACE_PERIOD = int(os.getenv('ATTACHMENT_GC_GRACE_PERIOD', 3600))
+    # Отдача вложений: время кэширования у клиента и передача файла веб-серверу
+    # (X-Sendfile для Apache/lighttpd или X-Accel-Redirect с указанным префиксом для nginx)
+    ATTACHMENT_CACHE_MAX_AGE = int(os.getenv('ATTACHMENT_CACHE_MAX_AGE', 3600))
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE') == '1'
+    X_ACCEL_REDIRECT_PREFIX = os.getenv('X_ACCEL_REDIRECT_PREFIX')
+    TASKS_PAGE_SIZE = int(os.getenv('TASKS_PAGE_SIZE', 100))
+    TASKS_MAX_PAGE_SIZE = int(os.getenv('TASKS_MAX_PAGE_SIZE', 1000))
+    # Размер пачки задач, читаемой из базы за один запрос при экспорте
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+    # Количество задач в одной транзакции при импорте (flask tasks import)
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 5000))
+    # Количество изменений на странице GET /tasks/changes
+    CHANGES_PAGE_SIZE = int(os.getenv('CHANGES_PAGE_SIZE', 500))
+    CHANGES_MAX_PAGE_SIZE = int(os.getenv('CHANGES_MAX_PAGE_SIZE', 5000))
+    # Поток событий GET /events: интервал чтения журнала изменений (секунды), количество
+    # изменений за один запрос, интервал heartbeat, очередь и число подписчиков на процесс.
+    # Подписчик занимает поток сервера на все время подключения, поэтому по умолчанию
+    # подписчикам отдается половина потоков рабочего процесса (GUNICORN_THREADS), остальные
+    # остаются обычным запросам; сверх ограничения возвращается 503
+    SSE_POLL_INTERVAL = float(os.getenv('SSE_POLL_INTERVAL', 1.0))
+    SSE_BATCH_SIZE = int(os.getenv('SSE_BATCH_SIZE', 500))
+    SSE_HEARTBEAT_INTERVAL = float(os.getenv('SSE_HEARTBEAT_INTERVAL', 15))
+    SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', 3000))
+    SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', 1000))
+    SSE_MAX_SUBSCRIBERS = int(os.getenv('SSE_MAX_SUBSCRIBERS', max(1, int(os.getenv('GUNICORN_THREADS', 4)) // 2)))
+    # Фоновые задания: рабочие потоки, попытки и задержка перед повтором (удваивается
+    # с каждой попыткой), файл SQLite для хранения заданий между перезапусками (пусто — в памяти)
+    JOBS_EAGER = os.getenv('JOBS_EAGER') == '1'
+    JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', 2))
+    JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', 5))
+    JOBS_RETRY_DELAY = float(os.getenv('JOBS_RETRY_DELAY', 1.0))
+    JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 5.0))
+    JOBS_DATABASE = os.getenv('JOBS_DATABASE', '')
+    JOBS_LEASE = float(os.getenv('JOBS_LEASE', 300))
+    # Миниатюры изображений: размеры (наибольшая сторона в пикселях), количество процессов
+    # пула (0 — в потоке фонового задания) и время ожидания миниатюр одного файла в секундах
+    THUMBNAIL_SIZES = tuple(int(size) for size in os.getenv('THUMBNAIL_SIZES', '64,256').split(',') if size.strip())
+    THUMBNAIL_PROCESSES = int(os.getenv('THUMBNAIL_PROCESSES', 2))
+    THUMBNAIL_TIMEOUT = float(os.getenv('THUMBNAIL_TIMEOUT', 60))
+    BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 5000))
+    BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 500))
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', '1') == '1'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'lru')
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    CACHE_TTL = int(os.getenv('CACHE_TTL', 30))
+    # Журнал медленных SQL-запросов (0 — отключен) и запись их плана выполнения (SQLite, MySQL)
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 500))
+    SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', '1') == '1'
+    # Измерения запросов: заголовок Server-Timing и GET /metrics в формате Prometheus
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED') == '1'
+    # Сериализация JSON-ответов через orjson (если пакет установлен)
+    ORJSON_ENABLED = os.getenv('ORJSON_ENABLED', '1') == '1'
 
 
 class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    DB_CREATE_ALL = True
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    ATTACHMENT_GC_INTERVAL = 0
+    JOBS_EAGER = True
+    THUMBNAIL_PROCESSES = 0
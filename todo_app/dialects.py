@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import IntegrityError
+from .extensions import db
+
+
+def insert_ignore_duplicates(model):
+    """
+    Строит INSERT, который пропускает строки, нарушающие ограничения уникальности.
+
+    Используется для безопасного создания записей при конкурентной вставке
+    одинаковых значений несколькими запросами.
+
+    Args:
+        model: Модель, в таблицу которой выполняется вставка.
+
+    Returns:
+        Insert: Выражение вставки для текущего диалекта или None, если диалект не поддерживает
+        такую вставку.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return sqlite_insert(model).on_conflict_do_nothing()
+    if dialect == 'mysql':
+        stmt = mysql_insert(model)
+        primary_key = next(iter(model.__table__.primary_key))
+        return stmt.on_duplicate_key_update({primary_key.name: primary_key})
+    if dialect == 'postgresql':
+        return postgresql_insert(model).on_conflict_do_nothing()
+    return None
+
+
+def insert_missing(model, rows):
+    """
+    Вставляет строки в текущей транзакции, пропуская те, что нарушают ограничения уникальности.
+
+    Args:
+        model: Модель, в таблицу которой выполняется вставка.
+        rows (list of dict): Значения колонок для вставки.
+    """
+    stmt = insert_ignore_duplicates(model)
+    if stmt is not None:
+        db.session.execute(stmt, rows)
+        return
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.add(model(**row))
+        except IntegrityError:
+            pass
+
+
+def insert_returning_ids(model, rows, batch_key=None):
+    """
+    Вставляет строки пакетно и возвращает сгенерированные первичные ключи в порядке строк.
+
+    SQLite: строки вставляются одним executemany без RETURNING (RETURNING с сохранением
+    порядка SQLite выполняет по одной строке). Транзакция удерживает блокировку записи,
+    поэтому строки получают непрерывный диапазон rowid, который заканчивается last_insert_rowid().
+    Диалекты с упорядоченным INSERT ... RETURNING (PostgreSQL, MariaDB) используют его,
+    остальные (MySQL) — многострочный INSERT (см. insert_multirow_returning_ids).
+
+    Args:
+        model: Модель с целочисленным автоинкрементным первичным ключом.
+        rows (list of dict): Значения колонок для вставки.
+        batch_key (str or None): Колонка, значение которой одинаково у всех строк пачки
+            и отличает ее от других пачек (см. insert_multirow_returning_ids).
+
+    Returns:
+        list of int: Первичные ключи вставленных строк.
+    """
+    if not rows:
+        return []
+    dialect = db.session.get_bind().dialect
+    primary_key = next(iter(model.__table__.primary_key))
+    if dialect.name == 'sqlite':
+        # Вставка через таблицу, а не модель: без накладных расходов ORM на каждую строку
+        db.session.execute(insert(model.__table__), rows)
+        last_id = db.session.execute(text('SELECT last_insert_rowid()')).scalar()
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        return db.session.scalars(insert(model).returning(primary_key, sort_by_parameter_order=True), rows).all()
+    return insert_multirow_returning_ids(model, rows, batch_key)
+
+
+def _consecutive_autoincrement():
+    # При innodb_autoinc_lock_mode 0 (traditional) и 1 (consecutive) многострочный INSERT
+    # с заранее известным количеством строк получает непрерывный диапазон ключей;
+    # в режиме 2 (interleaved, по умолчанию в MySQL 8) ключи конкурентных вставок чередуются
+    if db.session.get_bind().dialect.name != 'mysql':
+        return False
+    return db.session.execute(text('SELECT @@innodb_autoinc_lock_mode')).scalar() in (0, 1)
+
+
+def insert_multirow_returning_ids(model, rows, batch_key=None):
+    """
+    Вставляет строки одним многострочным INSERT ... VALUES и возвращает первичные ключи
+    в порядке строк для диалектов без упорядоченного RETURNING (MySQL).
+
+    Если ключи выражения гарантированно непрерывны (innodb_autoinc_lock_mode 0 или 1),
+    они вычисляются по LAST_INSERT_ID() (ключ первой строки) и количеству вставленных строк.
+    Иначе ключи читаются обратно по значению batch_key в порядке возрастания: ключи одного
+    выражения возрастают в порядке строк. Без batch_key строки вставляются по одной.
+
+    Args:
+        model: Модель с целочисленным автоинкрементным первичным ключом.
+        rows (list of dict): Значения колонок для вставки.
+        batch_key (str or None): Колонка, значение которой одинаково у всех строк пачки
+            и отличает ее от других пачек (например, время создания с микросекундами).
+
+    Returns:
+        list of int: Первичные ключи вставленных строк.
+    """
+    if not rows:
+        return []
+    table = model.__table__
+    primary_key = next(iter(table.primary_key))
+    consecutive = _consecutive_autoincrement()
+    if not consecutive and batch_key is None:
+        return [db.session.execute(insert(table).values(row)).inserted_primary_key[0] for row in rows]
+
+    result = db.session.execute(insert(table).values(rows))
+    if consecutive:
+        first_id = db.session.execute(text('SELECT LAST_INSERT_ID()')).scalar()
+        return list(range(first_id, first_id + result.rowcount))
+
+    key_value = rows[0][batch_key]
+    if any(row[batch_key] != key_value for row in rows):
+        raise ValueError(f'All rows of a batch must have the same {batch_key}')
+    # Последние строки с ключом пачки: собственные незафиксированные строки транзакции видны ей
+    ids = db.session.scalars(
+        select(primary_key)
+        .where(table.c[batch_key] == key_value)
+        .order_by(primary_key.desc())
+        .limit(len(rows))
+    ).all()
+    if len(ids) != len(rows):
+        raise RuntimeError(f'Inserted {len(rows)} rows but found {len(ids)} by {batch_key}')
+    return ids[::-1]
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import click
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+from .extensions import db
+
+
+class PoolStats(object):
+    """
+    Счетчики выдачи соединений из пула движка.
+
+    Attributes:
+        checkouts (int): Количество выдач соединений из пула.
+        connects (int): Количество открытых соединений с базой данных.
+        invalidated (int): Количество соединений, признанных неработоспособными.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self.lock = threading.Lock()
+
+    def increment(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def _sqlite_pragmas(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def init_engine(app):
+    """
+    Настраивает движок базы данных приложения: PRAGMA для новых соединений
+    с SQLite и счетчики пула для /health/db.
+
+    Args:
+        app (Flask): Экземпляр Flask-приложения.
+    """
+    stats = PoolStats()
+    app.extensions['pool_stats'] = stats
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite' and app.config.get('SQLITE_PRAGMAS'):
+        event.listen(engine, 'connect', _sqlite_pragmas(app.config['SQLITE_PRAGMAS']))
+    event.listen(engine, 'connect', lambda *args: stats.increment('connects'))
+    event.listen(engine, 'checkout', lambda *args: stats.increment('checkouts'))
+    event.listen(engine, 'invalidate', lambda *args: stats.increment('invalidated'))
+
+
+def database_health(app):
+    """
+    Проверяет доступность базы данных и собирает статистику пула соединений.
+
+    Args:
+        app (Flask): Экземпляр Flask-приложения.
+
+    Returns:
+        tuple: Словарь с состоянием базы данных и признак ее доступности.
+    """
+    pool = db.engine.pool
+    stats = app.extensions['pool_stats']
+    data = {'pool': {'class': type(pool).__name__, 'checkouts': stats.checkouts,
+                     'connects': stats.connects, 'invalidated': stats.invalidated}}
+    if isinstance(pool, QueuePool):
+        data['pool'].update({'size': pool.size(), 'checked_in': pool.checkedin(),
+                             'checked_out': pool.checkedout(), 'overflow': pool.overflow()})
+
+    started = time.perf_counter()
+    try:
+        db.session.execute(text('SELECT 1'))
+    except Exception as e:
+        db.session.rollback()
+        data.update({'status': 'error', 'error': e.__class__.__name__})
+        return data, False
+    data.update({'status': 'ok', 'latency_ms': round((time.perf_counter() - started) * 1000, 3)})
+    return data, True
+
+
+def wait_for_database(timeout, interval=1.0):
+    """
+    Ожидает, пока база данных начнет принимать соединения.
+
+    Args:
+        timeout (float): Максимальное время ожидания в секундах.
+        interval (float): Пауза между попытками в секундах.
+
+    Returns:
+        bool: True, если соединение установлено.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with db.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            return True
+        except OperationalError:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+
+
+@click.command('wait-db')
+@click.option('--timeout', type=float, default=60, help='Seconds to wait for the database.')
+def wait_db_command(timeout):
+    """Wait until the database accepts connections."""
+    if not wait_for_database(timeout):
+        raise click.ClickException(f'Database is not available after {timeout:g} seconds')
+    click.echo('Database is available')
+
+
+@click.command('init-db')
+def init_db_command():
+    """Create missing database tables and indexes."""
+    db.create_all()
+    click.echo('Database schema is ready')
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+from flask import Response, current_app, has_app_context, request, stream_with_context
+from sqlalchemy import event
+from werkzeug.exceptions import ServiceUnavailable
+from .changelog import CHANGES_WRITTEN
+from .changes import current_version, parse_since, read_changes
+from .extensions import db
+
+logger = logging.getLogger(__name__)
+
+# Тип события SSE для изменения и удаления задачи или категории
+EVENT_TYPES = {
+    ('task', False): 'task',
+    ('task', True): 'task_deleted',
+    ('category', False): 'category',
+    ('category', True): 'category_deleted',
+}
+
+
+def format_event(change, dumps):
+    """
+    Формирует событие SSE для изменения. Идентификатор события — версия журнала изменений,
+    по нему клиент продолжает поток после переподключения (Last-Event-ID).
+
+    Args:
+        change (Change): Изменение.
+        dumps (callable): Функция сериализации в JSON.
+
+    Returns:
+        str: Текст события.
+    """
+    data = {'id': change.entity_id} if change.deleted else change.data
+    return f'id: {change.version}\nevent: {EVENT_TYPES[change.entity, change.deleted]}\ndata: {dumps(data)}\n\n'
+
+
+class Subscriber(object):
+    """
+    Очередь событий одного клиента.
+
+    Очередь хранит не более одного события на задачу или категорию: новое изменение
+    сущности заменяет еще не отправленное, поэтому серия обновлений одной задачи
+    доставляется медленному клиенту одним событием. Если очередь переполнена, клиент
+    отключается и после переподключения получает пропущенное из журнала изменений.
+
+    Attributes:
+        version (int): Версия последнего отправленного клиенту изменения.
+        overflowed (bool): Признак переполнения очереди.
+    """
+
+    def __init__(self, version, max_pending):
+        self.version = version
+        self.overflowed = False
+        self._max_pending = max_pending
+        self._pending = {}
+        self._condition = threading.Condition()
+
+    def put(self, events):
+        """
+        Добавляет события в очередь.
+
+        Args:
+            events (list of tuple): Пары (Change, текст события).
+        """
+        with self._condition:
+            if self.overflowed:
+                return
+            for change, text in events:
+                if change.version > self.version:
+                    self._pending[change.entity, change.entity_id] = (change.version, text)
+            if len(self._pending) > self._max_pending:
+                self.overflowed = True
+                self._pending.clear()
+            self._condition.notify()
+
+    def get(self, timeout):
+        """
+        Ожидает события не дольше timeout секунд и забирает все накопленные.
+
+        Returns:
+            list of tuple: Пары (версия, текст события) в порядке версий.
+        """
+        with self._condition:
+            if not self._pending and not self.overflowed:
+                self._condition.wait(timeout)
+            events = sorted(event for event in self._pending.values() if event[0] > self.version)
+            self._pending.clear()
+            return events
+
+
+class ChangeBroker(object):
+    """
+    Рассылает изменения из журнала изменений подписчикам потока событий в пределах процесса.
+
+    Фоновый поток читает журнал (одним запросом на всех подписчиков) сразу после
+    фиксации изменений в этом процессе и не реже раза в poll_interval секунд, чтобы
+    получить изменения, сделанные другими процессами. Каждое событие сериализуется один
+    раз. Поток работает, только пока есть подписчики.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.poll_interval = app.config['SSE_POLL_INTERVAL']
+        self.batch_size = app.config['SSE_BATCH_SIZE']
+        self.max_subscribers = app.config['SSE_MAX_SUBSCRIBERS']
+        self.max_pending = app.config['SSE_QUEUE_SIZE']
+        # Клиент, получивший 503, повторяет подключение не раньше, чем через интервал переподключения SSE
+        self.retry_after = max(1, app.config['SSE_RETRY_MS'] // 1000)
+        self.version = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def subscribe(self, version=None):
+        """
+        Регистрирует подписчика. Брокер доставляет подписчику изменения после своей текущей
+        версии; более ранние изменения (после version) подписчик читает из журнала сам.
+
+        Количество подписчиков процесса ограничено SSE_MAX_SUBSCRIBERS: каждый поток событий
+        занимает рабочий поток сервера на все время подключения, и сверх ограничения клиент
+        получает 503, чтобы потоки событий не заняли все потоки обычных запросов.
+
+        Args:
+            version (int or None): Версия, после которой нужны изменения (None — только новые).
+
+        Returns:
+            Subscriber: Очередь событий подписчика.
+
+        Raises:
+            ServiceUnavailable: Достигнуто ограничение количества подписчиков.
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise ServiceUnavailable('Too many event stream subscribers', retry_after=self.retry_after)
+            if self.version is None:
+                self.version = current_version()
+            subscriber = Subscriber(self.version if version is None else version, self.max_pending)
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='change-broker', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def notify(self):
+        """
+        Будит фоновый поток после фиксации изменений в этом процессе.
+        """
+        self._wakeup.set()
+
+    def poll(self):
+        """
+        Читает новые изменения из журнала и раздает их подписчикам.
+        """
+        with self.app.app_context():
+            try:
+                dumps = self.app.json.dumps
+                has_more = True
+                while has_more:
+                    changes, has_more = read_changes(self.version, self.batch_size)
+                    if not changes:
+                        break
+                    events = [(change, format_event(change, dumps)) for change in changes]
+                    with self._lock:
+                        subscribers = list(self._subscribers)
+                        self.version = changes[-1].version
+                    for subscriber in subscribers:
+                        subscriber.put(events)
+            finally:
+                db.session.remove()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            with self._lock:
+                if not self._subscribers:
+                    # Без подписчиков поток завершается, следующий подписчик запустит новый
+                    self._thread = None
+                    self.version = None
+                    return
+            try:
+                self.poll()
+            except Exception:
+                logger.exception('Could not read the change log')
+
+
+@event.listens_for(db.session, 'after_commit')
+def _notify_broker(session):
+    if session.info.pop(CHANGES_WRITTEN, False) and has_app_context():
+        broker = current_app.extensions.get('change_broker')
+        if broker is not None:
+            broker.notify()
+
+
+def init_events(app):
+    """
+    Создает брокер изменений для потока событий GET /events.
+
+    Args:
+        app (Flask): Экземпляр Flask-приложения.
+    """
+    app.extensions['change_broker'] = ChangeBroker(app)
+
+
+def event_stream():
+    """
+    Возвращает поток событий SSE об изменениях задач и категорий.
+
+    Если клиент передал Last-Event-ID (или параметр since), сначала отправляются изменения
+    после этой версии из журнала изменений, затем новые. Пока событий нет, отправляется
+    комментарий-heartbeat, по которому обнаруживаются отключившиеся клиенты.
+
+    Returns:
+        Response: Потоковый ответ text/event-stream.
+    """
+    raw_since = request.headers.get('Last-Event-ID', request.args.get('since'))
+    replay = raw_since is not None and raw_since != ''
+    broker = current_app.extensions['change_broker']
+    subscriber = broker.subscribe(parse_since(raw_since) if replay else None)
+    db.session.remove()
+    heartbeat = current_app.config['SSE_HEARTBEAT_INTERVAL']
+    retry = current_app.config['SSE_RETRY_MS']
+    dumps = current_app.json.dumps
+
+    def generate():
+        try:
+            yield f'retry: {retry}\n\n'
+            if replay:
+                # Изменения, сделанные до подписки, читаются из журнала до его конца;
+                # совпадающие с ними события брокера отбрасываются по версии
+                has_more = True
+                while has_more:
+                    changes, has_more = read_changes(subscriber.version, broker.batch_size)
+                    for change in changes:
+                        yield format_event(change, dumps)
+                    if changes:
+                        subscriber.version = changes[-1].version
+                # Соединение с базой не удерживается, пока клиент ждет событий
+                db.session.remove()
+            while True:
+                events = subscriber.get(heartbeat)
+                if subscriber.overflowed:
+                    return
+                if not events:
+                    yield ': heartbeat\n\n'
+                    continue
+                for version, text in events:
+                    yield text
+                    subscriber.version = version
+        finally:
+            broker.unsubscribe(subscriber)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+from flask import current_app, stream_with_context
+from werkzeug.exceptions import BadRequest
+from .extensions import db
+from .pagination import keyset_filter, keyset_order
+from .queries import build_task_query
+from .services import parse_fields, task_rows_to_dicts
+
+# Форматы экспорта: тип содержимого и расширение файла
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+
+def iter_task_batches(query, sort_by, sort_column, order, batch_size):
+    """
+    Обходит все задачи запроса пачками по ключу (колонка сортировки, id).
+
+    Каждая пачка читается отдельным коротким запросом, после чего сессия закрывается
+    и соединение возвращается в пул: экспорт не держит открытой длинную транзакцию
+    и потребляет память только на одну пачку.
+
+    Args:
+        query (Select): Запрос задач без сортировки и ограничения.
+        sort_by (str): Поле сортировки.
+        sort_column: Колонка сортировки.
+        order (str): Направление сортировки.
+        batch_size (int): Размер пачки.
+
+    Yields:
+        list of Row: Строки очередной пачки.
+    """
+    query = query.order_by(*keyset_order(sort_column, order)).limit(batch_size)
+    position = None
+    while True:
+        batch_query = query
+        if position is not None:
+            batch_query = query.where(keyset_filter(sort_column, order, *position))
+        rows = db.session.execute(batch_query).all()
+        db.session.close()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        position = getattr(rows[-1], sort_by), rows[-1].id
+
+
+def _ndjson_lines(dicts):
+    dumps = current_app.json.dumps
+    return ''.join(dumps(data) + '\n' for data in dicts)
+
+
+def _csv_lines(dicts, fields, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    for data in dicts:
+        if 'thumbnails' in data:
+            data['thumbnails'] = ';'.join(data['thumbnails'].values())
+        if 'categories' in data:
+            data['categories'] = ';'.join(data['categories'])
+        writer.writerow([data[name] for name in fields])
+    return buffer.getvalue()
+
+
+def export_tasks(args):
+    """
+    Формирует потоковый ответ с экспортом всех задач, отобранных параметрами запроса.
+
+    Args:
+        args (MultiDict): Параметры запроса (format, fields и параметры фильтрации списка задач).
+
+    Returns:
+        Response: Ответ, тело которого формируется по мере чтения задач из базы.
+    """
+    export_format = args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        raise BadRequest('Invalid export format, expected "ndjson" or "csv"')
+    fields = parse_fields(args.get('fields'))
+    query, sort_by, sort_column, order = build_task_query(args, fields)
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+
+    def generate():
+        if export_format == 'csv':
+            # Заголовок отдается и для пустого экспорта
+            yield _csv_lines([], fields, header=True)
+        for rows in iter_task_batches(query, sort_by, sort_column, order, batch_size):
+            dicts = task_rows_to_dicts(rows, fields)
+            db.session.close()
+            if export_format == 'csv':
+                yield _csv_lines(dicts, fields)
+            else:
+                yield _ndjson_lines(dicts)
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    response = current_app.response_class(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=tasks.{extension}'
+    # Не буферизовать ответ в nginx: клиент получает данные по мере выгрузки
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,6 +1,8 @@
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from .cache import ResponseCache
 
 
 db = SQLAlchemy()
 migrate = Migrate()
+cache = ResponseCache()
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+try:
+    from gevent import get_hub
+    from gevent.monkey import is_module_patched
+except ImportError:  # gevent не установлен (requirements-gevent.txt): приложение работает в потоках
+    get_hub = None
+
+
+def run_blocking(func, *args):
+    """
+    Выполняет блокирующую файловую операцию (fsync, удаление, переименование).
+
+    В рабочем процессе gevent такие вызовы блокируют цикл событий вместе со всеми
+    гринлетами процесса, поэтому они передаются в пул потоков gevent; в обычном
+    многопоточном режиме функция вызывается напрямую.
+
+    Args:
+        func (callable): Функция.
+        *args: Аргументы функции.
+
+    Returns:
+        Результат функции.
+    """
+    if get_hub is not None and is_module_patched('os'):
+        return get_hub().threadpool.apply(func, args)
+    return func(*args)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy import func, select
+from werkzeug.exceptions import BadRequest
+from .extensions import db
+from .models import Category, Task, task_categories
+
+
+def parse_names(values):
+    """
+    Разбирает названия категорий из параметров запроса. Названия можно передавать
+    через запятую и/или повторяя параметр.
+
+    Args:
+        values (list of str): Значения параметра запроса.
+
+    Returns:
+        list of str: Уникальные названия в порядке упоминания.
+    """
+    return list(dict.fromkeys(name.strip() for value in values for name in value.split(',') if name.strip()))
+
+
+def parse_category_args(args):
+    """
+    Извлекает параметры фильтрации по категориям: category, match и exclude.
+
+    Args:
+        args (MultiDict): Параметры запроса.
+
+    Returns:
+        tuple: Названия категорий, режим совпадения ('any' или 'all') и исключаемые названия.
+    """
+    match_mode = args.get('match', 'any')
+    if match_mode not in ('any', 'all'):
+        raise BadRequest('Invalid match mode, expected "any" or "all"')
+    return parse_names(args.getlist('category')), match_mode, parse_names(args.getlist('exclude'))
+
+
+def _tasks_with_categories(names):
+    return (select(task_categories.c.task_id)
+            .join(Category, Category.id == task_categories.c.category_id)
+            .where(Category.name.in_(names)))
+
+
+def apply_category_filter(query, names, match_mode='any', excluded=()):
+    """
+    Добавляет к запросу задач фильтр по категориям.
+
+    Задачи отбираются одним сгруппированным подзапросом по task_categories
+    (индекс по category_id, task_id), а не отдельным соединением на каждую категорию:
+    в режиме 'all' задача должна иметь все перечисленные категории (HAVING COUNT),
+    в режиме 'any' — хотя бы одну. Задачи с исключенными категориями отбрасываются.
+
+    Args:
+        query (Select): Запрос задач.
+        names (list of str): Названия категорий.
+        match_mode (str): 'any' или 'all'.
+        excluded (list of str): Названия исключаемых категорий.
+
+    Returns:
+        Select: Запрос с условиями фильтрации.
+    """
+    if names:
+        matching = _tasks_with_categories(names)
+        if match_mode == 'all' and len(names) > 1:
+            matching = (matching.group_by(task_categories.c.task_id)
+                        .having(func.count(task_categories.c.category_id) == len(names)))
+        query = query.where(Task.id.in_(matching))
+    if excluded:
+        query = query.where(Task.id.notin_(_tasks_with_categories(excluded)))
+    return query
+
+
+def count_categories(task_ids):
+    """
+    Подсчитывает количество задач в каждой категории среди отобранных задач.
+
+    Args:
+        task_ids (Select): Подзапрос, возвращающий идентификаторы отобранных задач.
+
+    Returns:
+        dict: Словарь {название категории: количество задач}.
+    """
+    rows = (select(Category.name, func.count())
+            .select_from(task_categories)
+            .join(Category, Category.id == task_categories.c.category_id)
+            .where(task_categories.c.task_id.in_(task_ids))
+            .group_by(Category.name))
+    return dict(db.session.execute(rows).all())
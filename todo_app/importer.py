@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+import csv
+import os
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import BadRequest
+from .bulk import validate_task_item
+from .changelog import record_changes
+from .dialects import insert_missing, insert_returning_ids
+from .extensions import cache, db
+from .models import Category, Task, task_categories
+from .search import deferred_search_index
+from .stats import deferred_stats
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+
+
+def read_records(stream, file_format):
+    """
+    Читает задачи из файла NDJSON или CSV по одной, не загружая файл в память целиком.
+
+    В CSV категории перечисляются через точку с запятой (как в экспорте GET /tasks/export).
+    Пустое описание в CSV считается отсутствующим.
+
+    Args:
+        stream: Текстовый файл.
+        file_format (str): 'ndjson' или 'csv'.
+
+    Yields:
+        tuple: Номер строки файла и данные задачи (или None, если строку не удалось разобрать).
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            data = {'title': row.get('title')}
+            if row.get('description'):
+                data['description'] = row['description']
+            data['categories'] = [name for name in (row.get('categories') or '').split(';') if name]
+            yield reader.line_num, data
+        return
+    # JSON-провайдер приложения (orjson, если он включен)
+    loads = current_app.json.loads
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+class CategoryMap(object):
+    """
+    Соответствие названий категорий их идентификаторам, которое пополняется по мере импорта.
+    Недостающие категории создаются одним запросом на пачку задач.
+    """
+
+    def __init__(self):
+        self.ids = {}
+
+    def resolve(self, names):
+        missing = [name for name in dict.fromkeys(names) if name not in self.ids]
+        if not missing:
+            return
+        rows = db.session.execute(select(Category.name, Category.id).where(Category.name.in_(missing))).all()
+        self.ids.update(rows)
+        missing = [name for name in missing if name not in self.ids]
+        if missing:
+            insert_missing(Category, [{'name': name} for name in missing])
+            created = dict(db.session.execute(
+                select(Category.name, Category.id).where(Category.name.in_(missing))).all())
+            record_changes('category', created.values())
+            self.ids.update(created)
+
+
+def insert_task_batch(items, category_map):
+    """
+    Вставляет пачку проверенных задач вместе со связями с категориями.
+
+    Задачи вставляются одним пакетным выражением (см. dialects.insert_returning_ids),
+    полнотекстовый индекс и статистика SQLite обновляются несколькими запросами на пачку.
+
+    Args:
+        items (list of dict): Данные задач.
+        category_map (CategoryMap): Соответствие названий категорий идентификаторам.
+    """
+    category_map.resolve(name for data in items for name in data.get('categories', []))
+    now = datetime.utcnow()
+    rows = [{'title': data['title'], 'description': data.get('description'),
+             'created_at': now, 'updated_at': now} for data in items]
+
+    with deferred_stats() as counted_ids:
+        with deferred_search_index() as indexed_ids:
+            # Время создания одинаково у всех задач пачки и служит ее ключом (см. insert_returning_ids)
+            task_ids = insert_returning_ids(Task, rows, batch_key='created_at')
+            indexed_ids.extend(task_ids)
+        record_changes('task', task_ids)
+
+        links = [{'task_id': task_id, 'category_id': category_map.ids[name]}
+                 for task_id, data in zip(task_ids, items)
+                 for name in dict.fromkeys(data.get('categories', []))]
+        if links:
+            db.session.execute(insert(task_categories), links)
+        counted_ids.extend(task_ids)
+
+
+def _read_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    return 0
+
+
+def _write_checkpoint(path, processed):
+    if not path:
+        return
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(str(processed))
+    os.replace(temp_path, path)
+
+
+def import_tasks(stream, file_format, batch_size, checkpoint=None, progress=None):
+    """
+    Импортирует задачи из потока, фиксируя каждую пачку отдельной транзакцией.
+
+    Задачи проверяются по тем же правилам, что и в POST /tasks; некорректные строки
+    пропускаются. После каждой зафиксированной пачки в файл checkpoint записывается
+    количество обработанных записей, и повторный запуск продолжает импорт с этого места.
+
+    Args:
+        stream: Текстовый файл с задачами.
+        file_format (str): 'ndjson' или 'csv'.
+        batch_size (int): Количество задач в одной пачке.
+        checkpoint (str or None): Путь к файлу с позицией импорта.
+        progress (callable or None): Функция progress(imported, rejected, errors) для вывода хода импорта,
+            где errors — список (номер строки, сообщение) для отклоненных записей пачки.
+
+    Returns:
+        tuple: Количество импортированных и отклоненных задач.
+    """
+    skip = _read_checkpoint(checkpoint)
+    processed = imported = rejected = 0
+    category_map = CategoryMap()
+    batch, errors = [], []
+
+    def flush():
+        nonlocal imported
+        if not batch and not errors:
+            return
+        if batch:
+            try:
+                insert_task_batch(batch, category_map)
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+                raise
+            imported += len(batch)
+        _write_checkpoint(checkpoint, processed)
+        if progress:
+            progress(imported, rejected, errors)
+        batch.clear()
+        errors.clear()
+
+    for line_number, data in read_records(stream, file_format):
+        processed += 1
+        if processed <= skip:
+            continue
+        try:
+            if data is None:
+                raise BadRequest('Invalid JSON')
+            validate_task_item(data)
+        except BadRequest as e:
+            rejected += 1
+            errors.append((line_number, e.description))
+        except (TypeError, ValueError):
+            # Запись неожиданной структуры отклоняется, а не прерывает импорт
+            rejected += 1
+            errors.append((line_number, 'Invalid task data'))
+        else:
+            batch.append(data)
+        if len(batch) + len(errors) >= batch_size:
+            flush()
+    flush()
+    cache.invalidate()
+    return imported, rejected
+
+
+# Команды CLI для работы с задачами: flask tasks import
+tasks_cli = AppGroup('tasks', help='Task data maintenance.')
+
+
+@tasks_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='File format (defaults to the file extension).')
+@click.option('--batch-size', type=int, default=None,
+              help='Tasks per transaction (defaults to IMPORT_BATCH_SIZE).')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), default=None,
+              help='File that stores the import position; an interrupted import resumes from it.')
+def import_command(path, file_format, batch_size, checkpoint):
+    """Import tasks from an NDJSON or CSV file."""
+    if file_format is None:
+        file_format = 'csv' if path.lower().endswith('.csv') else 'ndjson'
+    if batch_size is None:
+        batch_size = current_app.config['IMPORT_BATCH_SIZE']
+    if batch_size < 1:
+        raise click.BadParameter('must be positive', param_hint='--batch-size')
+
+    started = time.monotonic()
+
+    def progress(imported, rejected, errors):
+        for line_number, message in errors:
+            click.echo(f'Line {line_number}: {message}', err=True)
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed else 0
+        click.echo(f'Imported {imported} tasks, rejected {rejected} ({rate:.0f} tasks/s)')
+
+    with open(path, newline='', encoding='utf-8') as stream:
+        try:
+            imported, rejected = import_tasks(stream, file_format, batch_size, checkpoint, progress)
+        except SQLAlchemyError as e:
+            raise click.ClickException(f'Database error, import stopped: {e.__class__.__name__}. '
+                                       'Fix the data and run the command again to resume.')
+    click.echo(f'Done: imported {imported} tasks, rejected {rejected}')
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+import heapq
+import itertools
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from .extensions import db
+
+logger = logging.getLogger(__name__)
+
+# Обработчики фоновых заданий по имени (см. job)
+JOB_HANDLERS = {}
+# Ключ, под которым в Session.info накапливаются задания, выполняемые после фиксации
+AFTER_COMMIT_JOBS = 'after_commit_jobs'
+
+
+def job(name):
+    """
+    Регистрирует функцию как обработчик фонового задания.
+
+    Аргументы задания сохраняются в JSON, поэтому должны быть сериализуемыми. Задание
+    может выполниться повторно (после ошибки или перезапуска процесса), поэтому
+    обработчик должен быть идемпотентным.
+
+    Args:
+        name (str): Имя задания.
+
+    Returns:
+        callable: Декоратор.
+    """
+    def decorator(func):
+        JOB_HANDLERS[name] = func
+        return func
+    return decorator
+
+
+class Job(object):
+    """
+    Фоновое задание.
+
+    Attributes:
+        id (int or None): Идентификатор в хранилище заданий (None без хранилища).
+        name (str): Имя задания.
+        args (list): Аргументы обработчика.
+        attempts (int): Количество неудачных попыток.
+    """
+    __slots__ = ('id', 'name', 'args', 'attempts')
+
+    def __init__(self, id, name, args, attempts=0):
+        self.id = id
+        self.name = name
+        self.args = args
+        self.attempts = attempts
+
+
+class JobStore(object):
+    """
+    Хранилище заданий в локальном файле SQLite, благодаря которому задания переживают
+    перезапуск процесса.
+
+    Процесс, взявший задание, продлевает владение им на lease секунд (claimed_until).
+    Задания, владение которыми истекло (процесс завершился, не выполнив их),
+    забирает любой процесс, использующий тот же файл.
+
+    Attributes:
+        lease (float): Время владения заданием в секундах.
+    """
+
+    def __init__(self, path, lease):
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS job ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, args TEXT NOT NULL, '
+                'attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL, claimed_until REAL NOT NULL, '
+                'failed INTEGER NOT NULL DEFAULT 0, last_error TEXT)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS ix_job_failed_available_at '
+                                     'ON job (failed, available_at)')
+
+    def add(self, name, args):
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.execute(
+                'INSERT INTO job (name, args, available_at, claimed_until) VALUES (?, ?, ?, ?)',
+                (name, json.dumps(args), now, now + self.lease))
+            return cursor.lastrowid
+
+    def complete(self, job_id):
+        with self._lock:
+            self._connection.execute('DELETE FROM job WHERE id = ?', (job_id,))
+
+    def retry(self, job_id, attempts, available_at, error):
+        with self._lock:
+            self._connection.execute(
+                'UPDATE job SET attempts = ?, available_at = ?, claimed_until = ?, last_error = ? WHERE id = ?',
+                (attempts, available_at, available_at + self.lease, error, job_id))
+
+    def fail(self, job_id, attempts, error):
+        # Задание, исчерпавшее попытки, остается в хранилище для разбора
+        with self._lock:
+            self._connection.execute('UPDATE job SET attempts = ?, failed = 1, last_error = ? WHERE id = ?',
+                                     (attempts, error, job_id))
+
+    def claim_due(self, limit=100):
+        """
+        Забирает задания, готовые к выполнению и не принадлежащие ни одному процессу.
+
+        Returns:
+            list of Job: Забранные задания.
+        """
+        now = time.time()
+        claimed = []
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT id, name, args, attempts, claimed_until FROM job '
+                'WHERE failed = 0 AND available_at <= ? AND claimed_until < ? ORDER BY available_at LIMIT ?',
+                (now, now, limit)).fetchall()
+            for job_id, name, args, attempts, claimed_until in rows:
+                # Условие на claimed_until: задание мог забрать другой процесс
+                cursor = self._connection.execute(
+                    'UPDATE job SET claimed_until = ? WHERE id = ? AND claimed_until = ?',
+                    (now + self.lease, job_id, claimed_until))
+                if cursor.rowcount:
+                    claimed.append(Job(job_id, name, json.loads(args), attempts))
+        return claimed
+
+
+class JobQueue(object):
+    """
+    Очередь фоновых заданий процесса: пул рабочих потоков, повторные попытки с
+    экспоненциальной задержкой и необязательное хранилище заданий в SQLite (JOBS_DATABASE).
+
+    Потоки запускаются при первом задании в процессе (в том числе после fork рабочего
+    процесса gunicorn). В режиме JOBS_EAGER задания выполняются сразу в вызывающем потоке.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.eager = app.config['JOBS_EAGER']
+        self.worker_count = app.config['JOBS_WORKERS']
+        self.max_attempts = app.config['JOBS_MAX_ATTEMPTS']
+        self.retry_delay = app.config['JOBS_RETRY_DELAY']
+        self.poll_interval = app.config['JOBS_POLL_INTERVAL']
+        path = app.config['JOBS_DATABASE']
+        self.store = JobStore(path, app.config['JOBS_LEASE']) if path and not self.eager else None
+        self.stats = {'completed': 0, 'failed': 0, 'retried': 0}
+        self._queue = queue.Queue()
+        self._delayed = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+
+    def enqueue(self, name, *args):
+        """
+        Ставит задание в очередь.
+
+        Args:
+            name (str): Имя зарегистрированного задания.
+            *args: Аргументы обработчика.
+        """
+        if name not in JOB_HANDLERS:
+            raise ValueError(f'Unknown job: {name}')
+        if self.eager:
+            self._execute(Job(None, name, list(args)))
+            return
+        self.start()
+        job_id = self.store.add(name, list(args)) if self.store else None
+        self._queue.put(Job(job_id, name, list(args)))
+
+    def depth(self):
+        """
+        Возвращает количество заданий, ожидающих выполнения (включая отложенные повторы).
+        """
+        with self._lock:
+            return self._queue.qsize() + len(self._delayed)
+
+    def start(self):
+        """
+        Запускает рабочие потоки, если в этом процессе они еще не запущены.
+        """
+        if self.eager or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Потоки не переживают fork: в новом процессе очередь создается заново
+            self._queue = queue.Queue()
+            self._delayed = []
+            for number in range(self.worker_count):
+                threading.Thread(target=self._work, name=f'job-worker-{number}', daemon=True).start()
+            threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _work(self):
+        while True:
+            self._execute(self._queue.get())
+
+    def _execute(self, job):
+        try:
+            with self.app.app_context():
+                try:
+                    JOB_HANDLERS[job.name](*job.args)
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            self._handle_failure(job, e)
+            return
+        with self._lock:
+            self.stats['completed'] += 1
+        if self.store and job.id is not None:
+            self.store.complete(job.id)
+
+    def _handle_failure(self, job, error):
+        job.attempts += 1
+        message = f'{type(error).__name__}: {error}'
+        if self.eager or job.attempts >= self.max_attempts:
+            logger.error('Job %s%r failed after %d attempts', job.name, job.args, job.attempts, exc_info=error)
+            with self._lock:
+                self.stats['failed'] += 1
+            if self.store and job.id is not None:
+                self.store.fail(job.id, job.attempts, message)
+            return
+        available_at = time.time() + self.retry_delay * 2 ** (job.attempts - 1)
+        logger.warning('Job %s%r failed (attempt %d), retrying: %s', job.name, job.args, job.attempts, message)
+        if self.store and job.id is not None:
+            self.store.retry(job.id, job.attempts, available_at, message)
+        with self._lock:
+            self.stats['retried'] += 1
+            heapq.heappush(self._delayed, (available_at, next(self._sequence), job))
+        self._wakeup.set()
+
+    def _dispatch(self):
+        # Переносит в очередь отложенные повторы, срок которых наступил, и задания
+        # из хранилища, оставшиеся от завершившихся процессов
+        while True:
+            with self._lock:
+                timeout = self._delayed[0][0] - time.time() if self._delayed else self.poll_interval
+            self._wakeup.wait(max(0, min(timeout, self.poll_interval)))
+            self._wakeup.clear()
+            now = time.time()
+            with self._lock:
+                while self._delayed and self._delayed[0][0] <= now:
+                    self._queue.put(heapq.heappop(self._delayed)[2])
+            if self.store:
+                try:
+                    for claimed in self.store.claim_due():
+                        self._queue.put(claimed)
+                except sqlite3.Error:
+                    logger.exception('Could not read the job store')
+
+
+def enqueue_after_commit(name, *args):
+    """
+    Ставит задание в очередь после фиксации текущей транзакции. Если транзакция
+    откатывается, задание отбрасывается.
+
+    Args:
+        name (str): Имя зарегистрированного задания.
+        *args: Аргументы обработчика.
+    """
+    db.session.info.setdefault(AFTER_COMMIT_JOBS, []).append((name, args))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _enqueue_committed_jobs(session):
+    jobs = session.info.pop(AFTER_COMMIT_JOBS, None)
+    if jobs:
+        job_queue = current_app.extensions['jobs']
+        for name, args in jobs:
+            job_queue.enqueue(name, *args)
+
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _discard_jobs(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(AFTER_COMMIT_JOBS, None)
+
+
+def init_jobs(app):
+    """
+    Создает очередь фоновых заданий приложения. При хранилище заданий потоки
+    запускаются с первым запросом, чтобы задания, оставшиеся с прошлого запуска,
+    выполнились без новых заданий.
+
+    Args:
+        app (Flask): Экземпляр Flask-приложения.
+    """
+    job_queue = JobQueue(app)
+    app.extensions['jobs'] = job_queue
+    if job_queue.store:
+        app.before_request(job_queue.start)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson не установлен: используется стандартный json
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON-провайдер Flask на основе orjson.
+
+    Сериализует ответы сразу в байты, минуя промежуточную строку. Даты и типы,
+    которые orjson не поддерживает, обрабатываются так же, как в DefaultJSONProvider,
+    поэтому формат ответов не меняется.
+    """
+
+    def _options(self, indent=False):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """
+    Включает OrjsonProvider, если это разрешено настройкой ORJSON_ENABLED и orjson установлен.
+
+    Args:
+        app (Flask): Экземпляр Flask-приложения.
+    """
+    if app.config.get('ORJSON_ENABLED') and orjson is not None:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from .extensions import cache, db
+
+# Границы корзин гистограмм времени (секунды) и количества SQL-запросов
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram(object):
+    """
+    Гистограмма в формате Prometheus: накопительные счетчики по корзинам, сумма
+    и количество наблюдений для каждого набора меток.
+
+    Attributes:
+        name (str): Имя метрики.
+        description (str): Описание метрики.
+        label_names (tuple of str): Имена меток.
+        buckets (tuple of float): Верхние границы корзин.
+    """
+
+    def __init__(self, name, description, label_names, buckets):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, (list(counts), total, count))
+                            for labels, (counts, total, count) in self._series.items())
+        for labels, (counts, total, count) in series:
+            label_text = ','.join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+
+class RequestMetrics(object):
+    """
+    Измерения одного запроса.
+
+    Attributes:
+        started (float): Время начала обработки запроса.
+        statements (int): Количество выполненных SQL-запросов.
+        timings (dict): Время по категориям ('db', 'serialize', 'file') в секундах.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.timings = {'db': 0.0, 'serialize': 0.0, 'file': 0.0}
+
+
+class MetricsRegistry(object):
+    """
+    Гистограммы, агрегированные по эндпоинтам в пределах процесса.
+    """
+
+    def __init__(self):
+        labels = ('endpoint', 'method')
+        self.duration = Histogram('todo_request_duration_seconds', 'Request processing time.', labels, TIME_BUCKETS)
+        self.statements = Histogram('todo_request_sql_statements', 'SQL statements per request.', labels,
+                                    COUNT_BUCKETS)
+        self.db_time = Histogram('todo_request_db_seconds', 'Time spent in SQL statements per request.', labels,
+                                 TIME_BUCKETS)
+        self.serialize_time = Histogram('todo_request_serialize_seconds',
+                                        'Time spent building and serializing responses per request.', labels,
+                                        TIME_BUCKETS)
+        self.file_time = Histogram('todo_request_file_io_seconds', 'Time spent in file I/O per request.', labels,
+                                   TIME_BUCKETS)
+
+    def record(self, labels, metrics, duration):
+        self.duration.observe(labels, duration)
+        self.statements.observe(labels, metrics.statements)
+        self.db_time.observe(labels, metrics.timings['db'])
+        self.serialize_time.observe(labels, metrics.timings['serialize'])
+        self.file_time.observe(labels, metrics.timings['file'])
+
+    def expose(self):
+        lines = []
+        for histogram in (self.duration, self.statements, self.db_time, self.serialize_time, self.file_time):
+            lines.extend(histogram.expose())
+        stats = cache.stats()
+        lines.extend([
+            '# HELP todo_response_cache_hits_total Response cache hits.',
+            '# TYPE todo_response_cache_hits_total counter',
+            f"todo_response_cache_hits_total {stats['hits']}",
+            '# HELP todo_response_cache_misses_total Response cache misses.',
+            '# TYPE todo_response_cache_misses_total counter',
+            f"todo_response_cache_misses_total {stats['misses']}",
+        ])
+        jobs = current_app.extensions.get('jobs')
+        if jobs is not None:
+            lines.extend([
+                '# HELP todo_job_queue_depth Background jobs waiting to run, including delayed retries.',
+                '# TYPE todo_job_queue_depth gauge',
+                f'todo_job_queue_depth {jobs.depth()}',
+            ])
+            for name, description in (('completed', 'Background jobs completed.'),
+                                      ('retried', 'Background job attempts that failed and were retried.'),
+                                      ('failed', 'Background jobs that failed after all attempts.')):
+                lines.extend([
+                    f'# HELP todo_jobs_{name}_total {description}',
+                    f'# TYPE todo_jobs_{name}_total counter',
+                    f'todo_jobs_{name}_total {jobs.stats[name]}',
+                ])
+        return '\n'.join(lines) + '\n'
+
+
+def _current_metrics():
+    if not has_app_context():
+        return None
+    return g.get('request_metrics')
+
+
+def timed(category):
+    """
+    Декоратор, добавляющий время выполнения функции к измерениям текущего запроса.
+    Без включенных метрик добавляет только проверку наличия измерений.
+
+    Args:
+        category (str): Категория времени ('serialize' или 'file').
+
+    Returns:
+        callable: Декоратор.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = _current_metrics()
+            if metrics is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.timings[category] += time.perf_counter() - started
+        return wrapper
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_metrics() is not None:
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current_metrics()
+    starts = conn.info.get('metrics_query_start')
+    if metrics is not None and starts:
+        metrics.statements += 1
+        metrics.timings['db'] += time.perf_counter() - starts.pop()
+
+
+def _server_timing(metrics, duration):
+    timings = metrics.timings
+    return ', '.join([
+        f'db;dur={timings["db"] * 1000:.3f};desc="{metrics.statements} queries"',
+        f'serialize;dur={timings["serialize"] * 1000:.3f}',
+        f'file;dur={timings["file"] * 1000:.3f}',
+        f'total;dur={duration * 1000:.3f}',
+    ])
+
+
+def init_metrics(app):
+    """
+    Включает измерения запросов, если METRICS_ENABLED: количество SQL-запросов и время
+    в базе данных (события движка), время сериализации и файлового ввода-вывода.
+    Результаты добавляются в заголовок Server-Timing и агрегируются в гистограммы,
+    которые отдает GET /metrics в текстовом формате Prometheus.
+
+    Гистограммы хранятся в памяти процесса: при нескольких рабочих процессах
+    каждый отдает свои значения.
+
+    Args:
+        app (Flask): Экземпляр Flask-приложения.
+    """
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    # Время jsonify учитывается как время сериализации
+    app.json.response = timed('serialize')(app.json.response)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_metrics = RequestMetrics()
+
+    @app.after_request
+    def finish_request_metrics(response):
+        metrics = g.pop('request_metrics', None)
+        if metrics is None or request.endpoint == 'metrics':
+            return response
+        duration = time.perf_counter() - metrics.started
+        registry.record((request.endpoint or 'unknown', request.method), metrics, duration)
+        response.headers['Server-Timing'] = _server_timing(metrics, duration)
+        return response
+
+    def metrics_view():
+        return app.response_class(registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -1,13 +1,21 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import validates
 from .extensions import db
 
 
+# В MySQL DATETIME по умолчанию хранит время с точностью до секунды, а от updated_at
+# зависит ETag задачи, поэтому там используются микросекунды
+Timestamp = db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+
+
 #     Связующая таблица для связи многие-ко-многим между задачами (Task) и категориями (Category).
 task_categories = db.Table('task_categories',
                            db.Column('task_id', db.Integer, db.ForeignKey('task.id'), primary_key=True),
-                           db.Column('category_id', db.Integer, db.ForeignKey('category.id'), primary_key=True)
+                           db.Column('category_id', db.Integer, db.ForeignKey('category.id'), primary_key=True),
+                           # Первичный ключ покрывает поиск по task_id, этот индекс — отбор задач по категориям
+                           db.Index('ix_task_categories_category_id_task_id', 'category_id', 'task_id')
                            )
 
 
@@ -22,17 +30,29 @@ class Task(db.Model):
         created_at (datetime): Дата и время создания задачи.
         updated_at (datetime): Дата и время последнего обновления задачи.
         file_path (str): Путь к файлу, связанному с задачей.
+        attachment_id (int): Идентификатор вложения (файла в хранилище), связанного с задачей.
         categories (list): Список категорий, к которым принадлежит задача.
     """
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(200))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow, default=datetime.utcnow)
+    created_at = db.Column(Timestamp, default=datetime.utcnow)
+    updated_at = db.Column(Timestamp, onupdate=datetime.utcnow, default=datetime.utcnow)
     file_path = db.Column(db.String(300))
-    categories = db.relationship('Category', secondary='task_categories', lazy='subquery',
+    attachment_id = db.Column(db.Integer, db.ForeignKey('attachment.id'), index=True)
+    attachment = db.relationship('Attachment')
+    # Категории загружаются только при обращении; списки задач читаются без ORM,
+    # см. services.task_rows_to_dicts
+    categories = db.relationship('Category', secondary='task_categories', lazy='select',
                                  backref=db.backref('tasks', lazy=True))
 
+    # Составные индексы для постраничного обхода (keyset) по полям сортировки
+    __table_args__ = (
+        db.Index('ix_task_created_at_id', 'created_at', 'id'),
+        db.Index('ix_task_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_task_title_id', 'title', 'id'),
+    )
+
     @validates('title')
     def validate_title(self, key, title):
         if not title:
@@ -51,8 +71,109 @@ class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
 
+    __table_args__ = (
+        db.UniqueConstraint('name', name='uq_category_name'),
+    )
+
     @validates('name')
     def validate_name(self, key, name):
         if not name:
             raise ValueError("Name is required")
         return name
+
+
+class Attachment(db.Model):
+    """
+    Класс, представляющий файл в хранилище вложений.
+
+    Файлы хранятся под именем, производным от SHA-256 содержимого, поэтому одинаковые
+    файлы, прикрепленные к разным задачам, хранятся один раз. Количество ссылок
+    поддерживается при создании, обновлении и удалении задач; файлы без ссылок
+    удаляются сборщиком мусора (см. storage.collect_garbage).
+
+    Attributes:
+        id (int): Уникальный идентификатор вложения (первичный ключ).
+        sha256 (str): SHA-256 содержимого файла.
+        file_path (str): Путь к файлу в папке загрузок.
+        size (int): Размер файла в байтах.
+        ref_count (int): Количество задач, ссылающихся на файл.
+        thumbnail_sizes (str): Размеры созданных миниатюр через запятую (пустая строка, если
+            миниатюры создать нельзя; None, если они еще не создавались), см. thumbnails.py.
+        created_at (datetime): Дата и время первой загрузки файла.
+        updated_at (datetime): Дата и время последнего изменения количества ссылок.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, unique=True)
+    file_path = db.Column(db.String(300), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    thumbnail_sizes = db.Column(db.String(100))
+    created_at = db.Column(Timestamp, default=datetime.utcnow)
+    updated_at = db.Column(Timestamp, onupdate=datetime.utcnow, default=datetime.utcnow)
+
+
+class ChangeLog(db.Model):
+    """
+    Класс, представляющий последнее изменение задачи или категории в журнале изменений.
+
+    Для каждой сущности хранится одна запись с версией последнего изменения: при новом
+    изменении старая запись заменяется, поэтому журнал не растет с количеством изменений.
+    Удаленные сущности остаются в журнале с признаком deleted, чтобы клиенты синхронизации
+    узнали об удалении (см. changes.py).
+
+    Attributes:
+        version (int): Версия изменения (первичный ключ, монотонно возрастает).
+        entity (str): Тип сущности ('task' или 'category').
+        entity_id (int): Идентификатор сущности.
+        deleted (bool): Признак удаления сущности.
+        changed_at (datetime): Дата и время изменения.
+    """
+    version = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    changed_at = db.Column(Timestamp, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('entity', 'entity_id', name='uq_change_log_entity_entity_id'),
+    )
+
+
+class ChangeCounter(db.Model):
+    """
+    Счетчик версий журнала изменений (одна строка с id = 1).
+
+    Attributes:
+        id (int): Идентификатор строки счетчика.
+        version (int): Последняя выданная версия.
+    """
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class CategoryStats(db.Model):
+    """
+    Класс, представляющий количество задач в категории. Поддерживается триггерами
+    базы данных в тех же транзакциях, что и связи задач с категориями (см. stats.py).
+
+    Attributes:
+        category_id (int): Идентификатор категории (первичный ключ).
+        task_count (int): Количество задач в категории.
+    """
+    category_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    task_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailyStats(db.Model):
+    """
+    Класс, представляющий количество задач, созданных и последний раз измененных за день (UTC).
+    Поддерживается триггерами базы данных в тех же транзакциях, что и задачи (см. stats.py).
+
+    Attributes:
+        day (date): День (первичный ключ).
+        created (int): Количество задач, у которых created_at приходится на этот день.
+        updated (int): Количество задач, у которых updated_at приходится на этот день.
+    """
+    day = db.Column(db.Date, primary_key=True)
+    created = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
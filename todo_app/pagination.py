@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import base64
+import binascii
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+from werkzeug.exceptions import BadRequest
+from .extensions import db
+from .models import Task
+
+
+# Колонки, по которым разрешена сортировка списка задач.
+# Для каждой из них есть составной индекс (колонка, id), см. Task.__table_args__.
+SORT_COLUMNS = {
+    'created_at': Task.created_at,
+    'updated_at': Task.updated_at,
+    'title': Task.title,
+}
+
+
+def parse_limit(raw_limit, default, maximum):
+    """
+    Разбирает параметр limit и ограничивает его сверху серверным максимумом.
+
+    Args:
+        raw_limit (str or None): Значение параметра из запроса.
+        default (int): Размер страницы по умолчанию.
+        maximum (int): Максимально допустимый размер страницы.
+
+    Returns:
+        int: Размер страницы.
+    """
+    if raw_limit is None:
+        return min(default, maximum)
+    try:
+        limit = int(raw_limit)
+    except ValueError:
+        raise BadRequest('Limit must be an integer')
+    if limit < 1:
+        raise BadRequest('Limit must be positive')
+    return min(limit, maximum)
+
+
+def encode_cursor(sort_by, order, value, task_id):
+    """
+    Кодирует позицию последней задачи страницы в непрозрачный курсор.
+
+    Args:
+        sort_by (str): Поле сортировки.
+        order (str): Направление сортировки ('asc' или 'desc').
+        value: Значение поля сортировки у последней задачи.
+        task_id (int): Идентификатор последней задачи.
+
+    Returns:
+        str: Курсор для получения следующей страницы.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort_by, order, value, task_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_by, order):
+    """
+    Декодирует курсор и проверяет, что он выдан для той же сортировки.
+
+    Args:
+        cursor (str): Курсор из параметров запроса.
+        sort_by (str): Текущее поле сортировки.
+        order (str): Текущее направление сортировки.
+
+    Returns:
+        tuple: Значение поля сортировки и идентификатор задачи.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, task_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise BadRequest('Invalid cursor')
+    if cursor_sort != sort_by or cursor_order != order:
+        raise BadRequest('Cursor does not match sort parameters')
+    # Значения подставляются в SQL, поэтому измененный вручную курсор проверяется
+    # по типу колонки сортировки, а не передается в запрос как есть
+    if not isinstance(task_id, int) or isinstance(task_id, bool):
+        raise BadRequest('Invalid cursor')
+    if value is not None:
+        value_type = _cursor_value_type(sort_by)
+        if value_type is datetime and isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                raise BadRequest('Invalid cursor')
+        elif value_type is datetime or not isinstance(value, value_type) or isinstance(value, bool):
+            raise BadRequest('Invalid cursor')
+    return value, task_id
+
+
+def _cursor_value_type(sort_by):
+    # Релевантность полнотекстового поиска — число (bm25 в SQLite, MATCH в MySQL)
+    sort_column = SORT_COLUMNS.get(sort_by)
+    if sort_column is None:
+        return (int, float)
+    if isinstance(sort_column.type, db.DateTime):
+        return datetime
+    return str
+
+
+def keyset_order(column, order):
+    """
+    Возвращает выражения ORDER BY для постраничного обхода по (колонка, id).
+
+    Args:
+        column: Колонка сортировки.
+        order (str): Направление сортировки.
+
+    Returns:
+        tuple: Выражения для order_by.
+    """
+    if order == 'desc':
+        return column.desc(), Task.id.desc()
+    return column.asc(), Task.id.asc()
+
+
+def keyset_filter(column, order, value, task_id):
+    """
+    Строит условие "строго после (value, task_id)" для выбранной сортировки.
+
+    SQLite и MySQL помещают NULL в начало при сортировке по возрастанию
+    и в конец при сортировке по убыванию, условие учитывает это.
+
+    Args:
+        column: Колонка сортировки.
+        order (str): Направление сортировки.
+        value: Значение колонки у последней задачи предыдущей страницы.
+        task_id (int): Идентификатор последней задачи предыдущей страницы.
+
+    Returns:
+        ColumnElement: Условие для where.
+    """
+    if order == 'desc':
+        if value is None:
+            return and_(column.is_(None), Task.id < task_id)
+        return or_(column < value, and_(column == value, Task.id < task_id), column.is_(None))
+    if value is None:
+        return or_(and_(column.is_(None), Task.id > task_id), column.isnot(None))
+    return or_(column > value, and_(column == value, Task.id > task_id))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy import select
+from werkzeug.exceptions import BadRequest
+from .filters import apply_category_filter, parse_category_args
+from .models import Task
+from .pagination import SORT_COLUMNS
+from .search import apply_search
+from .services import task_columns
+
+
+def build_task_query(args, fields):
+    """
+    Строит запрос списка задач по параметрам фильтрации, поиска и сортировки.
+
+    Используется списком задач и экспортом, чтобы оба эндпоинта понимали
+    одинаковые параметры category, match, exclude, q, sort и order.
+
+    Args:
+        args (MultiDict): Параметры запроса.
+        fields (tuple of str): Запрошенные поля задачи.
+
+    Returns:
+        tuple: Запрос (без сортировки и ограничения), поле сортировки,
+        колонка сортировки и направление сортировки.
+    """
+    category_names, match_mode, excluded_names = parse_category_args(args)
+    search_text = args.get('q', '').strip()
+    sort_by = args.get('sort', 'relevance' if search_text else 'created_at')
+    order = 'desc' if args.get('order', 'asc') == 'desc' else 'asc'
+
+    query = select(*task_columns(fields))
+
+    # Полнотекстовый поиск
+    relevance = None
+    if search_text:
+        query, relevance, relevance_order = apply_search(query, search_text)
+
+    if sort_by == 'relevance' and relevance is not None:
+        # Результаты поиска по умолчанию упорядочены по релевантности
+        query = query.add_columns(relevance.label('relevance'))
+        sort_column, order = relevance, relevance_order
+    elif sort_by in SORT_COLUMNS:
+        sort_column = SORT_COLUMNS[sort_by]
+    elif sort_by == 'relevance' and search_text:
+        # Диалект не поддерживает ранжирование: сортируем по дате создания
+        sort_by, sort_column = 'created_at', Task.created_at
+    else:
+        raise BadRequest('Invalid sort field')
+    if sort_by in SORT_COLUMNS and sort_by not in fields:
+        # Значение поля сортировки нужно для курсора, даже если поле не запрошено
+        query = query.add_columns(sort_column)
+
+    # Фильтрация по категориям
+    query = apply_category_filter(query, category_names, match_mode, excluded_names)
+    return query, sort_by, sort_column, order
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from contextlib import contextmanager
+from sqlalchemy import DDL, column, event, literal_column, or_, table, text
+from sqlalchemy.dialects.mysql import match
+from .extensions import db
+from .models import Task
+
+
+# Полнотекстовый индекс по title и description.
+# SQLite: внешняя FTS5-таблица над task, которая поддерживается триггерами при вставке,
+# обновлении и удалении задач (в том числе пакетных). MySQL: индекс FULLTEXT,
+# который СУБД поддерживает сама.
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS task_fts "
+    "USING fts5(title, description, content='task', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_ai AFTER INSERT ON task BEGIN "
+    "INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_ad AFTER DELETE ON task BEGIN "
+    "INSERT INTO task_fts(task_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_au AFTER UPDATE OF title, description ON task BEGIN "
+    "INSERT INTO task_fts(task_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+MYSQL_FULLTEXT_DDL = "ALTER TABLE task ADD FULLTEXT INDEX ft_task_title_description (title, description)"
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(Task.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Task.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS task_fts').execute_if(dialect='sqlite'))
+event.listen(Task.__table__, 'after_create', DDL(MYSQL_FULLTEXT_DDL).execute_if(dialect='mysql'))
+
+task_fts = table('task_fts', column('rowid'), column('rank'))
+
+
+@contextmanager
+def deferred_search_index():
+    """
+    Откладывает индексацию задач, вставляемых пакетно, до конца блока.
+
+    В SQLite построчный триггер task_fts_ai — основная стоимость пакетной вставки.
+    На время блока он удаляется в текущей транзакции, а вставленные задачи индексируются
+    одним INSERT ... SELECT по диапазону идентификаторов, после чего триггер создается
+    заново. При ошибке откат транзакции восстанавливает триггер. В других диалектах
+    блок ничего не меняет.
+
+    Yields:
+        list: Список, в который добавляются идентификаторы вставленных задач;
+        они должны образовывать непрерывный диапазон.
+    """
+    task_ids = []
+    connection = db.session.connection()
+    trigger_exists = connection.dialect.name == 'sqlite' and connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'task_fts_ai'").first()
+    if not trigger_exists:
+        yield task_ids
+        return
+
+    if not connection.connection.dbapi_connection.in_transaction:
+        # pysqlite начинает транзакцию только перед DML, а DDL ниже должен выполниться в ней
+        connection.exec_driver_sql('BEGIN')
+    connection.exec_driver_sql('DROP TRIGGER task_fts_ai')
+    yield task_ids
+    if task_ids:
+        db.session.execute(text('INSERT INTO task_fts(rowid, title, description) '
+                                'SELECT id, title, description FROM task WHERE id BETWEEN :first AND :last'),
+                           {'first': min(task_ids), 'last': max(task_ids)})
+    connection.exec_driver_sql(SQLITE_FTS_DDL[1])
+
+
+def fts5_query(text):
+    """
+    Преобразует пользовательскую строку поиска в запрос FTS5: каждое слово
+    берется в кавычки, поэтому спецсимволы синтаксиса FTS5 не интерпретируются.
+    Слова объединяются по И.
+
+    Args:
+        text (str): Строка поиска.
+
+    Returns:
+        str: Запрос для оператора MATCH.
+    """
+    return ' '.join('"%s"' % token.replace('"', '""') for token in text.split())
+
+
+def apply_search(query, text):
+    """
+    Добавляет к запросу задач полнотекстовый поиск по title и description.
+
+    Args:
+        query (Select): Запрос задач.
+        text (str): Строка поиска.
+
+    Returns:
+        tuple: Запрос с условием поиска, выражение релевантности (или None, если
+        диалект не поддерживает ранжирование) и направление сортировки по релевантности.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        query = (query.join(task_fts, task_fts.c.rowid == Task.id)
+                 .where(literal_column('task_fts').op('MATCH')(fts5_query(text))))
+        # rank в FTS5 — значение bm25: чем меньше, тем релевантнее
+        return query, task_fts.c.rank, 'asc'
+    if dialect == 'mysql':
+        relevance = match(Task.title, Task.description, against=text).in_natural_language_mode()
+        return query.where(relevance > 0), relevance, 'desc'
+
+    pattern = f'%{text}%'
+    return query.where(or_(Task.title.ilike(pattern), Task.description.ilike(pattern))), None, None
@@ -1,9 +1,18 @@
 # -*- coding: utf-8 -*-
-import os
+import hashlib
+from datetime import datetime, timezone
+from flask import current_app, request
+from sqlalchemy import select
 from werkzeug.exceptions import BadRequest
-from werkzeug.utils import secure_filename
+from .changelog import record_changes
+from .dialects import insert_missing
 from .extensions import db
-from .models import Category
+from .jobs import enqueue_after_commit
+from .metrics import timed
+from .models import Attachment, Category, Task, task_categories
+from .storage import register_attachment
+from .thumbnails import THUMBNAIL_FORMATS, thumbnail_urls
+from .uploads import store_upload
 
 
 def allowed_file(filename):
@@ -23,40 +32,108 @@ def handle_file_upload(request, upload_folder):
     """
     Обрабатывает загрузку файла и сохраняет его в указанную папку.
 
+    Файл записывается потоково во временный файл (см. uploads.UploadRequest) и затем
+    атомарно перемещается под имя, производное от SHA-256 содержимого. Одинаковые файлы
+    хранятся один раз и регистрируются как одно вложение (см. storage). Для изображений
+    после фиксации транзакции создаются миниатюры (см. thumbnails).
+
     Args:
         request (Request): Запрос Flask, содержащий файл.
         upload_folder (str): Путь к папке, в которую нужно сохранить файл.
 
     Returns:
-        str or None: Путь к сохраненному файлу, если файл успешно загружен и сохранен, иначе None.
+        Attachment or None: Вложение с сохраненным файлом, если файл успешно загружен и сохранен, иначе None.
     """
     if 'file' in request.files:
         file_storage = request.files['file']
         if file_storage and allowed_file(file_storage.filename):
-            filename = secure_filename(file_storage.filename)
-            file_path = os.path.join(upload_folder, filename)
-            file_storage.save(file_path)
-            return file_path
+            # Расширение уже проверено allowed_file, поэтому его можно использовать в имени файла
+            extension = file_storage.filename.rsplit('.', 1)[1].lower()
+            attachment = register_attachment(*store_upload(file_storage, upload_folder, extension))
+            if extension in THUMBNAIL_FORMATS and attachment.thumbnail_sizes is None and \
+                    current_app.extensions['thumbnails'].enabled:
+                enqueue_after_commit('generate_thumbnails', attachment.id)
+            return attachment
     return None
 
 
+def get_task_data(request):
+    """
+    Извлекает данные задачи из JSON или из формы (multipart/form-data для запросов с файлом).
+
+    Args:
+        request (Request): Запрос Flask.
+
+    Returns:
+        dict or None: Данные задачи.
+    """
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        data = request.form.to_dict()
+        if 'categories' in request.form:
+            data['categories'] = request.form.getlist('categories')
+        return data
+    return request.get_json()
+
+
+def resolve_categories(category_names):
+    """
+    Находит категории по названиям одним запросом и создает недостающие в текущей транзакции.
+
+    Args:
+        category_names (list of str): Список названий категорий.
+
+    Returns:
+        dict: Словарь {название: Category} в порядке первого упоминания названий.
+    """
+    names = list(dict.fromkeys(name for name in category_names if name))
+    if not names:
+        return {}
+
+    found = {category.name: category for category in Category.query.filter(Category.name.in_(names))}
+    missing = [name for name in names if name not in found]
+    if missing:
+        insert_missing(Category, [{'name': name} for name in missing])
+        # Перечитываем созданные категории, включая созданные параллельными запросами
+        created = {category.name: category for category in Category.query.filter(Category.name.in_(missing))}
+        record_changes('category', [category.id for category in created.values()])
+        found.update(created)
+    return {name: found[name] for name in names}
+
+
 def handle_categories(category_names, task):
     """
     Обрабатывает категории для задачи, создавая новые категории, если они не существуют,
     и добавляя их к задаче.
 
+    Все категории ищутся одним запросом, недостающие создаются в той же транзакции,
+    что и задача.
+
     Args:
         category_names (list of str): Список названий категорий.
         task (Task): Задача, к которой нужно добавить категории.
     """
-    for category_name in category_names:
-        category = Category.query.filter_by(name=category_name).first()
-        if not category:
-            category = Category(name=category_name)
-            db.session.add(category)
-            db.session.commit()
+    added = False
+    for category in resolve_categories(category_names).values():
         if category not in task.categories:
             task.categories.append(category)
+            added = True
+    # Список категорий входит в представление задачи, поэтому его изменение
+    # тоже считается обновлением задачи (от updated_at зависит ETag)
+    if added and task.id is not None:
+        task.updated_at = datetime.utcnow()
+
+
+def attachment_thumbnail_sizes(task):
+    """
+    Возвращает размеры созданных миниатюр вложения задачи.
+
+    Args:
+        task (Task): Объект задачи.
+
+    Returns:
+        str or None: Размеры миниатюр через запятую (Attachment.thumbnail_sizes) или None без вложения.
+    """
+    return task.attachment.thumbnail_sizes if task.attachment else None
 
 
 def task_to_dict(task):
@@ -76,10 +153,231 @@ def task_to_dict(task):
         'created_at': task.created_at.isoformat() if task.created_at else None,
         'updated_at': task.updated_at.isoformat() if task.updated_at else None,
         'file_path': task.file_path,
+        'thumbnails': thumbnail_urls(task.id, attachment_thumbnail_sizes(task)),
         'categories': [category.name for category in task.categories]
     }
 
 
+# Колонки задачи, которые читаются для ответов API без создания ORM-объектов
+TASK_COLUMNS = (Task.id, Task.title, Task.description, Task.created_at, Task.updated_at, Task.file_path)
+
+# Размеры миниатюр вложения задачи. Коррелированный подзапрос не требует JOIN
+# в запросах списка задач и выполняется только для поля thumbnails.
+THUMBNAIL_SIZES_COLUMN = (select(Attachment.thumbnail_sizes)
+                          .where(Attachment.id == Task.attachment_id)
+                          .scalar_subquery()
+                          .label('thumbnail_sizes'))
+
+# Поля задачи, которые можно запросить параметром fields (в порядке вывода).
+# Категории хранятся в отдельной таблице и загружаются дополнительным запросом.
+TASK_FIELDS = ('id', 'title', 'description', 'created_at', 'updated_at', 'file_path', 'thumbnails', 'categories')
+
+
+def parse_fields(raw_fields):
+    """
+    Разбирает параметр fields — список полей задачи через запятую.
+
+    Args:
+        raw_fields (str or None): Значение параметра из запроса.
+
+    Returns:
+        tuple of str: Запрошенные поля в порядке TASK_FIELDS (все поля, если параметр не задан).
+    """
+    if raw_fields is None:
+        return TASK_FIELDS
+    requested = {name.strip() for name in raw_fields.split(',') if name.strip()}
+    if not requested:
+        raise BadRequest('Fields must not be empty')
+    unknown = requested.difference(TASK_FIELDS)
+    if unknown:
+        raise BadRequest('Invalid fields: ' + ', '.join(sorted(unknown)))
+    return tuple(name for name in TASK_FIELDS if name in requested)
+
+
+def task_columns(fields=TASK_FIELDS):
+    """
+    Возвращает колонки задачи, которые нужно выбрать для указанных полей.
+
+    id и updated_at выбираются всегда: по ним вычисляются ETag и Last-Modified.
+
+    Args:
+        fields (tuple of str): Запрошенные поля.
+
+    Returns:
+        list: Колонки для select.
+    """
+    columns = [column for column in TASK_COLUMNS
+               if column.key in fields or column.key in ('id', 'updated_at')]
+    if 'thumbnails' in fields:
+        columns.append(THUMBNAIL_SIZES_COLUMN)
+    return columns
+
+
+def fetch_category_names(task_ids):
+    """
+    Загружает названия категорий для набора задач одним запросом.
+
+    Args:
+        task_ids (list of int): Идентификаторы задач.
+
+    Returns:
+        dict: Словарь {идентификатор задачи: [названия категорий]}.
+    """
+    names = {}
+    if not task_ids:
+        return names
+    rows = db.session.execute(
+        select(task_categories.c.task_id, Category.name)
+        .join(Category, Category.id == task_categories.c.category_id)
+        .where(task_categories.c.task_id.in_(task_ids))
+    )
+    for task_id, name in rows:
+        names.setdefault(task_id, []).append(name)
+    return names
+
+
+def task_rows_to_dicts(rows, fields=TASK_FIELDS):
+    """
+    Преобразует строки с колонками TASK_COLUMNS в словари для сериализации в JSON.
+    Категории всех задач загружаются одним дополнительным запросом, и только
+    если они запрошены.
+
+    Args:
+        rows (list of Row): Строки результата запроса select(*task_columns(fields)).
+        fields (tuple of str): Поля, которые попадут в словари.
+
+    Returns:
+        list of dict: Словари с данными о задачах в формате task_to_dict.
+    """
+    # Запрос категорий учитывается во времени базы данных, а не сериализации
+    categories = fetch_category_names([row.id for row in rows]) if 'categories' in fields else {}
+    return _build_task_dicts(rows, fields, categories)
+
+
+@timed('serialize')
+def _build_task_dicts(rows, fields, categories):
+    column_fields = [name for name in fields if name not in ('thumbnails', 'categories')]
+    dicts = []
+    for row in rows:
+        data = {}
+        for name in column_fields:
+            value = getattr(row, name)
+            data[name] = value.isoformat() if isinstance(value, datetime) else value
+        if 'thumbnails' in fields:
+            data['thumbnails'] = thumbnail_urls(row.id, row.thumbnail_sizes)
+        if 'categories' in fields:
+            data['categories'] = categories.get(row.id, [])
+        dicts.append(data)
+    return dicts
+
+
+def task_etag(row, thumbnail_sizes=None):
+    """
+    Вычисляет сильный ETag задачи.
+
+    ETag зависит только от идентификатора и updated_at задачи и от размеров миниатюр ее
+    вложения (миниатюры создаются фоновым заданием без изменения updated_at), поэтому
+    одинаков для всех представлений задачи (параметр fields) и для проверки If-Match
+    при обновлении по любому URL. Его можно проверить до загрузки категорий и сериализации.
+
+    Args:
+        row: Строка или объект задачи с атрибутами id и updated_at.
+        thumbnail_sizes (str or None): Размеры созданных миниатюр вложения (Attachment.thumbnail_sizes).
+
+    Returns:
+        str: Значение ETag без кавычек.
+    """
+    updated_at = row.updated_at.isoformat() if row.updated_at else ''
+    value = f'{row.id}:{updated_at}:{thumbnail_sizes}' if thumbnail_sizes else f'{row.id}:{updated_at}'
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+def task_list_etag(rows, extra=None):
+    """
+    Вычисляет сильный ETag для списка задач.
+
+    ETag зависит от идентификаторов, updated_at и миниатюр задач, а также от параметров запроса
+    (фильтры, сортировка и поля меняют состав списка), поэтому его можно проверить
+    до загрузки категорий и сериализации.
+
+    Args:
+        rows (list): Строки или объекты задач с атрибутами id и updated_at.
+        extra: Дополнительные данные ответа, от которых зависит ETag.
+
+    Returns:
+        str: Значение ETag без кавычек.
+    """
+    digest = hashlib.sha1()
+    for key, values in sorted(request.args.lists()):
+        digest.update(f'{key}={values!r}&'.encode('utf-8'))
+    if extra is not None:
+        digest.update(repr(extra).encode('utf-8'))
+    for row in rows:
+        updated_at = row.updated_at.isoformat() if row.updated_at else ''
+        digest.update(f"{row.id}:{updated_at}:{getattr(row, 'thumbnail_sizes', '')};".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def last_modified(rows):
+    """
+    Возвращает наибольшее значение updated_at среди задач (в UTC).
+
+    Args:
+        rows (list): Строки или объекты задач с атрибутом updated_at.
+
+    Returns:
+        datetime or None: Время последнего изменения.
+    """
+    values = [row.updated_at for row in rows if row.updated_at]
+    return max(values).replace(tzinfo=timezone.utc) if values else None
+
+
+def task_last_modified(row, thumbnail_sizes=None):
+    """
+    Возвращает Last-Modified задачи.
+
+    Миниатюры создаются фоновым заданием без изменения updated_at, поэтому у задачи
+    с миниатюрами updated_at не отражает последнее изменение ответа: такая задача
+    проверяется только по ETag (см. task_etag).
+
+    Args:
+        row: Строка или объект задачи с атрибутом updated_at.
+        thumbnail_sizes (str or None): Размеры созданных миниатюр вложения.
+
+    Returns:
+        datetime or None: Время последнего изменения (None, если у задачи есть миниатюры).
+    """
+    return None if thumbnail_sizes else last_modified([row])
+
+
+def not_modified_response(etag, modified_at):
+    """
+    Проверяет условные заголовки If-None-Match и If-Modified-Since.
+
+    Args:
+        etag (str): Текущий ETag ресурса.
+        modified_at (datetime or None): Время последнего изменения ресурса.
+
+    Returns:
+        Response or None: Ответ 304, если у клиента актуальная версия, иначе None.
+    """
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    elif request.if_modified_since and modified_at:
+        fresh = modified_at.replace(microsecond=0) <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    # Присваивание None записало бы в Last-Modified текущее время
+    if modified_at:
+        response.last_modified = modified_at
+    return response
+
+
+@timed('serialize')
 def category_to_dict(category):
     """
     Преобразует объект категории в словарь для сериализации в JSON.
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from flask import has_request_context, request
+from sqlalchemy import event
+from .extensions import db
+
+logger = logging.getLogger(__name__)
+
+# Префикс запроса плана выполнения для диалектов, которые его поддерживают
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'mysql': 'EXPLAIN ',
+}
+# Максимальная длина параметров в сообщении журнала
+MAX_PARAMETERS_LENGTH = 1000
+
+
+def explain(connection, statement, parameters):
+    """
+    Возвращает план выполнения SELECT-запроса для SQLite и MySQL.
+
+    Args:
+        connection (Connection): Соединение SQLAlchemy, на котором выполнялся запрос.
+        statement (str): Текст запроса в формате драйвера.
+        parameters: Параметры запроса в формате драйвера.
+
+    Returns:
+        list of tuple or None: Строки плана или None, если план получить нельзя.
+    """
+    prefix = EXPLAIN_PREFIXES.get(connection.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith('SELECT'):
+        return None
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [tuple(row) for row in cursor.fetchall()]
+    except Exception:
+        logger.debug('Could not explain slow query', exc_info=True)
+        return None
+    finally:
+        cursor.close()
+
+
+def _route_description():
+    if not has_request_context():
+        return '-'
+    return f'{request.method} {request.path} endpoint={request.endpoint} ' \
+           f'view_args={request.view_args} args={request.args.to_dict(flat=False)}'
+
+
+def init_slow_query_log(app):
+    """
+    Включает журнал медленных запросов: запросы дольше SLOW_QUERY_THRESHOLD_MS миллисекунд
+    записываются с текстом SQL, параметрами и аргументами маршрута, для SELECT-запросов
+    в SQLite и MySQL добавляется план выполнения (при SLOW_QUERY_EXPLAIN).
+
+    Args:
+        app (Flask): Экземпляр Flask-приложения.
+    """
+    threshold = app.config.get('SLOW_QUERY_THRESHOLD_MS', 0) / 1000
+    if threshold <= 0:
+        return
+    capture_plan = app.config.get('SLOW_QUERY_EXPLAIN', True)
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('slow_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if elapsed < threshold:
+            return
+        plan = explain(conn, statement, parameters) if capture_plan and not executemany else None
+        logger.warning('Slow query (%.1f ms): %s; parameters: %.*s; route: %s%s',
+                       elapsed * 1000, statement, MAX_PARAMETERS_LENGTH, repr(parameters),
+                       _route_description(), f'; plan: {plan}' if plan else '')
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
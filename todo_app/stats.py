@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+from contextlib import contextmanager
+from datetime import date
+import click
+from flask.cli import AppGroup
+from sqlalchemy import DDL, delete, event, func, insert, or_, select, text
+from werkzeug.exceptions import BadRequest
+from .extensions import db
+from .models import Category, CategoryStats, DailyStats, Task, task_categories
+
+
+def _sqlite_increment(column, counter):
+    return (f"INSERT INTO daily_stats (day, created, updated) "
+            f"SELECT date(new.{column}), {int(counter == 'created')}, {int(counter == 'updated')} "
+            f"WHERE new.{column} IS NOT NULL "
+            f"ON CONFLICT (day) DO UPDATE SET {counter} = {counter} + 1;")
+
+
+def _sqlite_decrement(column, counter):
+    return f"UPDATE daily_stats SET {counter} = {counter} - 1 WHERE day = date(old.{column});"
+
+
+def _mysql_increment(column, counter):
+    return (f"IF NEW.{column} IS NOT NULL THEN "
+            f"INSERT INTO daily_stats (day, created, updated) "
+            f"VALUES (DATE(NEW.{column}), {int(counter == 'created')}, {int(counter == 'updated')}) "
+            f"ON DUPLICATE KEY UPDATE {counter} = {counter} + 1; END IF;")
+
+
+def _mysql_decrement(column, counter):
+    return f"UPDATE daily_stats SET {counter} = {counter} - 1 WHERE day = DATE(OLD.{column});"
+
+
+# Сводные таблицы статистики поддерживаются триггерами в той же транзакции, что и изменение
+# задач и связей с категориями, в том числе пакетными запросами в обход ORM (импорт,
+# массовое удаление). Триггеры создаются после создания всех таблиц схемы.
+SQLITE_STATS_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS task_stats_ai AFTER INSERT ON task BEGIN "
+    + _sqlite_increment('created_at', 'created') + _sqlite_increment('updated_at', 'updated') + " END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_ad AFTER DELETE ON task BEGIN "
+    + _sqlite_decrement('created_at', 'created') + _sqlite_decrement('updated_at', 'updated') + " END",
+    # Обычное изменение задачи не меняет день updated_at и не затрагивает статистику
+    "CREATE TRIGGER IF NOT EXISTS task_stats_au_created AFTER UPDATE OF created_at ON task "
+    "WHEN date(old.created_at) IS NOT date(new.created_at) BEGIN "
+    + _sqlite_decrement('created_at', 'created') + _sqlite_increment('created_at', 'created') + " END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_au_updated AFTER UPDATE OF updated_at ON task "
+    "WHEN date(old.updated_at) IS NOT date(new.updated_at) BEGIN "
+    + _sqlite_decrement('updated_at', 'updated') + _sqlite_increment('updated_at', 'updated') + " END",
+    "CREATE TRIGGER IF NOT EXISTS task_categories_stats_ai AFTER INSERT ON task_categories BEGIN "
+    "INSERT INTO category_stats (category_id, task_count) VALUES (new.category_id, 1) "
+    "ON CONFLICT (category_id) DO UPDATE SET task_count = task_count + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS task_categories_stats_ad AFTER DELETE ON task_categories BEGIN "
+    "UPDATE category_stats SET task_count = task_count - 1 WHERE category_id = old.category_id; END",
+    "CREATE TRIGGER IF NOT EXISTS category_stats_ad AFTER DELETE ON category BEGIN "
+    "DELETE FROM category_stats WHERE category_id = old.id; END",
+)
+MYSQL_STATS_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS task_stats_ai AFTER INSERT ON task FOR EACH ROW BEGIN "
+    + _mysql_increment('created_at', 'created') + _mysql_increment('updated_at', 'updated') + " END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_ad AFTER DELETE ON task FOR EACH ROW BEGIN "
+    + _mysql_decrement('created_at', 'created') + _mysql_decrement('updated_at', 'updated') + " END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_au AFTER UPDATE ON task FOR EACH ROW BEGIN "
+    "IF NOT (DATE(OLD.created_at) <=> DATE(NEW.created_at)) THEN "
+    + _mysql_decrement('created_at', 'created') + _mysql_increment('created_at', 'created') + " END IF; "
+    "IF NOT (DATE(OLD.updated_at) <=> DATE(NEW.updated_at)) THEN "
+    + _mysql_decrement('updated_at', 'updated') + _mysql_increment('updated_at', 'updated') + " END IF; END",
+    "CREATE TRIGGER IF NOT EXISTS task_categories_stats_ai AFTER INSERT ON task_categories FOR EACH ROW "
+    "INSERT INTO category_stats (category_id, task_count) VALUES (NEW.category_id, 1) "
+    "ON DUPLICATE KEY UPDATE task_count = task_count + 1",
+    "CREATE TRIGGER IF NOT EXISTS task_categories_stats_ad AFTER DELETE ON task_categories FOR EACH ROW "
+    "UPDATE category_stats SET task_count = task_count - 1 WHERE category_id = OLD.category_id",
+    "CREATE TRIGGER IF NOT EXISTS category_stats_ad AFTER DELETE ON category FOR EACH ROW "
+    "DELETE FROM category_stats WHERE category_id = OLD.id",
+)
+# Диалекты, в которых статистика поддерживается триггерами; в остальных она вычисляется запросом
+STATS_DIALECTS = ('sqlite', 'mysql')
+
+for statement in SQLITE_STATS_DDL:
+    event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in MYSQL_STATS_DDL:
+    event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect='mysql'))
+
+
+@contextmanager
+def deferred_stats():
+    """
+    Откладывает обновление статистики для задач, вставляемых пакетно, до конца блока.
+
+    Как и search.deferred_search_index: в SQLite построчные триггеры вставки задач и связей
+    с категориями на время блока удаляются в текущей транзакции, а статистика вставленных
+    задач добавляется сгруппированными запросами по диапазону идентификаторов, после чего
+    триггеры создаются заново. В других диалектах блок ничего не меняет.
+
+    Yields:
+        list: Список, в который добавляются идентификаторы вставленных задач;
+        они должны образовывать непрерывный диапазон.
+    """
+    task_ids = []
+    connection = db.session.connection()
+    trigger_exists = connection.dialect.name == 'sqlite' and connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'task_stats_ai'").first()
+    if not trigger_exists:
+        yield task_ids
+        return
+
+    if not connection.connection.dbapi_connection.in_transaction:
+        # pysqlite начинает транзакцию только перед DML, а DDL ниже должен выполниться в ней
+        connection.exec_driver_sql('BEGIN')
+    connection.exec_driver_sql('DROP TRIGGER task_stats_ai')
+    connection.exec_driver_sql('DROP TRIGGER task_categories_stats_ai')
+    yield task_ids
+    if task_ids:
+        bounds = {'first': min(task_ids), 'last': max(task_ids)}
+        for column, counter in (('created_at', 'created'), ('updated_at', 'updated')):
+            counts = 'COUNT(*), 0' if counter == 'created' else '0, COUNT(*)'
+            db.session.execute(text(
+                f"INSERT INTO daily_stats (day, created, updated) SELECT date({column}), {counts} FROM task "
+                f"WHERE id BETWEEN :first AND :last AND {column} IS NOT NULL GROUP BY date({column}) "
+                f"ON CONFLICT (day) DO UPDATE SET {counter} = {counter} + excluded.{counter}"), bounds)
+        db.session.execute(text(
+            "INSERT INTO category_stats (category_id, task_count) SELECT category_id, COUNT(*) FROM task_categories "
+            "WHERE task_id BETWEEN :first AND :last GROUP BY category_id "
+            "ON CONFLICT (category_id) DO UPDATE SET task_count = task_count + excluded.task_count"), bounds)
+    connection.exec_driver_sql(SQLITE_STATS_DDL[0])
+    connection.exec_driver_sql(SQLITE_STATS_DDL[4])
+
+
+def parse_day(raw_day):
+    """
+    Разбирает дату в формате YYYY-MM-DD из параметра запроса.
+
+    Args:
+        raw_day (str or None): Значение параметра.
+
+    Returns:
+        date or None: Дата (None, если параметр не передан).
+    """
+    if raw_day is None or raw_day == '':
+        return None
+    try:
+        return date.fromisoformat(raw_day)
+    except ValueError:
+        raise BadRequest('Invalid date, expected YYYY-MM-DD')
+
+
+def _as_date(value):
+    # date() в SQLite возвращает строку, в MySQL и PostgreSQL — дату
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def aggregate_category_counts():
+    """
+    Подсчитывает количество задач в каждой категории по таблице task_categories.
+
+    Returns:
+        dict: Словарь {идентификатор категории: количество задач}.
+    """
+    return dict(db.session.execute(
+        select(task_categories.c.category_id, func.count())
+        .group_by(task_categories.c.category_id)
+    ).all())
+
+
+def aggregate_daily_counts():
+    """
+    Подсчитывает по таблице задач, сколько задач создано и последний раз изменено в каждый день.
+
+    Returns:
+        dict: Словарь {день: {'created': количество, 'updated': количество}}.
+    """
+    days = {}
+    for key, column in (('created', Task.created_at), ('updated', Task.updated_at)):
+        day = func.date(column)
+        rows = db.session.execute(select(day, func.count()).where(column.isnot(None)).group_by(day))
+        for value, count in rows:
+            days.setdefault(_as_date(value), {'created': 0, 'updated': 0})[key] = count
+    return days
+
+
+def rebuild_stats():
+    """
+    Пересчитывает сводные таблицы статистики по данным задач в одной транзакции.
+    Нужен после включения статистики в существующей базе или после изменения данных
+    в обход триггеров.
+
+    Returns:
+        tuple: Количество строк статистики категорий и дней.
+    """
+    # Удаление в начале транзакции блокирует запись параллельных транзакций
+    # до фиксации, поэтому пересчитанные значения не устаревают
+    db.session.execute(delete(CategoryStats))
+    db.session.execute(delete(DailyStats))
+    category_rows = [{'category_id': category_id, 'task_count': count}
+                     for category_id, count in aggregate_category_counts().items()]
+    daily_rows = [dict(counts, day=day) for day, counts in aggregate_daily_counts().items()]
+    if category_rows:
+        db.session.execute(insert(CategoryStats.__table__), category_rows)
+    if daily_rows:
+        db.session.execute(insert(DailyStats.__table__), daily_rows)
+    db.session.commit()
+    return len(category_rows), len(daily_rows)
+
+
+def get_stats(start=None, end=None):
+    """
+    Возвращает количество задач по категориям и по дням создания и изменения.
+
+    Значения читаются из сводных таблиц, поэтому время ответа не зависит от количества
+    задач. В диалектах без триггеров статистики значения вычисляются запросом.
+
+    Args:
+        start (date or None): Первый день выборки по дням (включительно).
+        end (date or None): Последний день выборки по дням (включительно).
+
+    Returns:
+        dict: Общее количество задач, категории с количеством задач и статистика по дням.
+    """
+    categories = db.session.execute(select(Category.id, Category.name).order_by(Category.name)).all()
+    if db.session.get_bind().dialect.name in STATS_DIALECTS:
+        counts = dict(db.session.execute(select(CategoryStats.category_id, CategoryStats.task_count)).all())
+        total = db.session.scalar(select(func.coalesce(func.sum(DailyStats.created), 0)))
+        query = (select(DailyStats.day, DailyStats.created, DailyStats.updated)
+                 .where(or_(DailyStats.created != 0, DailyStats.updated != 0))
+                 .order_by(DailyStats.day))
+        if start is not None:
+            query = query.where(DailyStats.day >= start)
+        if end is not None:
+            query = query.where(DailyStats.day <= end)
+        days = [(row.day, {'created': row.created, 'updated': row.updated}) for row in db.session.execute(query)]
+    else:
+        counts = aggregate_category_counts()
+        daily_counts = aggregate_daily_counts()
+        total = sum(day_counts['created'] for day_counts in daily_counts.values())
+        days = [(day, day_counts) for day, day_counts in sorted(daily_counts.items())
+                if (start is None or day >= start) and (end is None or day <= end)]
+
+    return {
+        'tasks': total,
+        'categories': [{'id': category.id, 'name': category.name, 'tasks': counts.get(category.id, 0)}
+                       for category in categories],
+        'days': [{'date': day.isoformat(), **day_counts} for day, day_counts in days],
+    }
+
+
+# Команды CLI для обслуживания статистики: flask stats rebuild
+stats_cli = AppGroup('stats', help='Task statistics maintenance.')
+
+
+@stats_cli.command('rebuild')
+def rebuild_command():
+    """Recompute the statistics tables from the tasks table."""
+    category_count, day_count = rebuild_stats()
+    click.echo(f'Rebuilt statistics for {category_count} categories and {day_count} days')
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+import click
+from flask import current_app, request, send_file
+from flask.cli import AppGroup
+from sqlalchemy import delete, select, update
+from .dialects import insert_missing
+from .extensions import db
+from .fileio import run_blocking
+from .jobs import job
+from .metrics import timed
+from .models import Attachment, Task
+
+logger = logging.getLogger(__name__)
+
+# Имена файлов, которыми управляет хранилище: <sha256>.<расширение> и временные файлы загрузки
+_BLOB_NAME = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]+$')
+# Миниатюры изображений: <sha256>.<размер>.<расширение> (см. thumbnails)
+_THUMBNAIL_NAME = re.compile(r'^([0-9a-f]{64})\.\d+\.[a-z0-9]+$')
+_TEMP_PREFIX = '.upload-'
+
+
+def register_attachment(file_path, digest, size):
+    """
+    Находит вложение по SHA-256 содержимого или создает новое в текущей транзакции.
+
+    Args:
+        file_path (str): Путь к сохраненному файлу.
+        digest (str): SHA-256 содержимого.
+        size (int): Размер файла в байтах.
+
+    Returns:
+        Attachment: Вложение.
+    """
+    now = datetime.utcnow()
+    insert_missing(Attachment, [{'sha256': digest, 'file_path': file_path, 'size': size,
+                                 'ref_count': 0, 'created_at': now, 'updated_at': now}])
+    return Attachment.query.filter_by(sha256=digest).one()
+
+
+def _change_references(attachment_ids, delta):
+    """
+    Атомарно изменяет количество ссылок на вложения.
+
+    Args:
+        attachment_ids (Counter): Количество изменений для каждого идентификатора вложения.
+        delta (int): +1 при добавлении ссылок, -1 при удалении.
+
+    Returns:
+        int: Количество обновленных строк.
+    """
+    updated = 0
+    for attachment_id, count in attachment_ids.items():
+        result = db.session.execute(
+            update(Attachment)
+            .where(Attachment.id == attachment_id)
+            .values(ref_count=Attachment.ref_count + delta * count, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+    return updated
+
+
+def attach_file(task, attachment):
+    """
+    Прикрепляет вложение к задаче, увеличивая количество ссылок на него
+    и уменьшая количество ссылок на предыдущее вложение задачи.
+
+    Args:
+        task (Task): Задача.
+        attachment (Attachment): Вложение.
+    """
+    if task.attachment_id == attachment.id:
+        return
+    if not _change_references(Counter([attachment.id]), 1):
+        # Сборщик мусора успел удалить вложение без ссылок: создаем его заново
+        attachment = register_attachment(attachment.file_path, attachment.sha256, attachment.size)
+        _change_references(Counter([attachment.id]), 1)
+    if task.attachment_id:
+        _change_references(Counter([task.attachment_id]), -1)
+    task.attachment = attachment
+    task.file_path = attachment.file_path
+
+
+def release_files(rows):
+    """
+    Уменьшает количество ссылок на вложения удаляемых задач.
+
+    Файлы задач, созданных до появления хранилища вложений (без attachment_id),
+    возвращаются для удаления, если на них не ссылаются другие задачи.
+
+    Args:
+        rows (list): Строки или объекты задач с атрибутами id, attachment_id и file_path.
+
+    Returns:
+        list of str: Пути к файлам, которые нужно удалить после фиксации транзакции.
+    """
+    _change_references(Counter(row.attachment_id for row in rows if row.attachment_id), -1)
+
+    legacy_paths = {row.file_path for row in rows if row.file_path and not row.attachment_id}
+    if not legacy_paths:
+        return []
+    task_ids = [row.id for row in rows]
+    still_used = set(db.session.scalars(
+        select(Task.file_path).where(Task.file_path.in_(legacy_paths), Task.id.notin_(task_ids))
+    ))
+    return sorted(legacy_paths - still_used)
+
+
+@job('remove_files')
+@timed('file')
+def remove_files(paths):
+    """
+    Удаляет файлы, если они существуют. Выполняется как фоновое задание после фиксации
+    транзакции, освободившей файлы (см. jobs.enqueue_after_commit).
+
+    Args:
+        paths (list of str): Пути к файлам.
+    """
+    for path in paths:
+        try:
+            run_blocking(os.remove, path)
+        except FileNotFoundError:
+            pass
+
+
+def resolve_stored_path(file_path, upload_folder):
+    """
+    Возвращает абсолютный путь к файлу, только если он находится внутри папки загрузок.
+
+    Args:
+        file_path (str): Путь к файлу из записи задачи.
+        upload_folder (str): Папка загрузок.
+
+    Returns:
+        str or None: Абсолютный путь к существующему файлу или None.
+    """
+    root = os.path.abspath(upload_folder)
+    path = os.path.abspath(file_path)
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+
+@timed('file')
+def send_stored_file(path, digest=None):
+    """
+    Отдает файл из хранилища без чтения его содержимого в Python, когда это возможно.
+
+    Если задан X_ACCEL_REDIRECT_PREFIX, передача файла поручается nginx (X-Accel-Redirect),
+    если включен USE_X_SENDFILE — веб-серверу через X-Sendfile, иначе используется
+    wsgi.file_wrapper (sendfile в gunicorn). Поддерживаются запросы Range и условные запросы.
+
+    Args:
+        path (str): Абсолютный путь к файлу.
+        digest (str or None): SHA-256 содержимого, используется как ETag.
+
+    Returns:
+        Response: Ответ с файлом.
+    """
+    max_age = current_app.config['ATTACHMENT_CACHE_MAX_AGE']
+    prefix = current_app.config.get('X_ACCEL_REDIRECT_PREFIX')
+    if prefix:
+        stat = os.stat(path)
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{os.path.basename(path)}"
+        response.set_etag(digest or f'{stat.st_mtime}-{stat.st_size}')
+        response.last_modified = stat.st_mtime
+        response.cache_control.max_age = max_age
+        response = response.make_conditional(request)
+    else:
+        response = send_file(path, etag=digest or True, max_age=max_age, conditional=True)
+    # Вложения задач не должны сохраняться общими кэшами
+    response.cache_control.public = None
+    response.cache_control.private = True
+    return response
+
+
+def collect_garbage(upload_folder, grace_period):
+    """
+    Удаляет вложения без ссылок и файлы хранилища, на которые не ссылается ни одно вложение.
+
+    Удаляются только объекты, не изменявшиеся дольше grace_period секунд, чтобы не
+    затронуть файлы загрузок, которые еще не зафиксированы в базе. Файл удаленного
+    вложения удаляется сразу после фиксации удаления, а не фоновым заданием: команда
+    CLI может завершиться раньше, чем очередь заданий его обработает. Миниатюры удаляются
+    при обходе папки загрузок.
+
+    Args:
+        upload_folder (str): Папка загрузок.
+        grace_period (int): Минимальный возраст удаляемых объектов в секундах.
+
+    Returns:
+        int: Количество действительно удаленных файлов.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_period)
+    cutoff_timestamp = time.time() - grace_period
+    deleted = set()
+    removed = 0
+
+    orphans = db.session.execute(
+        select(Attachment.id, Attachment.file_path)
+        .where(Attachment.ref_count <= 0, Attachment.updated_at < cutoff)
+    ).all()
+    for orphan in orphans:
+        # Условие повторяется в DELETE: вложение могло получить ссылку после выборки
+        result = db.session.execute(
+            delete(Attachment)
+            .where(Attachment.id == orphan.id, Attachment.ref_count <= 0, Attachment.updated_at < cutoff)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount:
+            deleted.add(os.path.basename(orphan.file_path))
+            if _remove_stale_file(orphan.file_path, cutoff_timestamp):
+                removed += 1
+
+    if os.path.isdir(upload_folder):
+        referenced = {os.path.basename(path) for path in db.session.scalars(select(Attachment.file_path))}
+        referenced_digests = {name.split('.', 1)[0] for name in referenced}
+        for name in os.listdir(upload_folder):
+            thumbnail = _THUMBNAIL_NAME.match(name)
+            if thumbnail:
+                stale = thumbnail.group(1) not in referenced_digests
+            else:
+                managed = _BLOB_NAME.match(name) or name.startswith(_TEMP_PREFIX)
+                stale = managed and name not in referenced and name not in deleted
+            if stale and _remove_stale_file(os.path.join(upload_folder, name), cutoff_timestamp):
+                removed += 1
+    db.session.commit()
+    return removed
+
+
+@job('remove_stale_file')
+def _remove_stale_file(path, cutoff_timestamp):
+    try:
+        if os.path.getmtime(path) < cutoff_timestamp:
+            run_blocking(os.remove, path)
+            return True
+    except FileNotFoundError:
+        pass
+    return False
+
+
+def run_garbage_collector(app, interval):
+    """
+    Периодически выполняет сборку мусора в хранилище вложений (не возвращает управление).
+
+    Args:
+        app (Flask): Экземпляр Flask-приложения.
+        interval (int): Период сборки мусора в секундах.
+    """
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                removed = collect_garbage(app.config['UPLOAD_FOLDER'], app.config['ATTACHMENT_GC_GRACE_PERIOD'])
+                if removed:
+                    logger.info('Attachment garbage collection removed %d files', removed)
+            except Exception:
+                logger.exception('Attachment garbage collection failed')
+            finally:
+                db.session.remove()
+
+
+def start_garbage_collector(app):
+    """
+    Запускает фоновый поток, периодически выполняющий сборку мусора в хранилище вложений.
+    Используется сервером разработки; под gunicorn сборщик запускается отдельным
+    процессом из мастер-процесса (gunicorn.conf.py), а не в каждом рабочем процессе.
+
+    Args:
+        app (Flask): Экземпляр Flask-приложения.
+
+    Returns:
+        Thread or None: Запущенный поток (None, если ATTACHMENT_GC_INTERVAL = 0).
+    """
+    interval = app.config['ATTACHMENT_GC_INTERVAL']
+    if interval <= 0:
+        return None
+    thread = threading.Thread(target=run_garbage_collector, args=(app, interval), name='attachment-gc', daemon=True)
+    thread.start()
+    return thread
+
+
+# Команды CLI для обслуживания хранилища вложений: flask attachments gc
+attachments_cli = AppGroup('attachments', help='Attachment storage maintenance.')
+
+
+@attachments_cli.command('gc')
+@click.option('--grace-period', type=int, default=None,
+              help='Minimum age in seconds of removed files (defaults to ATTACHMENT_GC_GRACE_PERIOD).')
+@click.option('--interval', type=int, default=0,
+              help='Keep running and collect garbage every INTERVAL seconds (0 runs once).')
+def gc_command(grace_period, interval):
+    """Remove attachments and stored files that are no longer referenced by tasks."""
+    if interval > 0:
+        if grace_period is not None:
+            current_app.config['ATTACHMENT_GC_GRACE_PERIOD'] = grace_period
+        run_garbage_collector(current_app._get_current_object(), interval)
+    if grace_period is None:
+        grace_period = current_app.config['ATTACHMENT_GC_GRACE_PERIOD']
+    removed = collect_garbage(current_app.config['UPLOAD_FOLDER'], grace_period)
+    click.echo(f'Removed {removed} files')
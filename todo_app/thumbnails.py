@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from sqlalchemy import select
+from .changelog import record_changes
+from .extensions import cache, db
+from .jobs import job
+from .models import Attachment, Task
+from .storage import _TEMP_PREFIX, resolve_stored_path
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow не установлен: миниатюры не создаются
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Расширения изображений, для которых создаются миниатюры, и формат миниатюр.
+# Миниатюры GIF сохраняются в PNG (первый кадр).
+THUMBNAIL_FORMATS = {'png': 'PNG', 'jpg': 'JPEG', 'jpeg': 'JPEG', 'gif': 'PNG'}
+_FORMAT_EXTENSIONS = {'PNG': 'png', 'JPEG': 'jpg'}
+
+
+def thumbnail_path(file_path, size):
+    """
+    Возвращает путь к миниатюре файла: миниатюры хранятся рядом с оригиналом
+    под именем <sha256>.<размер>.<расширение>.
+
+    Args:
+        file_path (str): Путь к исходному файлу.
+        size (int): Размер миниатюры (наибольшая сторона в пикселях).
+
+    Returns:
+        str: Путь к миниатюре.
+    """
+    root, extension = os.path.splitext(file_path)
+    image_format = THUMBNAIL_FORMATS[extension[1:].lower()]
+    return f'{root}.{size}.{_FORMAT_EXTENSIONS[image_format]}'
+
+
+def thumbnail_urls(task_id, thumbnail_sizes):
+    """
+    Возвращает ссылки на миниатюры вложения задачи.
+
+    Args:
+        task_id (int): Идентификатор задачи.
+        thumbnail_sizes (str or None): Размеры созданных миниатюр через запятую (Attachment.thumbnail_sizes).
+
+    Returns:
+        dict: Словарь {размер: URL миниатюры} (пустой, если миниатюр нет).
+    """
+    if not thumbnail_sizes:
+        return {}
+    return {size: f'/tasks/{task_id}/thumbnails/{size}' for size in thumbnail_sizes.split(',')}
+
+
+def render_thumbnails(source, sizes):
+    """
+    Создает миниатюры изображения. Выполняется в процессе пула ThumbnailRenderer.
+
+    Изображение декодируется один раз (JPEG — сразу в уменьшенном масштабе), миниатюры
+    создаются от большей к меньшей и записываются атомарно через временный файл.
+
+    Args:
+        source (str): Путь к исходному изображению.
+        sizes (tuple of int): Размеры миниатюр.
+
+    Returns:
+        list of int: Размеры созданных миниатюр (пустой, если файл не является изображением).
+    """
+    image_format = THUMBNAIL_FORMATS[os.path.splitext(source)[1][1:].lower()]
+    try:
+        with Image.open(source) as image:
+            largest = max(sizes)
+            image.draft('RGB', (largest, largest))
+            image = ImageOps.exif_transpose(image)
+            if image_format == 'JPEG' and image.mode != 'RGB':
+                image = image.convert('RGB')
+            elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                image = image.convert('RGBA')
+            for size in sorted(sizes, reverse=True):
+                image.thumbnail((size, size))
+                _save_atomic(image, thumbnail_path(source, size), image_format)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning('Could not create thumbnails for %s: %s', source, e)
+        return []
+    return sorted(sizes)
+
+
+def _save_atomic(image, path, image_format):
+    fd, temp_path = tempfile.mkstemp(prefix=_TEMP_PREFIX, dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, image_format, optimize=True)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+class ThumbnailRenderer(object):
+    """
+    Создает миниатюры в пуле процессов, чтобы декодирование изображений не занимало
+    GIL рабочих процессов приложения.
+
+    Пул создается при первой миниатюре в процессе (в том числе после fork рабочего
+    процесса gunicorn). При THUMBNAIL_PROCESSES = 0 миниатюры создаются в вызывающем потоке.
+
+    Attributes:
+        sizes (tuple of int): Размеры миниатюр.
+        enabled (bool): True, если установлен Pillow и заданы размеры миниатюр.
+    """
+
+    def __init__(self, app):
+        self.sizes = tuple(app.config['THUMBNAIL_SIZES'])
+        self.processes = app.config['THUMBNAIL_PROCESSES']
+        self.timeout = app.config['THUMBNAIL_TIMEOUT']
+        self.enabled = Image is not None and bool(self.sizes)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def render(self, source):
+        """
+        Создает миниатюры изображения и ожидает их не дольше THUMBNAIL_TIMEOUT секунд.
+
+        Args:
+            source (str): Путь к исходному изображению.
+
+        Returns:
+            list of int: Размеры созданных миниатюр.
+        """
+        if not self.processes:
+            return render_thumbnails(source, self.sizes)
+        executor = self._get_executor()
+        try:
+            return executor.submit(render_thumbnails, source, self.sizes).result(self.timeout)
+        except BrokenProcessPool:
+            # Процесс пула аварийно завершился: следующая попытка задания создаст новый пул
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # spawn: дочерние процессы не наследуют потоки и соединения приложения
+                self._executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            return self._executor
+
+
+@job('generate_thumbnails')
+def generate_thumbnails(attachment_id):
+    """
+    Создает миниатюры вложения и записывает задачи, к которым оно прикреплено, в журнал
+    изменений, чтобы клиенты получили ссылки на миниатюры через журнал, поток событий и кэш.
+
+    updated_at задач не меняется: создание миниатюр — не изменение задачи пользователем
+    и не учитывается в статистике обновлений. ETag задачи зависит от размеров миниатюр
+    (см. services.task_etag).
+
+    Args:
+        attachment_id (int): Идентификатор вложения.
+    """
+    attachment = db.session.get(Attachment, attachment_id)
+    if attachment is None or attachment.thumbnail_sizes is not None:
+        return
+    path = resolve_stored_path(attachment.file_path, current_app.config['UPLOAD_FOLDER'])
+    sizes = current_app.extensions['thumbnails'].render(path) if path else []
+    attachment.thumbnail_sizes = ','.join(str(size) for size in sizes)
+
+    if sizes:
+        task_ids = db.session.scalars(select(Task.id).where(Task.attachment_id == attachment_id)).all()
+        record_changes('task', task_ids)
+    db.session.commit()
+    cache.invalidate()
+
+
+def init_thumbnails(app):
+    """
+    Создает генератор миниатюр приложения.
+
+    Args:
+        app (Flask): Экземпляр Flask-приложения.
+    """
+    app.extensions['thumbnails'] = ThumbnailRenderer(app)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import shutil
+import tempfile
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from .fileio import run_blocking
+from .metrics import timed
+
+
+class HashingUploadFile(object):
+    """
+    Временный файл для загружаемых данных, который считает SHA-256 и размер по мере записи.
+
+    Файл создается в папке загрузок, чтобы затем его можно было атомарно переименовать
+    в постоянное имя на той же файловой системе.
+
+    Attributes:
+        path (str): Путь к временному файлу.
+        size (int): Количество записанных байт.
+        max_size (int or None): Максимально допустимый размер файла.
+    """
+
+    def __init__(self, directory, max_size=None):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix='.upload-', dir=directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.max_size = max_size
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise RequestEntityTooLarge(f'File is too large, maximum is {self.max_size} bytes')
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def discard(self):
+        """
+        Закрывает и удаляет временный файл, если он не был перемещен.
+        """
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """
+    Запрос, который записывает загружаемые файлы потоково во временные файлы
+    в UPLOAD_FOLDER и вычисляет их SHA-256 во время чтения тела запроса.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._upload_streams = []
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        stream = HashingUploadFile(current_app.config['UPLOAD_FOLDER'], current_app.config.get('MAX_UPLOAD_SIZE'))
+        self._upload_streams.append(stream)
+        return stream
+
+    def close(self):
+        super().close()
+        # Удаляем временные файлы, которые не были сохранены (например, при ошибке валидации)
+        for stream in self._upload_streams:
+            stream.discard()
+        self._upload_streams = []
+
+
+@timed('file')
+def store_upload(file_storage, upload_folder, extension):
+    """
+    Сохраняет загруженный файл под именем, производным от SHA-256 его содержимого.
+
+    Одинаковые по содержимому файлы сохраняются один раз, файлы с одинаковыми
+    именами, но разным содержимым, не перезаписывают друг друга.
+
+    Args:
+        file_storage (FileStorage): Загруженный файл.
+        upload_folder (str): Папка для сохранения.
+        extension (str): Расширение файла (без точки).
+
+    Returns:
+        tuple: Путь к сохраненному файлу, SHA-256 его содержимого и размер в байтах.
+    """
+    stream = file_storage.stream
+    if not isinstance(stream, HashingUploadFile):
+        # Файл пришел не через UploadRequest: копируем его потоково с подсчетом хэша
+        source, stream = stream, HashingUploadFile(upload_folder, current_app.config.get('MAX_UPLOAD_SIZE'))
+        try:
+            shutil.copyfileobj(source, stream)
+        except Exception:
+            stream.discard()
+            raise
+
+    digest = stream.hexdigest()
+    file_path = os.path.join(upload_folder, f'{digest}.{extension}')
+    stream.flush()
+    run_blocking(os.fsync, stream.fileno())
+    stream.close()
+    if os.path.exists(file_path):
+        stream.discard()
+        # Обновляем время изменения, чтобы сборщик мусора не удалил файл, который снова используется
+        run_blocking(os.utime, file_path)
+    else:
+        run_blocking(os.replace, stream.path, file_path)
+    return file_path, digest, stream.size
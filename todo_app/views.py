@@ -1,14 +1,40 @@
 # -*- coding: utf-8 -*-
 
-import os
+from datetime import datetime
 from flask import Blueprint, current_app, request, jsonify, make_response
-from .models import Category, Task
-from .extensions import db
-from .services import (handle_categories,
-                                   handle_file_upload,
-                                   task_to_dict,
-                                   category_to_dict,
-                                   validate_task_data)
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import BadRequest
+from .models import Attachment, Category, Task, task_categories
+from .extensions import cache, db
+from .bulk import bulk_create_tasks, bulk_delete_tasks, bulk_update_tasks, get_bulk_items
+from .changelog import record_changes
+from .changes import get_changes, parse_since
+from .jobs import enqueue_after_commit
+from .storage import attach_file, release_files, resolve_stored_path, send_stored_file
+from .engine import database_health
+from .events import event_stream
+from .export import export_tasks
+from .filters import count_categories
+from .queries import build_task_query
+from .stats import get_stats, parse_day
+from .thumbnails import thumbnail_path
+from .pagination import decode_cursor, encode_cursor, keyset_filter, keyset_order, parse_limit
+from .services import (THUMBNAIL_SIZES_COLUMN,
+                       attachment_thumbnail_sizes,
+                       handle_categories,
+                       get_task_data,
+                       handle_file_upload,
+                       not_modified_response,
+                       parse_fields,
+                       task_columns,
+                       task_etag,
+                       task_last_modified,
+                       task_list_etag,
+                       task_rows_to_dicts,
+                       task_to_dict,
+                       category_to_dict,
+                       validate_task_data)
 
 # Создание объекта tasks_blueprint для маршрутов и представлений, связанных с задачами в приложении Flask
 tasks_blueprint = Blueprint('tasks', __name__)
@@ -23,7 +49,7 @@ def create_task():
         json: JSON-ответ с сообщением о создании задачи и ее идентификатором или ошибкой в случае неверных данных.
     """
 
-    data = request.get_json()
+    data = get_task_data(request)
     validate_task_data(data)
 
     new_task = Task(
@@ -33,54 +59,246 @@ def create_task():
 
     # Обработка категорий
     handle_categories(data.get('categories', []), new_task)
+    db.session.add(new_task)
 
     # Обработка файла
-    file_path = handle_file_upload(request, current_app.config['UPLOAD_FOLDER'])
-    if file_path:
-        new_task.file_path = file_path
+    attachment = handle_file_upload(request, current_app.config['UPLOAD_FOLDER'])
+    if attachment:
+        attach_file(new_task, attachment)
 
-    db.session.add(new_task)
     db.session.commit()
+    cache.invalidate()
     return jsonify(task_to_dict(new_task)), 201
 
 
+@tasks_blueprint.route('/tasks/bulk', methods=['POST'])
+def create_tasks_bulk():
+    """
+    Создает несколько задач за один запрос.
+
+    Returns:
+        json: JSON-ответ с результатом для каждой задачи (статус, идентификатор или ошибка).
+    """
+    tasks = get_bulk_items(request.get_json(), 'tasks', current_app.config['BULK_MAX_ITEMS'])
+    results = bulk_create_tasks(tasks, current_app.config['BULK_CHUNK_SIZE'])
+    cache.invalidate()
+    return jsonify({'results': results})
+
+
+@tasks_blueprint.route('/tasks/bulk', methods=['PATCH'])
+def update_tasks_bulk():
+    """
+    Обновляет несколько задач за один запрос. Каждая задача должна содержать поле id.
+
+    Returns:
+        json: JSON-ответ с результатом для каждой задачи.
+    """
+    tasks = get_bulk_items(request.get_json(), 'tasks', current_app.config['BULK_MAX_ITEMS'])
+    results = bulk_update_tasks(tasks, current_app.config['BULK_CHUNK_SIZE'])
+    cache.invalidate()
+    return jsonify({'results': results})
+
+
+@tasks_blueprint.route('/tasks/bulk', methods=['DELETE'])
+def delete_tasks_bulk():
+    """
+    Удаляет несколько задач по их идентификаторам вместе со связанными файлами.
+
+    Returns:
+        json: JSON-ответ с результатом для каждого идентификатора.
+    """
+    ids = get_bulk_items(request.get_json(), 'ids', current_app.config['BULK_MAX_ITEMS'])
+    results = bulk_delete_tasks(ids, current_app.config['BULK_CHUNK_SIZE'])
+    cache.invalidate()
+    return jsonify({'results': results})
+
+
 @tasks_blueprint.route('/tasks', methods=['GET'])
+@cache.cached
 def get_tasks():
-    category_filter = request.args.get('category')
-    sort_by = request.args.get('sort', 'created_at')
-    order = request.args.get('order', 'asc')
+    """
+    Возвращает страницу списка задач с возможностью фильтрации и сортировки.
 
-    query = Task.query
+    Постраничный обход выполняется по курсору (keyset): курсор хранит значение поля
+    сортировки и идентификатор последней задачи страницы. Параметр q включает
+    полнотекстовый поиск по названию и описанию; без явного sort результаты поиска
+    упорядочены по релевантности. Параметр category принимает несколько названий через
+    запятую (match=any|all), exclude исключает задачи с указанными категориями,
+    counts=1 добавляет количество отобранных задач по категориям. Параметр fields
+    ограничивает набор полей задач в ответе (и колонок, читаемых из базы).
 
-    # Фильтрация по категориям
-    if category_filter:
-        query = query.join(Task.categories).filter(Category.name == category_filter)
+    Returns:
+        json: JSON-ответ со списком задач и курсором следующей страницы.
+    """
+    limit = parse_limit(request.args.get('limit'),
+                        current_app.config['TASKS_PAGE_SIZE'],
+                        current_app.config['TASKS_MAX_PAGE_SIZE'])
+    cursor = request.args.get('cursor')
+    fields = parse_fields(request.args.get('fields'))
+    query, sort_by, sort_column, order = build_task_query(request.args, fields)
+
+    counts = None
+    if request.args.get('counts') in ('1', 'true'):
+        counts = count_categories(query.with_only_columns(Task.id).order_by(None))
+
+    # Продолжение с позиции курсора
+    if cursor:
+        query = query.where(keyset_filter(sort_column, order, *decode_cursor(cursor, sort_by, order)))
 
     # Сортировка
-    if hasattr(Task, sort_by):
-        query = query.order_by(getattr(Task, sort_by).desc() if order == 'desc' else getattr(Task, sort_by))
+    query = query.order_by(*keyset_order(sort_column, order))
+
+    # Запрашиваем на одну задачу больше, чтобы узнать, есть ли следующая страница
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_by, order, getattr(last, sort_by), last.id)
+
+    # ETag страницы зависит только от id и updated_at задач на ней (и от счетчиков категорий).
+    # Last-Modified для списка не используется: удаление задачи не увеличивает наибольший
+    # updated_at оставшихся, и проверка If-Modified-Since вернула бы устаревший 304
+    etag = task_list_etag(rows, counts)
+    not_modified = not_modified_response(etag, None)
+    if not_modified:
+        return not_modified
+
+    # Преобразование строк в список словарей (категории загружаются одним запросом)
+    tasks_data = task_rows_to_dicts(rows, fields)
+
+    data = {'tasks': tasks_data, 'next_cursor': next_cursor}
+    if counts is not None:
+        data['category_counts'] = counts
+    response = jsonify(data)
+    response.set_etag(etag)
+    return response
+
+
+@tasks_blueprint.route('/tasks/export', methods=['GET'])
+def export_tasks_view():
+    """
+    Выгружает все задачи, отобранные теми же фильтрами, что и список задач,
+    в формате NDJSON (по умолчанию) или CSV.
 
-    # Ограничение на количество результатов
-    tasks = query.limit(100).all()
+    Ответ формируется потоково: задачи читаются из базы пачками по ключу сортировки,
+    поэтому объем памяти не зависит от количества задач.
 
-    # Преобразование задач в список словарей
-    tasks_data = [task_to_dict(task) for task in tasks]
+    Returns:
+        Response: Потоковый ответ с задачами.
+    """
+    return export_tasks(request.args)
 
-    return jsonify({'tasks': tasks_data})
+
+@tasks_blueprint.route('/tasks/changes', methods=['GET'])
+def get_task_changes():
+    """
+    Возвращает задачи и категории, созданные, измененные или удаленные после версии since.
+
+    Клиент синхронизации передает в since значение next_since из предыдущего ответа
+    (без since возвращаются все задачи и категории) и повторяет запрос, пока has_more
+    равно true. Удаленные задачи и категории возвращаются списками идентификаторов.
+    Ответ не кэшируется: клиент, получивший устаревшую страницу и продвинувший since,
+    потерял бы изменения.
+
+    Returns:
+        json: JSON-ответ с изменениями и токеном следующего запроса.
+    """
+    since = parse_since(request.args.get('since'))
+    limit = parse_limit(request.args.get('limit'),
+                        current_app.config['CHANGES_PAGE_SIZE'],
+                        current_app.config['CHANGES_MAX_PAGE_SIZE'])
+    return jsonify(get_changes(since, limit))
 
 
 @tasks_blueprint.route('/tasks/<id>', methods=['GET'])
+@cache.cached
 def get_task(id):
     """
-    Возвращает список задач с возможностью фильтрации и сортировки.
+    Возвращает задачу по её идентификатору.
+
+    Поддерживает условные запросы (If-None-Match, If-Modified-Since; для задачи
+    с миниатюрами — только If-None-Match): если у клиента актуальная версия,
+    возвращается 304 без сериализации задачи. Параметр fields ограничивает набор
+    полей задачи в ответе.
+
+    Args:
+        id (int): Идентификатор задачи.
 
     Returns:
-        json: JSON-ответ с списком задач.
+        json: JSON-ответ с данными о задаче.
     """
-    task = db.session.get(Task, id)
-    if task:
-        return jsonify(task_to_dict(task))
-    return make_response('Task not found', 404)
+    fields = parse_fields(request.args.get('fields'))
+    columns = task_columns(fields)
+    if 'thumbnails' not in fields:
+        # Размеры миниатюр входят в ETag при любом наборе полей
+        columns.append(THUMBNAIL_SIZES_COLUMN)
+    row = db.session.execute(select(*columns).where(Task.id == id)).first()
+    if not row:
+        return make_response('Task not found', 404)
+
+    etag = task_etag(row, row.thumbnail_sizes)
+    modified_at = task_last_modified(row, row.thumbnail_sizes)
+    not_modified = not_modified_response(etag, modified_at)
+    if not_modified:
+        return not_modified
+
+    response = jsonify(task_rows_to_dicts([row], fields)[0])
+    response.set_etag(etag)
+    if modified_at:
+        response.last_modified = modified_at
+    return response
+
+
+@tasks_blueprint.route('/tasks/<id>/file', methods=['GET'])
+def get_task_file(id):
+    """
+    Возвращает файл, прикрепленный к задаче. Поддерживает запросы Range
+    и условные запросы (ETag — SHA-256 содержимого файла).
+
+    Args:
+        id (int): Идентификатор задачи.
+
+    Returns:
+        Response: Содержимое файла.
+    """
+    row = db.session.execute(
+        select(Task.file_path, Attachment.sha256)
+        .outerjoin(Attachment, Attachment.id == Task.attachment_id)
+        .where(Task.id == id)
+    ).first()
+    if not row:
+        return make_response('Task not found', 404)
+    path = row.file_path and resolve_stored_path(row.file_path, current_app.config['UPLOAD_FOLDER'])
+    if not path:
+        return make_response('File not found', 404)
+    return send_stored_file(path, row.sha256)
+
+
+@tasks_blueprint.route('/tasks/<id>/thumbnails/<int:size>', methods=['GET'])
+def get_task_thumbnail(id, size):
+    """
+    Возвращает миниатюру изображения, прикрепленного к задаче. Ссылки на миниатюры
+    доступных размеров содержатся в поле thumbnails задачи.
+
+    Args:
+        id (int): Идентификатор задачи.
+        size (int): Размер миниатюры.
+
+    Returns:
+        Response: Содержимое миниатюры.
+    """
+    row = db.session.execute(
+        select(Task.file_path, Attachment.sha256, Attachment.thumbnail_sizes)
+        .join(Attachment, Attachment.id == Task.attachment_id)
+        .where(Task.id == id)
+    ).first()
+    if not row or str(size) not in (row.thumbnail_sizes or '').split(','):
+        return make_response('Thumbnail not found', 404)
+    path = resolve_stored_path(thumbnail_path(row.file_path, size), current_app.config['UPLOAD_FOLDER'])
+    if not path:
+        return make_response('Thumbnail not found', 404)
+    return send_stored_file(path, f'{row.sha256}-{size}')
 
 
 @tasks_blueprint.route('/tasks/<id>', methods=['PUT'])
@@ -88,30 +306,42 @@ def update_task(id):
     """
     Обновляет существующую задачу.
 
+    Если передан заголовок If-Match, задача обновляется только при совпадении ETag
+    (оптимистическая блокировка), иначе возвращается 412.
+
     Args:
         id (int): Идентификатор задачи.
 
     Returns:
         json: JSON-ответ с сообщением об успешном обновлении.
     """
-    data = request.get_json()
+    data = get_task_data(request)
     validate_task_data(data)
 
     task = db.session.get(Task, id)
     if not task:
         return make_response('Task not found', 404)
+    if request.if_match and not request.if_match.contains(task_etag(task, attachment_thumbnail_sizes(task))):
+        return make_response('Task has been modified', 412)
 
     if 'title' in data:
         task.title = data['title']
     if 'description' in data:
         task.description = data['description']
     handle_categories(data.get('categories', []), task)
-    file_path = handle_file_upload(request, current_app.config['UPLOAD_FOLDER'])
-    if file_path:
-        task.file_path = file_path
+    attachment = handle_file_upload(request, current_app.config['UPLOAD_FOLDER'])
+    if attachment:
+        attach_file(task, attachment)
 
     db.session.commit()
-    return jsonify(task_to_dict(task))
+    cache.invalidate()
+    response = jsonify(task_to_dict(task))
+    thumbnail_sizes = attachment_thumbnail_sizes(task)
+    response.set_etag(task_etag(task, thumbnail_sizes))
+    modified_at = task_last_modified(task, thumbnail_sizes)
+    if modified_at:
+        response.last_modified = modified_at
+    return response
 
 
 @tasks_blueprint.route('/tasks/<id>', methods=['DELETE'])
@@ -119,6 +349,9 @@ def delete_task(id):
     """
     Удаляет задачу по её идентификатору.
 
+    Файл задачи удаляется из хранилища, когда на него не остается ссылок
+    (см. storage.collect_garbage).
+
     Args:
         id (int): Идентификатор задачи.
 
@@ -127,15 +360,18 @@ def delete_task(id):
     """
     task = db.session.get(Task, id)
     if task:
-        if task.file_path and os.path.exists(task.file_path):
-            os.remove(task.file_path)
+        unused_files = release_files([task])
         db.session.delete(task)
+        if unused_files:
+            enqueue_after_commit('remove_files', unused_files)
         db.session.commit()
+        cache.invalidate()
         return jsonify({'message': 'Task and associated file deleted successfully'})
     return make_response('Task not found', 404)
 
 
 @tasks_blueprint.route('/categories', methods=['GET'])
+@cache.cached
 def get_categories():
     """
     Возвращает список всех категорий.
@@ -149,6 +385,7 @@ def get_categories():
 
 
 @tasks_blueprint.route('/categories/<int:id>', methods=['GET'])
+@cache.cached
 def get_category(id):
     """
     Возвращает список всех категорий.
@@ -176,9 +413,18 @@ def create_category():
     if not data or 'name' not in data:
         return jsonify({'message': 'Invalid data'}), 400
 
+    if Category.query.filter_by(name=data['name']).first():
+        return jsonify({'message': 'Category already exists'}), 409
+
     new_category = Category(name=data['name'])
     db.session.add(new_category)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Категорию с таким же названием успел создать параллельный запрос
+        db.session.rollback()
+        return jsonify({'message': 'Category already exists'}), 409
+    cache.invalidate()
 
     return jsonify({'message': 'Category created successfully',
                     'category': {'id': new_category.id, 'name': new_category.name}}), 201
@@ -197,7 +443,60 @@ def delete_category(id):
     """
     category = db.session.get(Category, id)
     if category:
+        # Удаление категории меняет представление связанных задач
+        linked_tasks = select(task_categories.c.task_id).where(task_categories.c.category_id == category.id)
+        db.session.execute(update(Task).where(Task.id.in_(linked_tasks)).values(updated_at=datetime.utcnow()))
+        # Задачи обновлены запросом UPDATE в обход ORM, поэтому изменения отмечаются явно
+        record_changes('task', db.session.scalars(linked_tasks))
         db.session.delete(category)
         db.session.commit()
+        cache.invalidate()
         return jsonify({'message': 'Category deleted successfully'})
     return make_response('Category not found', 404)
+
+
+@tasks_blueprint.route('/events', methods=['GET'])
+def get_events():
+    """
+    Поток событий (Server-Sent Events) о создании, изменении и удалении задач и категорий.
+
+    События task и category содержат текущие данные сущности, task_deleted
+    и category_deleted — ее идентификатор. Идентификатор события — версия журнала
+    изменений: при переподключении с заголовком Last-Event-ID (или параметром since)
+    клиент получает пропущенные изменения.
+
+    Returns:
+        Response: Потоковый ответ text/event-stream.
+    """
+    return event_stream()
+
+
+@tasks_blueprint.route('/stats', methods=['GET'])
+def get_task_stats():
+    """
+    Возвращает общее количество задач, количество задач в каждой категории и количество
+    задач, созданных и последний раз измененных в каждый день (UTC). Параметры from и to
+    (YYYY-MM-DD, включительно) ограничивают статистику по дням.
+    Ответ не кэшируется: статистика читается из небольших сводных таблиц, а их пересчет
+    (flask stats rebuild) не меняет версию журнала изменений, по которой сбрасывается кэш.
+
+    Returns:
+        json: JSON-ответ со статистикой.
+    """
+    start = parse_day(request.args.get('from'))
+    end = parse_day(request.args.get('to'))
+    if start and end and start > end:
+        raise BadRequest('Invalid date range')
+    return jsonify(get_stats(start, end))
+
+
+@tasks_blueprint.route('/health/db', methods=['GET'])
+def database_health_check():
+    """
+    Проверяет доступность базы данных и возвращает статистику пула соединений.
+
+    Returns:
+        json: Состояние базы данных (200) или описание ошибки (503).
+    """
+    data, healthy = database_health(current_app)
+    return jsonify(data), 200 if healthy else 503